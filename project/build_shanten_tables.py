@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+Precalculate shanten tables and save them to the file.
+Bots open this file in the read only mode on the start,
+so they don't need to calculate the same suit shapes again
+"""
+import time
+from optparse import OptionParser
+
+from game.ai.shanten import save_tables, load_tables
+from utils.settings_handler import settings
+
+
+def main():
+    parser = OptionParser()
+
+    parser.add_option('-o', '--output',
+                      type='string',
+                      default=settings.SHANTEN_TABLES_FILE,
+                      help='File name for the tables. Default is {0}'.format(settings.SHANTEN_TABLES_FILE))
+
+    opts, _ = parser.parse_args()
+
+    start_time = time.time()
+    save_tables(opts.output)
+
+    if not load_tables(opts.output):
+        print('Failed to load saved tables from {}'.format(opts.output))
+        return
+
+    print('Tables were saved to {} in {:.0f} seconds'.format(opts.output, time.time() - start_time))
+
+
+if __name__ == '__main__':
+    main()
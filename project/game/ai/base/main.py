@@ -35,6 +35,13 @@ class InterfaceAI(object):
         :return:
         """
 
+    def cache_statistics(self):
+        """
+        Usage of AI caches, it will be printed to the log in the end of the game
+        :return: list of strings
+        """
+        return []
+
     def draw_tile(self, tile):
         """
         :param tile: 136 tile format
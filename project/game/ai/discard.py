@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 from mahjong.constants import AKA_DORA_LIST
 from mahjong.tile import TilesConverter
-from mahjong.utils import is_honor, simplify, plus_dora, is_aka_dora, is_sou, is_man, is_pin
+from mahjong.utils import is_honor, simplify, is_sou, is_man, is_pin
 
 from game.ai.mloop.strategies.main import BaseStrategy
 
@@ -11,50 +11,89 @@ class DiscardOption(object):
     DORA_FIRST_NEIGHBOUR = 1000
     DORA_SECOND_NEIGHBOUR = 100
 
-    player = None
-
-    # in 34 tile format
-    tile_to_discard = None
-    # array of tiles that will improve our hand
-    waiting = None
-    # how much tiles will improve our hand
-    ukeire = None
-    ukeire_second = None
-    # number of shanten for that tile
-    shanten = None
-    # sometimes we had to force tile to be discarded
-    had_to_be_discarded = False
-    # special cases where we had to save tile in hand (usually for atodzuke opened hand)
-    had_to_be_saved = False
-    # calculated tile value, for sorting
-    valuation = None
-    # how danger this tile is
-    danger = None
-    # wait to ukeire map
-    wait_to_ukeire = None
-    # second level cost approximation for 1-shanten hands
-    second_level_cost = None
-
-    def __init__(self, player, tile_to_discard, shanten, waiting, ukeire, danger=100, wait_to_ukeire=None):
+    # we build a lot of discard options during the hand estimation
+    __slots__ = (
+        'player',
+        'tile_to_discard',
+        'waiting',
+        'ukeire',
+        'ukeire_second',
+        'shanten',
+        'had_to_be_saved',
+        'danger',
+        'wait_to_ukeire',
+        'wait_to_cost',
+        'second_level_cost',
+        '_closed_hand',
+        '_valuation',
+        '_count_of_dora',
+        '_had_to_be_discarded',
+    )
+
+    def __init__(self, player, tile_to_discard, shanten, waiting, ukeire, danger=100, wait_to_ukeire=None,
+                 closed_hand=None):
         """
         :param player:
         :param tile_to_discard: tile in 34 format
         :param waiting: list of tiles in 34 format
         :param ukeire: count of tiles to wait after discard
+        :param closed_hand: tiles in 136 format, by default it is the player closed hand
         """
         self.player = player
+        # in 34 tile format
         self.tile_to_discard = tile_to_discard
+        # number of shanten for that tile
         self.shanten = shanten
+        # array of tiles that will improve our hand
         self.waiting = waiting
+        # how much tiles will improve our hand
         self.ukeire = ukeire
         self.ukeire_second = 0
-        self.count_of_dora = 0
+        # how danger this tile is
         self.danger = danger
+        # special cases where we had to save tile in hand (usually for atodzuke opened hand)
         self.had_to_be_saved = False
-        self.had_to_be_discarded = False
+        # wait to ukeire map
         self.wait_to_ukeire = wait_to_ukeire
+        # wait to ron cost map, None for waits without yaku
+        self.wait_to_cost = None
+        # second level cost approximation for 1-shanten hands
+        self.second_level_cost = None
+
+        # tile value is calculated only when we need it,
+        # most of discard options are dropped before that
+        self._closed_hand = closed_hand if closed_hand is not None else player.closed_hand_tiles
+        self._valuation = None
+        self._count_of_dora = 0
+        self._had_to_be_discarded = False
+
+    @property
+    def valuation(self):
+        """
+        Calculated tile value, for sorting
+        """
+        if self._valuation is None:
+            self.calculate_value()
+        return self._valuation
+
+    @property
+    def count_of_dora(self):
+        if self._valuation is None:
+            self.calculate_value()
+        return self._count_of_dora
+
+    @property
+    def had_to_be_discarded(self):
+        """
+        Sometimes we had to force tile to be discarded
+        """
+        if self._valuation is None:
+            self.calculate_value()
+        return self._had_to_be_discarded
 
-        self.calculate_value()
+    @had_to_be_discarded.setter
+    def had_to_be_discarded(self, value):
+        self._had_to_be_discarded = value
 
     def __unicode__(self):
         tile_format_136 = TilesConverter.to_one_line_string([self.tile_to_discard*4])
@@ -78,7 +117,7 @@ class DiscardOption(object):
             tiles_five_of_suits = [4, 13, 22]
             # special case, to keep aka dora in hand
             if self.tile_to_discard in tiles_five_of_suits:
-                aka_closed_hand = closed_hand[:]
+                aka_closed_hand = list(closed_hand)
                 while True:
                     tile = TilesConverter.find_34_tile_in_136_array(self.tile_to_discard, aka_closed_hand)
 
@@ -96,7 +135,10 @@ class DiscardOption(object):
 
         return TilesConverter.find_34_tile_in_136_array(self.tile_to_discard, closed_hand)
 
-    def calculate_value(self):
+    def calculate_value(self, closed_hand=None):
+        if closed_hand is None:
+            closed_hand = self._closed_hand
+
         # base is 100 for ability to mark tiles as not needed (like set value to 50)
         value = 100
         honored_value = 20
@@ -148,13 +190,13 @@ class DiscardOption(object):
                 if simplified_tile + 2 == simplified_dora or simplified_tile - 2 == simplified_dora:
                     value += DiscardOption.DORA_SECOND_NEIGHBOUR
 
-        count_of_dora = plus_dora(self.tile_to_discard * 4, self.player.table.dora_indicators)
-
-        tile_136 = self.find_tile_in_hand(self.player.closed_hand)
-        if is_aka_dora(tile_136, self.player.table.has_aka_dora):
-            count_of_dora += 1
+        tile_136 = self.find_tile_in_hand(closed_hand)
+        if tile_136 is None:
+            count_of_dora = self.player.table.dora_count_34[self.tile_to_discard]
+        else:
+            count_of_dora = self.player.table.dora_count_136[tile_136]
 
-        self.count_of_dora = count_of_dora
+        self._count_of_dora = count_of_dora
         value += count_of_dora * DiscardOption.DORA_VALUE
 
         if is_honor(self.tile_to_discard):
@@ -168,6 +210,6 @@ class DiscardOption(object):
             # three honor tiles were discarded,
             # so we don't need this tile anymore
             if value == 0:
-                self.had_to_be_discarded = True
+                self._had_to_be_discarded = True
 
-        self.valuation = int(value)
+        self._valuation = int(value)
@@ -51,8 +51,7 @@ class EnemyAnalyzer(object):
         if self.player.in_riichi:
             return True
 
-        discards = self.player.discards
-        discards_34 = TilesConverter.to_34_array([x.value for x in discards])
+        discards_34 = self.player.river.counts_34
 
         is_honitsu_open_sets, open_hand_suit = False, None
         is_honitsu_discards, discard_suit = self._is_honitsu_discards(discards_34)
@@ -80,7 +80,7 @@ class DefenceHandler(object):
         call_riichi = not self.player.is_open_hand
         for tile in waiting:
             # copy of tiles, because we are modifying a list
-            tiles = self.player.tiles[:]
+            tiles = list(self.player.tiles)
 
             # special case, when we already have 14 tiles in the hand
             if discard_candidate:
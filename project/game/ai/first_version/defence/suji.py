@@ -60,7 +60,7 @@ class Suji(Defence):
         return suji
 
     def find_suji_against_self(self, player):
-        discards_34 = list(set([x.value // 4 for x in player.discards]))
+        discards_34 = list(set([x // 4 for x in player.river.tiles.tolist()]))
         all_suji = self.find_suji(discards_34)
 
         result = []
@@ -1,6 +1,6 @@
 from mahjong.constants import AKA_DORA_LIST
 from mahjong.shanten import Shanten
-from mahjong.tile import TilesConverter, Tile
+from mahjong.tile import TilesConverter
 from mahjong.utils import is_tile_strictly_isolated, is_pair, is_honor, simplify
 
 import utils.decisions_constants as log
@@ -224,7 +224,7 @@ class HandBuilder:
         return n
 
     def divide_hand(self, tiles, waiting):
-        tiles_copy = tiles.copy()
+        tiles_copy = list(tiles)
 
         for i in range(0, 4):
             if waiting * 4 + i not in tiles_copy:
@@ -318,8 +318,7 @@ class HandBuilder:
         return best_discard_desc[0]['discard_option']
 
     def _is_waiting_furiten(self, tile_34):
-        discarded_tiles = [x.value // 4 for x in self.player.discards]
-        return tile_34 in discarded_tiles
+        return self.player.river.is_discarded(tile_34)
 
     def _is_discard_option_furiten(self, discard_option):
         is_furiten = False
@@ -334,7 +333,7 @@ class HandBuilder:
         call_riichi = not self.player.is_open_hand
 
         discard_desc = []
-        player_tiles_copy = self.player.tiles.copy()
+        player_tiles_copy = self.player.tiles
         player_melds_copy = self.player.melds.copy()
 
         closed_tiles_34 = TilesConverter.to_34_array(self.player.closed_hand)
@@ -342,13 +341,13 @@ class HandBuilder:
         for discard_option in discard_options:
             tile = discard_option.find_tile_in_hand(self.player.closed_hand)
             # temporary remove discard option to estimate hand value
-            self.player.tiles = tiles.copy()
-            self.player.tiles.remove(tile)
+            tiles_after_discard = list(tiles)
+            tiles_after_discard.remove(tile)
+            self.player.tiles = tiles_after_discard
             # temporary replace melds
             self.player.melds = melds.copy()
             # for kabe/suji handling
-            discarded_tile = Tile(tile, False)
-            self.player.discards.append(discarded_tile)
+            self.player.river.append(tile, False, False, self.player.round_step)
 
             is_furiten = self._is_discard_option_furiten(discard_option)
 
@@ -428,7 +427,7 @@ class HandBuilder:
             # reverse all temporary tile tweaks
             self.player.tiles = player_tiles_copy
             self.player.melds = player_melds_copy
-            self.player.discards.remove(discarded_tile)
+            self.player.river.pop()
 
         discard_desc = sorted(discard_desc, key=lambda k: (k['cost_x_ukeire'], not k['is_furiten']), reverse=True)
 
@@ -627,12 +626,13 @@ class HandBuilder:
 
         # we are going to do manipulations that require player hand to be updated
         # so we save original tiles here and restore it at the end of the function
-        player_tiles_original = self.player.tiles.copy()
+        player_tiles_original = self.player.tiles
 
         tile_in_hand = discard_option.find_tile_in_hand(self.player.closed_hand)
 
-        self.player.tiles = tiles.copy()
-        self.player.tiles.remove(tile_in_hand)
+        tiles_after_discard = list(tiles)
+        tiles_after_discard.remove(tile_in_hand)
+        self.player.tiles = tiles_after_discard
 
         sum_tiles = 0
         sum_cost = 0
@@ -647,7 +647,7 @@ class HandBuilder:
                 continue
 
             wait_136 = wait_34 * 4
-            self.player.tiles.append(wait_136)
+            draw_undo = self.player.apply_draw(wait_136)
 
             results, shanten = self.find_discard_options(
                 self.player.tiles,
@@ -688,15 +688,15 @@ class HandBuilder:
                 # if we are going to have a tempai (on our second level) - let's also count its cost
                 if shanten == 0:
                     next_tile_in_hand = best_one.find_tile_in_hand(self.player.closed_hand)
-                    self.player.tiles.remove(next_tile_in_hand)
+                    discard_undo = self.player.apply_discard(next_tile_in_hand)
                     cost_x_ukeire, _ = self._estimate_cost_x_ukeire(best_one, call_riichi=call_riichi)
                     # we reduce tile valuation for atodzuke
                     if result_has_atodzuke:
                         cost_x_ukeire /= 2
                     sum_cost += cost_x_ukeire
-                    self.player.tiles.append(next_tile_in_hand)
+                    self.player.undo_discard(discard_undo)
 
-            self.player.tiles.remove(wait_136)
+            self.player.undo_draw(draw_undo)
 
         discard_option.ukeire_second = sum_tiles
         if discard_option.shanten == 1:
@@ -100,7 +100,7 @@ class ImplementationAI(InterfaceAI):
         )
 
     def try_to_call_meld(self, tile_136, is_kamicha_discard):
-        tiles_136_previous = self.player.tiles[:]
+        tiles_136_previous = list(self.player.tiles)
         tiles_136 = tiles_136_previous + [tile_136]
         self.determine_strategy(tiles_136)
 
@@ -178,7 +178,7 @@ class ImplementationAI(InterfaceAI):
             win_tile += 1
 
         if not tiles:
-            tiles = copy.copy(self.player.tiles)
+            tiles = list(self.player.tiles)
 
         tiles += [win_tile]
 
@@ -237,8 +237,8 @@ class ImplementationAI(InterfaceAI):
 
         closed_hand_34 = TilesConverter.to_34_array(self.player.closed_hand)
 
-        melds_34 = copy.copy(self.player.meld_34_tiles)
-        tiles = copy.copy(self.player.tiles)
+        melds_34 = list(self.player.meld_34_tiles)
+        tiles = list(self.player.tiles)
         closed_hand_tiles = copy.copy(self.player.closed_hand)
 
         new_shanten = 0
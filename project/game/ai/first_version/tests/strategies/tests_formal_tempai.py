@@ -2,7 +2,6 @@
 import unittest
 
 from mahjong.tests_mixin import TestMixin
-from mahjong.tile import Tile
 from mahjong.meld import Meld
 
 from game.ai.first_version.strategies.formal_tempai import FormalTempaiStrategy
@@ -26,13 +25,13 @@ class FormalTempaiStrategyTestCase(unittest.TestCase, TestMixin):
 
         # Let's move to 10th round step
         for _ in range(0, 10):
-            self.player.add_discarded_tile(Tile(0, False))
+            self.player.add_discarded_tile(0, False)
 
         self.assertEqual(strategy.should_activate_strategy(self.player.tiles), False)
 
         # Now we move to 11th turn, we have 2 shanten and no doras,
         # we should go for formal tempai
-        self.player.add_discarded_tile(Tile(0, True))
+        self.player.add_discarded_tile(0, True)
         self.assertEqual(strategy.should_activate_strategy(self.player.tiles), True)
 
     def test_get_tempai(self):
@@ -41,7 +40,7 @@ class FormalTempaiStrategyTestCase(unittest.TestCase, TestMixin):
 
         # Let's move to 15th round step
         for _ in range(0, 15):
-            self.player.add_discarded_tile(Tile(0, False))
+            self.player.add_discarded_tile(0, False)
 
         tile = self._string_to_136_tile(man='8')
         meld, _ = self.player.try_to_call_meld(tile, True)
@@ -61,7 +60,7 @@ class FormalTempaiStrategyTestCase(unittest.TestCase, TestMixin):
 
         # Let's move to 15th round step
         for _ in range(0, 15):
-            self.player.add_discarded_tile(Tile(0, False))
+            self.player.add_discarded_tile(0, False)
 
         self.assertEqual(strategy.should_activate_strategy(self.player.tiles), True)
 
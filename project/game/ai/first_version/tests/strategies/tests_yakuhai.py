@@ -4,7 +4,6 @@ import unittest
 from mahjong.constants import WEST, EAST, SOUTH
 from mahjong.meld import Meld
 from mahjong.tests_mixin import TestMixin
-from mahjong.tile import Tile
 
 from game.ai.first_version.strategies.main import BaseStrategy
 from game.ai.first_version.strategies.yakuhai import YakuhaiStrategy
@@ -204,12 +203,12 @@ class YakuhaiStrategyTestCase(unittest.TestCase, TestMixin):
         self.assertEqual(meld, None)
 
         # one discard == one round step
-        self.player.add_discarded_tile(Tile(0, False))
-        self.player.add_discarded_tile(Tile(0, False))
-        self.player.add_discarded_tile(Tile(0, False))
-        self.player.add_discarded_tile(Tile(0, False))
-        self.player.add_discarded_tile(Tile(0, False))
-        self.player.add_discarded_tile(Tile(0, False))
+        self.player.add_discarded_tile(0, False)
+        self.player.add_discarded_tile(0, False)
+        self.player.add_discarded_tile(0, False)
+        self.player.add_discarded_tile(0, False)
+        self.player.add_discarded_tile(0, False)
+        self.player.add_discarded_tile(0, False)
         self.player.init_hand(tiles)
 
         # after 5 round step we can open hand
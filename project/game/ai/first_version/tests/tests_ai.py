@@ -558,7 +558,7 @@ class AITestCase(unittest.TestCase, TestMixin):
         tiles = self._string_to_136_array(man='56', sou='14578999', pin='666')
         player.init_hand(tiles)
         tile = self._string_to_136_tile(man='7')
-        player.melds.append(self._make_meld(Meld.KAN, False, sou='9999'))
+        player.add_called_meld(self._make_meld(Meld.KAN, False, sou='9999'))
         player.draw_tile(tile)
         player.discard_tile()
 
@@ -593,7 +593,7 @@ class AITestCase(unittest.TestCase, TestMixin):
 
         tiles = self._string_to_136_array(man='333455788899', honors='3')
         player.init_hand(tiles)
-        player.melds.append(self._make_meld(Meld.PON, man='333'))
+        player.add_called_meld(self._make_meld(Meld.PON, man='333'))
 
         tile = self._string_to_136_tile(man='8')
 
@@ -610,7 +610,7 @@ class AITestCase(unittest.TestCase, TestMixin):
 
         tiles = self._string_to_136_array(man='3334557889', honors='333')
         player.init_hand(tiles)
-        player.melds.append(self._make_meld(Meld.PON, man='333'))
+        player.add_called_meld(self._make_meld(Meld.PON, man='333'))
 
         tile = self._string_to_136_tile(honors='3')
 
@@ -5,7 +5,10 @@ from mahjong.constants import EAST, WEST
 from mahjong.meld import Meld
 from mahjong.tests_mixin import TestMixin
 
+from game.ai.mloop.defence.deal_in import wait_probabilities
+from game.ai.mloop.defence.suji import find_suji_mask, suji_to_tiles_mask
 from game.table import Table
+from utils.tiles_mask import tiles_to_mask, mask_to_tiles
 
 
 class DefenceTestCase(unittest.TestCase, TestMixin):
@@ -56,6 +59,20 @@ class DefenceTestCase(unittest.TestCase, TestMixin):
         self.assertEqual(table.get_player(2).temporary_safe_tiles, [5, 6])
         self.assertEqual(table.get_player(3).temporary_safe_tiles, [6])
 
+    def test_safe_tiles_masks(self):
+        table = Table()
+        table.add_called_riichi(2)
+
+        table.add_discarded_tile(1, self._string_to_136_tile(man='3'), False)
+        table.add_discarded_tile(2, self._string_to_136_tile(honors='1'), False)
+
+        self.assertEqual(mask_to_tiles(table.get_player(2).safe_tiles_mask), [2, 27])
+        self.assertEqual(table.get_player(3).all_safe_tiles, [2, 27])
+        self.assertEqual(table.get_player(2).safe_tiles_mask & table.get_player(1).safe_tiles_mask, 1 << 2)
+
+        self.assertEqual(tiles_to_mask([27, 2, 2]), (1 << 2) | (1 << 27))
+        self.assertEqual(mask_to_tiles(0), [])
+
     def test_should_go_for_defence_and_bad_hand(self):
         """
         When we have 13 tiles in hand and someone declared a riichi
@@ -100,6 +117,32 @@ class DefenceTestCase(unittest.TestCase, TestMixin):
         # our hand in tempai, and it has a cost, so let's push it
         self.assertEqual(table.player.ai.defence.should_go_to_defence_mode(), False)
 
+    def test_push_fold_uses_tempai_valuations(self):
+        table = Table()
+
+        tiles = self._string_to_136_array(sou='234678', pin='34789', man='77')
+        table.player.init_hand(tiles)
+        table.player.draw_tile(self._string_to_136_tile(man='6'))
+        table.player.discard_tile()
+
+        table.add_called_riichi(3)
+
+        push_fold = table.player.ai.defence.push_fold
+        self.assertEqual(push_fold.should_fold(), True)
+
+        # costs of our waits are stored and reused by next decisions
+        wait_to_cost = table.player.ai.wait_to_cost
+        self.assertEqual(sorted(wait_to_cost.keys()), [self._string_to_34_tile(pin='2'),
+                                                       self._string_to_34_tile(pin='5')])
+        for wait in wait_to_cost:
+            wait_to_cost[wait] = 12000
+
+        # decision is not changed until our hand or threat state is changed
+        self.assertEqual(push_fold.should_fold(), True)
+
+        table.add_called_riichi(2)
+        self.assertEqual(push_fold.should_fold(), False)
+
     def test_call_riichi_with_good_wait_against_other_player_riichi(self):
         table = Table()
         table.has_aka_dora = True
@@ -210,6 +253,25 @@ class DefenceTestCase(unittest.TestCase, TestMixin):
         self.assertEqual(table.player.ai.in_defence, True)
         self.assertEqual(self._to_string([result]), '4m')
 
+    def test_find_tile_to_discard_by_deal_in_probability(self):
+        table = Table()
+        table.init_round(0, 0, 0, self._string_to_136_tile(honors='3'), 2, [])
+
+        table.add_discarded_tile(1, self._string_to_136_tile(man='4'), False)
+        table.add_discarded_tile(1, self._string_to_136_tile(man='5'), False)
+        table.add_discarded_tile(2, self._string_to_136_tile(man='8'), False)
+        table.add_discarded_tile(2, self._string_to_136_tile(man='9'), False)
+        table.add_called_riichi(1)
+        table.add_called_riichi(2)
+        table.get_player(1).temporary_safe_tiles = []
+        table.get_player(2).temporary_safe_tiles = []
+
+        table.player.init_hand(self._string_to_136_array(sou='2234678', pin='34', man='45789'))
+        table.player.ai.defence.deal_in_order = True
+        result = table.player.discard_tile()
+        # 8m and 9m are safe against the dealer, but 8m is suji against the first player
+        self.assertEqual(self._to_string([result]), '8m')
+
     def test_try_to_discard_not_needed_tiles_first_in_defence_mode(self):
         table = Table()
 
@@ -320,6 +382,23 @@ class DefenceTestCase(unittest.TestCase, TestMixin):
 
         self.assertEqual(self._to_string([x.value * 4 for x in result]), '45p')
 
+    def test_kabe_masks(self):
+        table = Table()
+        tiles = self._string_to_136_array(pin='2222', sou='444555')
+        table.player.init_hand(tiles)
+        table.add_discarded_tile(1, self._string_to_136_tile(sou='4'), False)
+
+        kabe = table.player.ai.defence.kabe
+        strong_mask, weak_mask, partial_mask = kabe.find_kabe_masks(table.player.tiles_34)
+
+        self.assertEqual(self._to_string([x * 4 for x in mask_to_tiles(strong_mask)]), '1p')
+        self.assertEqual(self._to_string([x * 4 for x in mask_to_tiles(weak_mask)]), '23s')
+        # three visible fives
+        self.assertEqual(self._to_string([x * 4 for x in mask_to_tiles(partial_mask)]), '7s')
+
+        all_kabe = kabe.find_all_kabe(table.player.tiles_34)
+        self.assertEqual([x.tile_34 for x in all_kabe], mask_to_tiles(strong_mask | weak_mask | partial_mask))
+
     def test_find_common_suji_tiles_to_discard_for_multiple_players(self):
         table = Table()
 
@@ -351,6 +430,113 @@ class DefenceTestCase(unittest.TestCase, TestMixin):
 
         self.assertEqual(self._to_string([result]), '5m')
 
+    def test_suji_masks(self):
+        safe_tiles = self._to_34_array(self._string_to_136_array(man='4', pin='28', sou='19', honors='1'))
+        safe_tiles = [x for x in range(0, 34) if safe_tiles[x]]
+
+        # 1-4-7 man and double 2-5-8 pin, 1 and 9 sou are not a double suji
+        suji_mask = find_suji_mask(tiles_to_mask(safe_tiles))
+        self.assertEqual(self._to_string([x * 4 for x in mask_to_tiles(suji_mask)]), '1m2p')
+        self.assertEqual(
+            self._to_string([x * 4 for x in mask_to_tiles(suji_to_tiles_mask(suji_mask))]),
+            '147m258p'
+        )
+
+        table = Table()
+        suji = table.player.ai.defence.suji
+        table.add_discarded_tile(0, self._string_to_136_tile(sou='6'), False)
+        self.assertEqual(self._to_string([x * 4 for x in suji.find_suji_against_self(table.player)]), '369s')
+
+        table.add_discarded_tile(0, self._string_to_136_tile(man='5'), False)
+        self.assertEqual(
+            self._to_string([x * 4 for x in suji.find_suji_against_self(table.player)]),
+            '258m369s'
+        )
+
+    def test_danger_map(self):
+        table = Table()
+        table.add_dora_indicator(self._string_to_136_tile(man='8'))
+        table.player.init_hand(self._string_to_136_array(man='1469', pin='123', sou='456', honors='1122'))
+
+        table.add_discarded_tile(2, self._string_to_136_tile(man='3'), False)
+        table.add_discarded_tile(2, self._string_to_136_tile(honors='1'), False)
+        table.add_discarded_tile(1, self._string_to_136_tile(man='6'), False)
+        table.add_called_riichi(1)
+        table.add_called_riichi(2)
+
+        defence = table.player.ai.defence
+        defence.closed_hand_34 = table.player.closed_hand_34
+        danger_map = defence.danger_map
+        first_enemy, second_enemy = defence._get_threatening_players()
+
+        first_danger = danger_map.enemy_danger(first_enemy)
+        second_danger = danger_map.enemy_danger(second_enemy)
+        self.assertEqual(first_danger[self._string_to_34_tile(man='6')], 0)
+        # 3 man is suji, 9 man is suji and dora
+        self.assertEqual(first_danger[self._string_to_34_tile(man='3')], 40)
+        self.assertEqual(first_danger[self._string_to_34_tile(man='9')], 120)
+        # we see three of east and two of south
+        self.assertEqual(first_danger[self._string_to_34_tile(honors='1')], 10)
+        self.assertEqual(first_danger[self._string_to_34_tile(honors='2')], danger_map.NO_INFO)
+        self.assertEqual(second_danger[self._string_to_34_tile(honors='1')], 0)
+
+        common_danger = danger_map.common_danger([first_danger, second_danger])
+        self.assertEqual(common_danger[self._string_to_34_tile(man='1')], danger_map.NO_INFO)
+        self.assertEqual(common_danger[self._string_to_34_tile(man='3')], 40)
+        self.assertEqual(common_danger[self._string_to_34_tile(man='9')], 120)
+        self.assertEqual(common_danger[self._string_to_34_tile(honors='1')], 10)
+
+    def test_deal_in_probabilities(self):
+        table = Table()
+        table.player.init_hand(self._string_to_136_array(man='1199', pin='123', sou='456', honors='1111'))
+
+        table.add_discarded_tile(1, self._string_to_136_tile(man='4'), False)
+        table.add_called_riichi(1)
+
+        defence = table.player.ai.defence
+        enemy = defence._get_threatening_players()[0]
+        probabilities = defence.deal_in.deal_in_probabilities(enemy)
+
+        self.assertEqual(probabilities[self._string_to_34_tile(man='4')], 0)
+        # we have all east tiles, so enemy can't wait on them
+        self.assertEqual(probabilities[self._string_to_34_tile(honors='1')], 0)
+        # 1 man can't be ryanmen wait and we have two of them
+        self.assertTrue(
+            probabilities[self._string_to_34_tile(man='1')] < probabilities[self._string_to_34_tile(man='2')]
+        )
+        self.assertTrue(
+            probabilities[self._string_to_34_tile(man='2')] < probabilities[self._string_to_34_tile(pin='5')]
+        )
+        self.assertTrue(0 < probabilities.max() < 1)
+
+        # 5 pin was passed after riichi
+        table.add_discarded_tile(2, self._string_to_136_tile(pin='5'), False)
+        self.assertEqual(defence.deal_in.deal_in_probabilities(enemy)[self._string_to_34_tile(pin='5')], 0)
+
+        # the same estimation without the defence handler state
+        live_tiles = table.player.live_tiles()
+        probabilities = wait_probabilities(enemy.all_safe_tiles_mask, live_tiles)
+        self.assertEqual(probabilities.tolist(), defence.deal_in.deal_in_probabilities(enemy).tolist())
+        self.assertEqual(defence.deal_in_probabilities()[self._string_to_34_tile(pin='5')], 0)
+
+    def test_deal_in_probabilities_against_honitsu(self):
+        table = Table()
+        table.player.init_hand(self._string_to_136_array(man='1199', pin='123', sou='456', honors='111'))
+
+        enemy_seat = 2
+        table.add_called_meld(enemy_seat, self._make_meld(Meld.CHI, pin='567'))
+        table.add_called_meld(enemy_seat, self._make_meld(Meld.PON, pin='888'))
+        table.add_called_meld(enemy_seat, self._make_meld(Meld.PON, honors='666'))
+
+        defence = table.player.ai.defence
+        enemy = defence._get_threatening_players()[0]
+        probabilities = defence.deal_in.deal_in_probabilities(enemy)
+
+        self.assertEqual(probabilities[:9].sum(), 0)
+        self.assertEqual(probabilities[18:27].sum(), 0)
+        self.assertTrue(probabilities[self._string_to_34_tile(pin='4')] > 0)
+        self.assertTrue(probabilities[self._string_to_34_tile(honors='7')] > 0)
+
     def test_dont_discard_safe_tiles_when_call_riichi(self):
         table = Table()
         table.count_of_remaining_tiles = 70
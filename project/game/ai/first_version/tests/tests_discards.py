@@ -4,7 +4,6 @@ import unittest
 from mahjong.constants import EAST, SOUTH, WEST, NORTH, HAKU, HATSU, CHUN, FIVE_RED_SOU, FIVE_RED_PIN
 from mahjong.tests_mixin import TestMixin
 from mahjong.meld import Meld
-from mahjong.tile import Tile
 
 from game.ai.discard import DiscardOption
 from game.ai.first_version.strategies.main import BaseStrategy
@@ -191,6 +190,24 @@ class DiscardLogicTestCase(unittest.TestCase, TestMixin):
         option = DiscardOption(player, tile, 0, [], 0)
         self.assertEqual(option.valuation, 140)
 
+    def test_discard_option_value_is_calculated_on_access(self):
+        table = Table()
+        table.has_aka_dora = True
+        player = table.player
+        player.init_hand(self._string_to_136_array(sou='123', pin='55', man='456'))
+
+        tile = self._string_to_34_tile(pin='5')
+        option = DiscardOption(player, tile, 0, [], 0)
+
+        # option uses the hand from the moment when it was created
+        player.init_hand([FIVE_RED_PIN])
+        self.assertEqual(option.count_of_dora, 0)
+        self.assertEqual(option.valuation, 130)
+
+        option = DiscardOption(player, tile, 0, [], 0)
+        self.assertEqual(option.count_of_dora, 1)
+        self.assertFalse(hasattr(option, '__dict__'))
+
     def test_discard_not_valuable_honor_first(self):
         table = Table()
         player = table.player
@@ -574,7 +591,7 @@ class DiscardLogicTestCase(unittest.TestCase, TestMixin):
         player.init_hand(tiles)
 
         for tile in suji_tiles:
-            player.add_discarded_tile(Tile(tile, True))
+            player.add_discarded_tile(tile, True)
 
         player.draw_tile(tile_to_draw)
         discarded_tile = player.discard_tile()
@@ -659,7 +676,7 @@ class DiscardLogicTestCase(unittest.TestCase, TestMixin):
 
         player.init_hand(tiles)
 
-        player.add_discarded_tile(Tile(furiten_tile, True))
+        player.add_discarded_tile(furiten_tile, True)
 
         for _ in range(0, 2):
             table.add_discarded_tile(1, other_tile, False)
@@ -693,7 +710,7 @@ class DiscardLogicTestCase(unittest.TestCase, TestMixin):
 
         player.init_hand(tiles)
 
-        player.add_discarded_tile(Tile(furiten_tile, True))
+        player.add_discarded_tile(furiten_tile, True)
 
         for _ in range(0, 3):
             table.add_discarded_tile(1, karaten_tile, False)
@@ -831,3 +848,32 @@ class DiscardLogicTestCase(unittest.TestCase, TestMixin):
         discarded_tile = discard_option.find_tile_in_hand(player.closed_hand)
 
         self.assertEqual(self._to_string([discarded_tile]), '7m')
+
+    def test_calculate_waits_for_chiitoitsu_and_kokushi(self):
+        table = Table()
+        hand_builder = table.player.ai.hand_builder
+
+        tiles_34 = self._string_to_34_array(sou='1199', pin='1199', man='119', honors='11')
+        waiting, shanten = hand_builder.calculate_waits(tiles_34, [])
+        self.assertEqual(shanten, 0)
+        self.assertEqual(self._to_string([x * 4 for x in waiting]), '9m')
+
+        tiles_34 = self._string_to_34_array(sou='19', pin='19', man='1', honors='12345677')
+        waiting, shanten = hand_builder.calculate_waits(tiles_34, [])
+        self.assertEqual(shanten, 0)
+        self.assertEqual(self._to_string([x * 4 for x in waiting]), '9m')
+
+        tiles_34 = self._string_to_34_array(sou='123456789', pin='123', man='1')
+        waiting, shanten = hand_builder.calculate_waits(tiles_34, [])
+        self.assertEqual(shanten, 0)
+        self.assertEqual(self._to_string([x * 4 for x in waiting]), '1m')
+
+    def test_calculate_waits_with_four_identical_tiles(self):
+        table = Table()
+        hand_builder = table.player.ai.hand_builder
+
+        # we can't wait for the fifth 1m, so any far tile will give us tanki wait
+        tiles_34 = self._string_to_34_array(man='1111456677889')
+        waiting, shanten = hand_builder.calculate_waits(tiles_34, [])
+        self.assertEqual(shanten, 1)
+        self.assertEqual(len(waiting), 33)
@@ -59,3 +59,25 @@ class EnemyAnalyzerTestCase(unittest.TestCase, TestMixin):
 
         self.assertEqual(EnemyAnalyzer(table.get_player(1)).is_threatening, True)
         self.assertEqual(EnemyAnalyzer(table.get_player(1)).chosen_suit, is_pin)
+
+    def test_threat_state_is_kept_between_turns(self):
+        table = Table()
+        table.init_round(0, 0, 0, self._string_to_136_tile(man='1'), 1, [250, 250, 250, 250])
+        defence = table.player.ai.defence
+
+        enemy = defence.analyzed_enemies[0]
+        self.assertIs(defence.analyzed_enemies[0], enemy)
+        self.assertEqual(enemy.is_threatening, False)
+        self.assertEqual(enemy.threat_score, 0)
+        threat_version = enemy.threat_version
+        self.assertEqual(enemy.threat_version, threat_version)
+
+        table.add_called_meld(1, self._make_meld(Meld.PON, man='222'))
+        self.assertNotEqual(enemy.threat_version, threat_version)
+        self.assertEqual(enemy.is_threatening, True)
+        # dealer hand with three dora
+        self.assertEqual(enemy.threat_score, 4.5)
+
+        table.add_called_riichi(2)
+        self.assertEqual(defence.analyzed_enemies[1].threat_score, 2)
+        self.assertEqual([x.player.seat for x in defence._get_threatening_players()], [1, 2])
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from mahjong.hand_calculating.divider import HandDivider
+from mahjong.tests_mixin import TestMixin
+
+from game.ai.hand_divider import CachedHandDivider
+from game.ai.hand_key import pack_melds_34, pack_tiles_34, TILE_WEIGHTS
+from game.table import Table
+from utils.cache import LRUCache
+
+
+class HandCacheTestCase(unittest.TestCase, TestMixin):
+
+    def test_pack_hand_key(self):
+        tiles = self._string_to_34_array(sou='123', pin='555', man='19', honors='77')
+        open_sets = [self._string_to_open_34_set(pin='555')]
+
+        self.assertEqual(pack_melds_34(open_sets), pack_melds_34([[13, 13, 13]]))
+        self.assertNotEqual(pack_melds_34(open_sets), pack_melds_34([]))
+        self.assertEqual(pack_melds_34(None), ())
+
+        other_tiles = self._string_to_34_array(sou='123', pin='555', man='19', honors='7')
+        self.assertNotEqual(pack_tiles_34(tiles), pack_tiles_34(other_tiles))
+
+        # key of the hand with drawn tile
+        tile = self._string_to_34_tile(honors='7')
+        self.assertEqual(pack_tiles_34(other_tiles) + TILE_WEIGHTS[tile], pack_tiles_34(tiles))
+
+    def test_lru_cache(self):
+        cache = LRUCache(2)
+
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+
+        # "b" is the least recently used item
+        cache.set('c', 3)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('c'), 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_hand_cache_is_used_for_waits(self):
+        table = Table()
+        player = table.player
+        player.ai.hand_cache = LRUCache(1000)
+
+        tiles_34 = self._string_to_34_array(sou='123456789', pin='123', man='1')
+        player.ai.hand_builder.calculate_waits(tiles_34, [])
+        misses = player.ai.hand_cache.misses
+
+        self.assertEqual(player.ai.hand_cache.hits, 0)
+        self.assertEqual(len(player.ai.hand_cache), misses)
+
+        player.ai.hand_builder.calculate_waits(tiles_34, [])
+        self.assertEqual(player.ai.hand_cache.hits, misses)
+        self.assertEqual(player.ai.hand_cache.misses, misses)
+
+    def test_waits_memo_is_shared_between_discard_options(self):
+        table = Table()
+        player = table.player
+        hand_builder = player.ai.hand_builder
+
+        tiles = self._string_to_136_array(sou='12355689', man='2345', honors='55')
+        player.init_hand(tiles)
+        hand_builder.find_discard_options(tiles, tiles)
+        memo_size = len(hand_builder.waits_memo)
+        # one 13 tiles hand for each kind of tile in the hand
+        self.assertEqual(memo_size, 12)
+
+        # discard 1s, draw 2m, discard 9s is the same hand as discard 9s, draw 2m, discard 1s
+        first_hand = self._string_to_136_array(sou='2355689', man='22345', honors='55')
+        second_hand = self._string_to_136_array(sou='1235568', man='22345', honors='55')
+        hand_builder.find_discard_options(first_hand, first_hand)
+        memo_size = len(hand_builder.waits_memo)
+        hand_builder.find_discard_options(second_hand, second_hand)
+        self.assertLess(len(hand_builder.waits_memo) - memo_size, 11)
+
+        # memo is erased before the new decision
+        hand_builder.waits_memo['test'] = ([], 0)
+        player.ai.discard_tile(None)
+        self.assertNotIn('test', hand_builder.waits_memo)
+
+    def test_hand_value_cache(self):
+        table = Table()
+        table.has_aka_dora = False
+        player = table.player
+        player.init_hand(self._string_to_136_array(sou='123789', pin='456', man='4577'))
+
+        win_tile = self._string_to_34_tile(man='6')
+        result = player.ai.estimate_hand_value(win_tile, call_riichi=True)
+        self.assertEqual(result.han, 2)
+        self.assertEqual(player.ai.estimate_hand_value(win_tile, call_riichi=True), result)
+        self.assertEqual(player.ai.hand_value_cache.hits, 1)
+
+        # config flags are the part of the key
+        self.assertEqual(player.ai.estimate_hand_value(win_tile, call_riichi=False).han, 1)
+        self.assertEqual(player.ai.hand_value_cache.hits, 1)
+
+        # cache is erased after new dora indicator
+        table.add_dora_indicator(self._string_to_136_tile(man='5'))
+        self.assertEqual(player.ai.estimate_hand_value(win_tile, call_riichi=True).han, 3)
+        self.assertEqual(len(player.ai.hand_value_cache), 1)
+
+    def test_hand_divider_cache(self):
+        divider = CachedHandDivider(1000)
+
+        tiles_34 = self._string_to_34_array(sou='123123', pin='123', man='12355')
+        self.assertEqual(divider.divide_hand(tiles_34), HandDivider().divide_hand(tiles_34))
+        misses = divider.suits_cache.misses
+
+        # the same sets in other suits are taken from the cache
+        tiles_34 = self._string_to_34_array(man='123123', sou='123', pin='12355')
+        self.assertEqual(divider.divide_hand(tiles_34), HandDivider().divide_hand(tiles_34))
+        self.assertEqual(divider.suits_cache.misses, misses)
+
+        tiles_34 = self._string_to_34_array(sou='12345')
+        self.assertEqual(
+            divider.find_valid_combinations(tiles_34, 19, 22, True),
+            HandDivider().find_valid_combinations(tiles_34, 19, 22, True)
+        )
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from mahjong.meld import Meld
+from mahjong.tests_mixin import TestMixin
+
+from game.ai.hand_state import HandState
+from game.table import Table
+
+
+class HandStateTestCase(unittest.TestCase, TestMixin):
+
+    def test_derived_snapshots(self):
+        table = Table()
+        player = table.player
+        tiles = self._string_to_136_array(sou='123456', pin='456', man='45677')
+        player.init_hand(tiles)
+        meld = self._make_meld(Meld.CHI, sou='123')
+        player.add_called_meld(meld)
+
+        hand_state = HandState.from_player(player)
+        self.assertTrue(hand_state.is_open_hand)
+        self.assertEqual(len(hand_state.closed_hand), 11)
+
+        tile = self._string_to_136_tile(man='4')
+        state_after_discard = hand_state.discard(tile)
+        self.assertTrue(state_after_discard.is_furiten(self._string_to_34_tile(man='4')))
+        self.assertFalse(hand_state.is_furiten(self._string_to_34_tile(man='4')))
+        self.assertEqual(len(state_after_discard.closed_hand), 10)
+
+        state_after_draw = state_after_discard.with_tile(tile)
+        self.assertEqual(sorted(state_after_draw.tiles), sorted(hand_state.tiles))
+
+        # player hand is not changed
+        self.assertEqual(len(player.tiles), 14)
+        self.assertEqual(player.discards, [])
+
+    def test_furiten_uses_river_mask(self):
+        table = Table()
+        player = table.player
+        player.init_hand(self._string_to_136_array(sou='123456', pin='456', man='45677'))
+        table.add_discarded_tile(0, self._string_to_136_tile(man='7'), False)
+
+        hand_state = HandState.from_player(player)
+        self.assertEqual(hand_state.discards_mask, player.river.tiles_34_mask)
+        self.assertTrue(hand_state.is_furiten(self._string_to_34_tile(man='7')))
+
+        hand_builder = player.ai.hand_builder
+        discard_options, _ = hand_builder.find_discard_options(player.tiles, player.closed_hand, player.melds)
+        discard_options = dict([(x.tile_to_discard, x) for x in discard_options])
+        # 4 man discard waits for 4 and 7 man, 5 man discard waits for 5 man
+        self.assertTrue(hand_builder._is_discard_option_furiten(discard_options[self._string_to_34_tile(man='4')]))
+        self.assertFalse(hand_builder._is_discard_option_furiten(discard_options[self._string_to_34_tile(man='5')]))
+
+        state_after_discard = hand_state.discard(self._string_to_136_tile(man='4'))
+        self.assertTrue(hand_builder._is_waiting_furiten(self._string_to_34_tile(man='4'), state_after_discard))
+
+    def test_hand_evaluation_does_not_change_player_state(self):
+        table = Table()
+        player = table.player
+        tiles = self._string_to_136_array(sou='123789', pin='456', man='4577')
+        player.init_hand(tiles)
+        player.draw_tile(self._string_to_136_tile(pin='1'))
+
+        tiles_before = player.tiles
+        player.ai.hand_builder.choose_tile_to_discard(player.tiles, player.closed_hand, player.melds)
+
+        self.assertEqual(player.tiles, tiles_before)
+        self.assertEqual(player.discards, [])
+
+        # hand evaluation without the player state
+        hand_state = HandState.from_player(player).discard(self._string_to_136_tile(pin='1'))
+        hand_value = player.ai.estimate_hand_value(
+            self._string_to_34_tile(man='6'),
+            call_riichi=True,
+            hand_state=hand_state
+        )
+        self.assertEqual(hand_value.han, 2)
+        self.assertEqual(player.tiles, tiles_before)
@@ -2,7 +2,6 @@
 import unittest
 
 from mahjong.tests_mixin import TestMixin
-from mahjong.tile import Tile
 
 from game.table import Table
 
@@ -178,7 +177,7 @@ class CallRiichiTestCase(unittest.TestCase, TestMixin):
 
         tiles = self._string_to_136_array(man='22336688', sou='9', pin='99', honors='22')
         self.player.init_hand(tiles)
-        self.player.add_discarded_tile(Tile(self._string_to_136_tile(sou='6'), True))
+        self.player.add_discarded_tile(self._string_to_136_tile(sou='6'), True)
 
         self.player.draw_tile(self._string_to_136_tile(honors='3'))
         self.player.discard_tile()
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import numpy as np
+from mahjong.shanten import Shanten
+from mahjong.tests_mixin import TestMixin
+
+from game.ai.shanten import TableShanten, DecompositionTable, find_neighbour_tiles, load_tables
+
+
+class TableShantenTestCase(unittest.TestCase, TestMixin):
+
+    def test_regular_shanten(self):
+        shanten = TableShanten()
+
+        tiles = self._string_to_34_array(sou='111234567', pin='11', man='567')
+        self.assertEqual(shanten.calculate_shanten(tiles), Shanten.AGARI_STATE)
+
+        tiles = self._string_to_34_array(sou='111345677', pin='11', man='567')
+        self.assertEqual(shanten.calculate_shanten(tiles), 0)
+
+        tiles = self._string_to_34_array(sou='111345677', pin='15', man='567')
+        self.assertEqual(shanten.calculate_shanten(tiles), 1)
+
+        tiles = self._string_to_34_array(sou='11134567', pin='15', man='1578')
+        self.assertEqual(shanten.calculate_shanten(tiles), 2)
+
+        tiles = self._string_to_34_array(sou='113456', pin='1358', man='1358')
+        self.assertEqual(shanten.calculate_shanten(tiles), 3)
+
+        tiles = self._string_to_34_array(sou='1589', pin='13588', man='1358', honors='1')
+        self.assertEqual(shanten.calculate_shanten(tiles), 4)
+
+    def test_shanten_with_four_identical_tiles(self):
+        shanten = TableShanten()
+
+        # we can't wait for the fifth tile
+        tiles = self._string_to_34_array(sou='1111', man='123456789')
+        self.assertEqual(shanten.calculate_shanten(tiles), 1)
+        self.assertEqual(Shanten().calculate_shanten(tiles), 0)
+
+        tiles = self._string_to_34_array(man='1111456677889')
+        self.assertEqual(shanten.calculate_shanten(tiles), 1)
+
+        tiles = self._string_to_34_array(sou='11112222333444')
+        self.assertEqual(shanten.calculate_shanten(tiles), Shanten.AGARI_STATE)
+
+    def test_shanten_with_open_sets(self):
+        shanten = TableShanten()
+
+        tiles = self._string_to_34_array(sou='23455567', pin='555', honors='11')
+        open_sets = [self._string_to_open_34_set(pin='555')]
+        self.assertEqual(shanten.calculate_shanten(tiles, open_sets), 0)
+
+        tiles = self._string_to_34_array(sou='1234', pin='555', man='123', honors='123')
+        open_sets = [self._string_to_open_34_set(pin='555'), self._string_to_open_34_set(man='123')]
+        self.assertEqual(shanten.calculate_shanten(tiles, open_sets), 2)
+
+    def test_all_hand_forms_in_one_call(self):
+        shanten = TableShanten()
+
+        tiles = self._string_to_34_array(sou='114477', pin='114477', man='7')
+        self.assertEqual(shanten.calculate_shanten_for_hand(tiles), (3, 0, 10))
+
+        tiles = self._string_to_34_array(sou='19', pin='19', man='19', honors='1234567')
+        self.assertEqual(shanten.calculate_shanten_for_hand(tiles), (8, 6, 0))
+
+        tiles = self._string_to_34_array(sou='114477', pin='114477', man='77')
+        self.assertEqual(shanten.calculate_shanten(tiles), Shanten.AGARI_STATE)
+        self.assertEqual(shanten.calculate_shanten(tiles, chiitoitsu=False), 3)
+
+        # chiitoitsu and kokushi are not possible with opened hand
+        tiles = self._string_to_34_array(sou='1144', pin='1144', man='777', honors='11')
+        open_sets = [self._string_to_open_34_set(man='777')]
+        self.assertEqual(
+            shanten.calculate_shanten_for_hand(tiles, open_sets),
+            (2, TableShanten.NOT_AVAILABLE, TableShanten.NOT_AVAILABLE)
+        )
+
+    def test_shanten_is_the_same_as_in_the_library(self):
+        table_shanten = TableShanten()
+        shanten = Shanten()
+
+        hands = [
+            self._string_to_34_array(sou='123456789', pin='1239'),
+            self._string_to_34_array(sou='2345', pin='2344', man='23456'),
+            self._string_to_34_array(sou='1357', pin='2468', man='13579'),
+            self._string_to_34_array(sou='11223344556677'),
+            self._string_to_34_array(man='1112345678999', pin='5'),
+            self._string_to_34_array(man='159', pin='159', sou='159', honors='1234'),
+        ]
+
+        for tiles in hands:
+            self.assertEqual(table_shanten.calculate_shanten(tiles), shanten.calculate_shanten(tiles))
+            self.assertEqual(
+                table_shanten.calculate_shanten(tiles, chiitoitsu=False),
+                shanten.calculate_shanten(tiles, chiitoitsu=False)
+            )
+
+    def test_batch_shanten_is_the_same_as_for_one_hand(self):
+        shanten = TableShanten()
+
+        hands = [
+            self._string_to_34_array(sou='114477', pin='114477', man='7'),
+            self._string_to_34_array(sou='19', pin='19', man='19', honors='1234567'),
+            self._string_to_34_array(sou='111345677', pin='11', man='567'),
+            self._string_to_34_array(sou='11112222333444'),
+        ]
+        regular, chiitoitsu, kokushi = shanten.calculate_shanten_batch(np.array(hands))
+        for index, tiles in enumerate(hands):
+            self.assertEqual(
+                (regular[index], chiitoitsu[index], kokushi[index]),
+                shanten.calculate_shanten_for_hand(tiles)
+            )
+
+        hands = [
+            self._string_to_34_array(sou='23455567', pin='555', honors='11'),
+            self._string_to_34_array(sou='2345567', pin='555', honors='127'),
+        ]
+        open_sets = [self._string_to_open_34_set(pin='555')]
+        regular, chiitoitsu, kokushi = shanten.calculate_shanten_batch(np.array(hands), open_sets)
+        for index, tiles in enumerate(hands):
+            self.assertEqual(
+                (regular[index], chiitoitsu[index], kokushi[index]),
+                shanten.calculate_shanten_for_hand(tiles, open_sets)
+            )
+
+    def test_precomputed_summaries(self):
+        table = DecompositionTable(7, with_chi=False)
+        precomputed_table = DecompositionTable(7, with_chi=False)
+        precomputed_table.attach(table.build_summaries())
+
+        tiles = self._string_to_34_array(honors='1123337')
+        key = table.pack_key(tiles, 27)
+        self.assertEqual(precomputed_table.get(key), table.get(key))
+        self.assertEqual(
+            precomputed_table.get_many(np.array([key, 0])).tolist(),
+            [list(table.get(key)), list(table.get(0))]
+        )
+
+        # we don't save suits with too many tiles, they are calculated on the fly
+        tiles = self._string_to_34_array(honors='111122223333444')
+        key = table.pack_key(tiles, 27)
+        self.assertEqual(precomputed_table.get(key), table.get(key))
+
+        self.assertFalse(load_tables('not_existing_file.bin'))
+
+    def test_find_neighbour_tiles(self):
+        tiles = self._string_to_34_array(man='1', pin='5', sou='9', honors='1')
+        self.assertEqual(
+            self._to_string([x * 4 for x in find_neighbour_tiles(tiles)]),
+            '123m34567p789s1z'
+        )
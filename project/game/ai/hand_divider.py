@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from mahjong.hand_calculating.divider import HandDivider
+
+from utils.cache import LRUCache
+
+
+class CachedHandDivider(HandDivider):
+    """
+    Hand divider that remembers sets combinations for each suit.
+
+    Divisions of the whole hand are built by the base class from suit parts,
+    and hands that we check during one decision differ only in one or two suits,
+    so most of the parts are taken from the cache
+    """
+
+    def __init__(self, capacity=10000):
+        self.suits_cache = LRUCache(capacity)
+
+    def find_valid_combinations(self, tiles_34, first_index, second_index, hand_not_completed=False):
+        # chi sets are possible only inside one suit, so we can't cache mixed ranges
+        if first_index // 9 != second_index // 9 or second_index >= 27:
+            return super(CachedHandDivider, self).find_valid_combinations(
+                tiles_34,
+                first_index,
+                second_index,
+                hand_not_completed
+            )
+
+        suit_tiles = tuple(tiles_34[first_index:second_index + 1])
+        key = (suit_tiles, hand_not_completed)
+
+        combinations = self.suits_cache.get(key)
+        if combinations is None:
+            # tiles are shifted to the start of the man suit,
+            # so the same tiles from all suits will share one cache item
+            combinations = super(CachedHandDivider, self).find_valid_combinations(
+                list(suit_tiles) + [0] * (34 - len(suit_tiles)),
+                0,
+                second_index - first_index,
+                hand_not_completed
+            )
+            self.suits_cache.set(key, combinations)
+
+        # cached lists shouldn't be shared with the caller
+        return [[[x + first_index for x in item] for item in combination] for combination in combinations]
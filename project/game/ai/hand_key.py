@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+# weight of each tile in the packed hand key
+TILE_WEIGHTS = [5 ** x for x in range(0, 34)]
+
+
+def pack_tiles_34(tiles_34):
+    """
+    Pack 34 tiles counts (0-4 each) into a single base-5 integer
+    :param tiles_34: 34 tiles format array
+    :return: int
+    """
+    key = 0
+    for tile in range(33, -1, -1):
+        key = key * 5 + tiles_34[tile]
+    return key
+
+
+def pack_melds_34(open_sets_34):
+    """
+    :param open_sets_34: array of array of 34 tiles format
+    :return: tuple with one integer for each meld
+    """
+    if not open_sets_34:
+        return ()
+
+    return tuple([meld[0] * 34 * 34 + meld[1] * 34 + meld[2] for meld in open_sets_34])
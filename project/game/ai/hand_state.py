@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+from mahjong.constants import CHUN, HAKU, HATSU
+
+from utils.tiles_mask import tiles_to_mask
+
+
+class HandState(object):
+    """
+    Immutable snapshot of the player hand with the table context
+    that is needed to evaluate it.
+
+    Hypothetical hands are derived snapshots (with_tile(), without_tile(), discard()),
+    so we don't need to change and restore the player state to evaluate them
+    """
+    __slots__ = (
+        'tiles',
+        'melds',
+        'discards',
+        'discards_mask',
+        'player_wind',
+        'round_wind',
+        'dora_indicators',
+        'has_aka_dora',
+        'has_open_tanyao',
+    )
+
+    def __init__(self, tiles, melds, discards, player_wind, round_wind, dora_indicators,
+                 has_aka_dora, has_open_tanyao, discards_mask=None):
+        """
+        :param tiles: tiles in 136 format, with tiles from melds
+        :param melds: array of Meld objects
+        :param discards: discarded tiles in 136 format
+        :param discards_mask: mask of discarded tiles in 34 format, it is built from discards by default
+        """
+        self.tiles = tuple(tiles)
+        self.melds = tuple(melds)
+        self.discards = tuple(discards)
+        if discards_mask is None:
+            discards_mask = tiles_to_mask([x // 4 for x in self.discards])
+        self.discards_mask = discards_mask
+        self.player_wind = player_wind
+        self.round_wind = round_wind
+        self.dora_indicators = tuple(dora_indicators)
+        self.has_aka_dora = has_aka_dora
+        self.has_open_tanyao = has_open_tanyao
+
+    def __repr__(self):
+        return 'HandState(tiles={}, melds={})'.format(list(self.tiles), list(self.melds))
+
+    @classmethod
+    def from_player(cls, player, tiles=None, melds=None):
+        """
+        :param player: Player object
+        :param tiles: tiles in 136 format, to replace player tiles
+        :param melds: array of Meld objects, to replace player melds
+        :return: HandState
+        """
+        table = player.table
+        return cls(
+            tiles=player.tiles if tiles is None else tiles,
+            melds=player.melds if melds is None else melds,
+            discards=player.river.tiles.tolist(),
+            discards_mask=player.river.tiles_34_mask,
+            player_wind=player.player_wind,
+            round_wind=table.round_wind_tile,
+            dora_indicators=table.dora_indicators,
+            has_aka_dora=table.has_aka_dora,
+            has_open_tanyao=table.has_open_tanyao,
+        )
+
+    def _derive(self, tiles=None, discards=None, discards_mask=None):
+        return HandState(
+            tiles=self.tiles if tiles is None else tiles,
+            melds=self.melds,
+            discards=self.discards if discards is None else discards,
+            discards_mask=self.discards_mask if discards_mask is None else discards_mask,
+            player_wind=self.player_wind,
+            round_wind=self.round_wind,
+            dora_indicators=self.dora_indicators,
+            has_aka_dora=self.has_aka_dora,
+            has_open_tanyao=self.has_open_tanyao,
+        )
+
+    def with_tile(self, tile):
+        """
+        :param tile: 136 format tile
+        :return: new snapshot with added tile
+        """
+        return self._derive(tiles=self.tiles + (tile,))
+
+    def without_tile(self, tile):
+        """
+        :param tile: 136 format tile
+        :return: new snapshot without the tile
+        """
+        tiles = list(self.tiles)
+        tiles.remove(tile)
+        return self._derive(tiles=tiles)
+
+    def discard(self, tile):
+        """
+        The same as without_tile(), but tile will be added to the discards
+        :param tile: 136 format tile
+        :return: new snapshot
+        """
+        tiles = list(self.tiles)
+        tiles.remove(tile)
+        return self._derive(
+            tiles=tiles,
+            discards=self.discards + (tile,),
+            discards_mask=self.discards_mask | 1 << (tile // 4)
+        )
+
+    @property
+    def meld_tiles(self):
+        result = []
+        for meld in self.melds:
+            result.extend(meld.tiles)
+        return result
+
+    @property
+    def closed_hand(self):
+        meld_tiles = self.meld_tiles
+        return [x for x in self.tiles if x not in meld_tiles]
+
+    @property
+    def is_open_hand(self):
+        return any(x.opened for x in self.melds)
+
+    @property
+    def valued_honors(self):
+        return [CHUN, HAKU, HATSU, self.round_wind, self.player_wind]
+
+    def is_furiten(self, tile_34):
+        """
+        :param tile_34: 34 format tile
+        :return: boolean, was the tile discarded by the player or not
+        """
+        return bool(self.discards_mask >> tile_34 & 1)
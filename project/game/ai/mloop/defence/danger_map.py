@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+from mahjong.constants import EAST
+
+from game.ai.mloop.defence.defence import Defence, DefenceTile
+from game.ai.mloop.defence.suji import find_suji_mask
+from utils.tiles_mask import mask_to_tiles, tiles_to_mask
+
+
+class DangerMap(Defence):
+    """
+    Danger of each tile in 34 format, stored in numpy vectors.
+    Tiles that we don't know anything about have NO_INFO danger
+    """
+    NO_INFO = 1000
+
+    # enemy vectors don't depend on our hand, so they are kept between turns
+    _enemies_cache = None
+
+    def __init__(self, defence_handler):
+        super(DangerMap, self).__init__(defence_handler)
+        self._enemies_cache = {}
+
+    def impossible_waits_danger(self):
+        """
+        Fourth honor is safe and third honor is almost safe
+        :return: danger vector
+        """
+        live_tiles = self.player.live_tiles()
+
+        danger = np.full(34, self.NO_INFO, dtype=np.int64)
+        danger[EAST:][live_tiles[EAST:] == 1] = DefenceTile.ALMOST_SAFE_TILE
+        danger[EAST:][live_tiles[EAST:] == 0] = DefenceTile.SAFE
+        return danger
+
+    def safe_tiles_danger(self, enemy):
+        """
+        :param enemy: EnemyAnalyzer object
+        :return: danger vector, safe tiles against the enemy
+        """
+        return self._enemy_vectors(enemy)[0]
+
+    def suji_danger(self, enemy):
+        """
+        :param enemy: EnemyAnalyzer object
+        :return: danger vector, suji tiles against the enemy
+        """
+        return self._enemy_vectors(enemy)[1]
+
+    def honitsu_danger(self, enemy):
+        """
+        Tiles from our closed hand that can't be used in the enemy honitsu
+        :param enemy: EnemyAnalyzer object
+        :return: danger vector
+        """
+        chosen_suit_mask = self._enemy_vectors(enemy)[2]
+        hand_mask = tiles_to_mask([x for x in range(0, EAST) if self.defence.closed_hand_34[x]])
+        return self.mask_to_danger(hand_mask & ~chosen_suit_mask)
+
+    def enemy_danger(self, enemy, impossible_waits=None):
+        """
+        All information about tiles safety against one enemy
+        :param enemy: EnemyAnalyzer object
+        :param impossible_waits: value from impossible_waits_danger(), to not calculate it again
+        :return: danger vector
+        """
+        if impossible_waits is None:
+            impossible_waits = self.impossible_waits_danger()
+
+        danger = np.minimum(self.safe_tiles_danger(enemy), impossible_waits)
+        # it is better to not use suji against honitsu hands
+        if not enemy.chosen_suit:
+            danger = np.minimum(danger, self.suji_danger(enemy))
+        return danger
+
+    def common_danger(self, vectors):
+        """
+        Tile is safe against several enemies only if it is safe against each of them
+        :param vectors: array of danger vectors
+        :return: danger vector
+        """
+        return np.max(vectors, axis=0)
+
+    def mask_to_danger(self, tiles_mask, danger=DefenceTile.SAFE):
+        """
+        :param tiles_mask: mask with one bit for each tile in 34 format
+        :param danger: danger for tiles from the mask
+        :return: danger vector
+        """
+        vector = np.full(34, self.NO_INFO, dtype=np.int64)
+        vector[mask_to_tiles(tiles_mask)] = danger
+        return vector
+
+    def _enemy_vectors(self, enemy):
+        table = self.table
+        key = (enemy.all_safe_tiles_mask, enemy.chosen_suit, table.dora_count_34, table.has_open_tanyao)
+
+        cached = self._enemies_cache.get(enemy.player.seat)
+        if cached is None or cached[0] != key:
+            cached = (key, self._calculate_enemy_vectors(enemy))
+            self._enemies_cache[enemy.player.seat] = cached
+
+        return cached[1]
+
+    def _calculate_enemy_vectors(self, enemy):
+        safe_tiles = self.mask_to_danger(enemy.all_safe_tiles_mask)
+
+        suji = np.full(34, self.NO_INFO, dtype=np.int64)
+        for suji_bit in mask_to_tiles(find_suji_mask(enemy.all_safe_tiles_mask)):
+            for tile in self.defence.suji.suji_tiles(suji_bit + 1):
+                suji[tile.value] = tile.danger
+
+        chosen_suit_mask = 0
+        if enemy.chosen_suit:
+            chosen_suit_mask = tiles_to_mask([x for x in range(0, EAST) if enemy.chosen_suit(x)])
+
+        return safe_tiles, suji, chosen_suit_mask
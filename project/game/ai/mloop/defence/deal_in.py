@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+from mahjong.constants import EAST
+
+from game.ai.mloop.defence.defence import Defence
+
+
+class DealIn(Defence):
+    """
+    Probability to deal in with each tile in 34 format.
+    We go through all wait shapes that enemy still can have
+    and weight them by count of live tiles combinations that can form them
+    """
+    # we can't know is open hand in tempai or not
+    OPEN_HAND_TEMPAI_PROBABILITY = 0.6
+
+    # enemy vectors are calculated again only when something was changed
+    _enemies_cache = None
+
+    def __init__(self, defence_handler):
+        super(DealIn, self).__init__(defence_handler)
+        self._enemies_cache = {}
+
+    def tempai_probability(self, enemy):
+        """
+        :param enemy: EnemyAnalyzer object
+        :return: float
+        """
+        if enemy.in_tempai:
+            return 1.0
+        return self.OPEN_HAND_TEMPAI_PROBABILITY
+
+    def wait_probabilities(self, enemy):
+        """
+        Probability of each tile to be a winning tile, when enemy is in tempai
+        :param enemy: EnemyAnalyzer object
+        :return: numpy array of 34 probabilities
+        """
+        live_tiles = self.player.live_tiles()
+        key = (enemy.all_safe_tiles_mask, enemy.chosen_suit, live_tiles.tobytes())
+
+        cached = self._enemies_cache.get(enemy.player.seat)
+        if cached is None or cached[0] != key:
+            cached = (key, self._calculate_wait_probabilities(enemy, live_tiles))
+            self._enemies_cache[enemy.player.seat] = cached
+
+        return cached[1]
+
+    def deal_in_probabilities(self, enemy):
+        """
+        :param enemy: EnemyAnalyzer object
+        :return: numpy array of 34 probabilities
+        """
+        return self.wait_probabilities(enemy) * self.tempai_probability(enemy)
+
+    def common_deal_in_probabilities(self, enemies):
+        """
+        Probability that at least one of enemies will win on the tile
+        :param enemies: array of EnemyAnalyzer objects
+        :return: numpy array of 34 probabilities
+        """
+        not_deal_in = np.ones(34)
+        for enemy in enemies:
+            not_deal_in *= 1 - self.deal_in_probabilities(enemy)
+        return 1 - not_deal_in
+
+    def _calculate_wait_probabilities(self, enemy, live_tiles):
+        return wait_probabilities(enemy.all_safe_tiles_mask, live_tiles, enemy.chosen_suit)
+
+
+def wait_probabilities(safe_tiles_mask, live_tiles, chosen_suit=None):
+    """
+    Probability of each tile to be a winning tile for the hand in tempai,
+    it doesn't depend on the table and can be used without DefenceHandler
+    :param safe_tiles_mask: integer with one bit for each safe tile in 34 format
+    :param live_tiles: numpy array of 34 counts of tiles that enemy still can have
+    :param chosen_suit: suit function of the honitsu hand or None
+    :return: numpy array of 34 probabilities
+    """
+    safe_tiles = (safe_tiles_mask >> TILES_34) & 1
+    # enemy can't win on the tile from his river or on the tile passed after his riichi,
+    # so any safe wait remove the whole shape
+    is_possible = WAIT_SHAPES_WAITS.dot(safe_tiles) == 0
+
+    if chosen_suit:
+        allowed_tiles = np.array([x >= EAST or chosen_suit(x) for x in range(0, 34)])
+        is_possible &= allowed_tiles[WAIT_SHAPES_FIRST]
+
+    is_pair = WAIT_SHAPES_FIRST == WAIT_SHAPES_SECOND
+    second_tiles = np.where(
+        WAIT_SHAPES_SECOND == NO_TILE,
+        1,
+        live_tiles[WAIT_SHAPES_SECOND] - is_pair
+    )
+    # for the pair it is count of 2 tiles combinations
+    combinations = live_tiles[WAIT_SHAPES_FIRST] * second_tiles / (1 + is_pair)
+
+    weights = WAIT_SHAPES_WEIGHTS * combinations * is_possible
+    total_weight = weights.sum()
+    if not total_weight:
+        return np.zeros(34)
+
+    return weights.dot(WAIT_SHAPES_WAITS) / total_weight
+
+
+# players prefer good waits, so two sided wait is more common than
+# the count of its combinations tells
+RYANMEN_WEIGHT = 3
+KANCHAN_WEIGHT = 1
+PENCHAN_WEIGHT = 1
+SHANPON_WEIGHT = 1
+TANKI_WEIGHT = 0.5
+
+# second tile for tanki wait
+NO_TILE = -1
+
+TILES_34 = np.arange(34)
+
+
+def _build_wait_shapes():
+    """
+    :return: first tile, second tile, weight and waits mask for each wait shape
+    """
+    shapes = []
+    for suit in [0, 9, 18]:
+        for x in range(0, 9):
+            tile = suit + x
+            # 23 waits for 1 and 4
+            if 1 <= x <= 6:
+                shapes.append((tile, tile + 1, RYANMEN_WEIGHT, [tile - 1, tile + 2]))
+            # 13 waits for 2
+            if x <= 6:
+                shapes.append((tile, tile + 2, KANCHAN_WEIGHT, [tile + 1]))
+            # 12 waits for 3 and 89 waits for 7
+            if x == 0:
+                shapes.append((tile, tile + 1, PENCHAN_WEIGHT, [tile + 2]))
+            if x == 7:
+                shapes.append((tile, tile + 1, PENCHAN_WEIGHT, [tile - 1]))
+
+    for tile in range(0, 34):
+        shapes.append((tile, tile, SHANPON_WEIGHT, [tile]))
+        shapes.append((tile, NO_TILE, TANKI_WEIGHT, [tile]))
+
+    waits = np.zeros((len(shapes), 34), dtype=np.int64)
+    for i, shape in enumerate(shapes):
+        waits[i, shape[3]] = 1
+
+    return (
+        np.array([x[0] for x in shapes]),
+        np.array([x[1] for x in shapes]),
+        np.array([x[2] for x in shapes], dtype=np.float64),
+        waits
+    )
+
+
+WAIT_SHAPES_FIRST, WAIT_SHAPES_SECOND, WAIT_SHAPES_WEIGHTS, WAIT_SHAPES_WAITS = _build_wait_shapes()
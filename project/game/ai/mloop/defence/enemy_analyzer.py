@@ -1,11 +1,17 @@
 from mahjong.tile import TilesConverter
-from mahjong.utils import plus_dora, count_tiles_by_suits, is_aka_dora
+from mahjong.utils import count_tiles_by_suits, is_aka_dora
 
 
 class EnemyAnalyzer(object):
+    """
+    Threat state of one enemy. It is kept between turns and recalculated
+    only after enemy discard, meld, riichi or new dora indicator
+    """
     player = None
-    chosen_suit = None
-    initialized = False
+
+    RIICHI_HAN = 2
+    # opened honitsu
+    HONITSU_HAN = 2
 
     def __init__(self, player):
         """
@@ -14,10 +20,13 @@ class EnemyAnalyzer(object):
         self.player = player
         self.table = player.table
 
-        self.chosen_suit = None
-
-        # we need it to determine user's chosen suit
-        self.initialized = self.is_threatening
+        self._is_threatening = False
+        self._chosen_suit = None
+        self._threat_score = 0
+        # values that were used to calculate the threat state
+        self._state_key = None
+        # it is increased every time when the threat state is recalculated
+        self._threat_version = 0
 
     @property
     def is_dealer(self):
@@ -27,6 +36,10 @@ class EnemyAnalyzer(object):
     def all_safe_tiles(self):
         return self.player.all_safe_tiles
 
+    @property
+    def all_safe_tiles_mask(self):
+        return self.player.all_safe_tiles_mask
+
     @property
     def in_tempai(self):
         """
@@ -48,25 +61,89 @@ class EnemyAnalyzer(object):
         Should we fold against this player or not
         :return: boolean
         """
+        self._check_threat_state()
+        return self._is_threatening
+
+    @property
+    def chosen_suit(self):
+        """
+        Suit function of the honitsu hand, or None if it is not honitsu
+        """
+        self._check_threat_state()
+        return self._chosen_suit
+
+    @property
+    def threat_score(self):
+        """
+        Rough estimation of the hand cost in han, 0 for not threatening players
+        :return: float
+        """
+        self._check_threat_state()
+        return self._threat_score
+
+    @property
+    def threat_version(self):
+        """
+        Changed number means that the threat state could be changed,
+        so decisions based on it should be recalculated
+        :return: int
+        """
+        self._check_threat_state()
+        return self._threat_version
+
+    def _check_threat_state(self):
+        player = self.player
+        melds = player.melds
+        # river version is changed with every discard and called tile,
+        # and shouminkan replaces the last meld, so we don't need to compare all melds
+        key = (
+            player.river,
+            player.river.version,
+            len(melds),
+            melds and melds[-1],
+            player.in_riichi,
+            self.table.dora_count_34,
+            self.table.has_open_tanyao,
+        )
+        if key != self._state_key:
+            self._update_threat_state()
+            self._state_key = key
+
+    def _update_threat_state(self):
+        self._threat_version += 1
+        self._chosen_suit = None
+        self._threat_score = 0
+
+        han = self._calculate_threat()
+        self._is_threatening = han is not None
+        if self._is_threatening:
+            # dealer hand costs 1.5 times more
+            self._threat_score = han * 1.5 if self.player.is_dealer else han
+
+    def _calculate_threat(self):
+        """
+        :return: visible han of the threatening hand or None
+        """
         if self.player.in_riichi:
-            return True
+            # riichi itself and ura dora or tsumo on average
+            return self.RIICHI_HAN
 
-        discards = self.player.discards
-        discards_34 = TilesConverter.to_34_array([x.value for x in discards])
+        discards_34 = self.player.river.counts_34
 
         is_honitsu_open_sets, open_hand_suit = False, None
         is_honitsu_discards, discard_suit = self._is_honitsu_discards(discards_34)
 
+        dora_count = 0
         meld_tiles = self.player.meld_tiles
         meld_tiles_34 = TilesConverter.to_34_array(meld_tiles)
         if meld_tiles:
-            dora_count = sum([plus_dora(x, self.table.dora_indicators) for x in meld_tiles])
+            dora_count = sum([self.table.dora_count_34[x // 4] for x in meld_tiles])
             # aka dora
             dora_count += sum([1 for x in meld_tiles if is_aka_dora(x, self.table.has_open_tanyao)])
             # enemy has a lot of dora tiles in his opened sets
             # so better to fold against him
             if dora_count >= 3:
-                return True
+                return dora_count
 
             # check that user has a discard and melds that looks like honitsu
             is_honitsu_open_sets, open_hand_suit = self._is_honitsu_open_sets(meld_tiles_34)
@@ -74,15 +151,15 @@ class EnemyAnalyzer(object):
         if is_honitsu_open_sets:
             # for 2 opened melds we had to check discard, to be sure
             if len(self.player.melds) <= 2 and is_honitsu_discards and discard_suit == open_hand_suit:
-                self.chosen_suit = open_hand_suit
-                return True
+                self._chosen_suit = open_hand_suit
+                return self.HONITSU_HAN + dora_count
 
             # for 3+ opened melds there is no sense to check discard
             if len(self.player.melds) >= 3:
-                self.chosen_suit = open_hand_suit
-                return True
+                self._chosen_suit = open_hand_suit
+                return self.HONITSU_HAN + dora_count
 
-        return False
+        return None
 
     def _is_honitsu_open_sets(self, meld_tiles_34):
         """
@@ -12,12 +12,14 @@ class ImpossibleWait(Defence):
         Pair waits: third honor
         """
 
+        live_tiles = self.player.live_tiles()
+
         results = []
         for x in HONOR_INDICES:
-            if self.player.total_tiles(x, self.defence.closed_hand_34) == 4:
+            if live_tiles[x] == 0:
                 results.append(DefenceTile(x, DefenceTile.SAFE))
 
-            if self.player.total_tiles(x, self.defence.closed_hand_34) == 3:
+            if live_tiles[x] == 1:
                 results.append(DefenceTile(x, DefenceTile.ALMOST_SAFE_TILE))
 
         return results
@@ -1,88 +1,59 @@
 # -*- coding: utf-8 -*-
 from mahjong.constants import EAST
-from mahjong.utils import simplify, is_man, is_pin, is_sou
+
+import numpy as np
 
 from game.ai.mloop.defence.defence import Defence, DefenceTile
+from utils.tiles_mask import tiles_to_mask, mask_to_tiles
 
 
 class Kabe(Defence):
 
     def find_all_kabe(self, tiles_34):
-        # all indices shifted to -1
-        kabe_matrix = [
-            {'indices': [1], 'blocked_tiles': [0], 'type': KabeTile.STRONG_KABE},
-            {'indices': [2], 'blocked_tiles': [0, 1], 'type': KabeTile.STRONG_KABE},
-            {'indices': [6], 'blocked_tiles': [7, 8], 'type': KabeTile.STRONG_KABE},
-            {'indices': [7], 'blocked_tiles': [8], 'type': KabeTile.STRONG_KABE},
-            {'indices': [0, 3], 'blocked_tiles': [2, 3], 'type': KabeTile.STRONG_KABE},
-            {'indices': [1, 3], 'blocked_tiles': [2], 'type': KabeTile.STRONG_KABE},
-            {'indices': [1, 4], 'blocked_tiles': [2, 3], 'type': KabeTile.STRONG_KABE},
-            {'indices': [2, 4], 'blocked_tiles': [3], 'type': KabeTile.STRONG_KABE},
-            {'indices': [2, 5], 'blocked_tiles': [3, 4], 'type': KabeTile.STRONG_KABE},
-            {'indices': [3, 5], 'blocked_tiles': [4], 'type': KabeTile.STRONG_KABE},
-            {'indices': [3, 6], 'blocked_tiles': [4, 5], 'type': KabeTile.STRONG_KABE},
-            {'indices': [4, 6], 'blocked_tiles': [5], 'type': KabeTile.STRONG_KABE},
-            {'indices': [4, 7], 'blocked_tiles': [5, 6], 'type': KabeTile.STRONG_KABE},
-            {'indices': [5, 7], 'blocked_tiles': [6], 'type': KabeTile.STRONG_KABE},
-            {'indices': [5, 8], 'blocked_tiles': [6, 7], 'type': KabeTile.STRONG_KABE},
-
-            {'indices': [3], 'blocked_tiles': [1, 2], 'type': KabeTile.WEAK_KABE},
-            {'indices': [4], 'blocked_tiles': [2, 6], 'type': KabeTile.WEAK_KABE},
-            {'indices': [5], 'blocked_tiles': [6, 7], 'type': KabeTile.WEAK_KABE},
-            {'indices': [1, 5], 'blocked_tiles': [3], 'type': KabeTile.WEAK_KABE},
-            {'indices': [2, 6], 'blocked_tiles': [4], 'type': KabeTile.WEAK_KABE},
-            {'indices': [3, 7], 'blocked_tiles': [5], 'type': KabeTile.WEAK_KABE},
-        ]
-
-        kabe_tiles_strong = []
-        kabe_tiles_weak = []
-        kabe_tiles_partial = []
-
-        suits = self._suits_tiles(tiles_34)
-        for x in range(0, 3):
-            suit = suits[x]
-            # "kabe" - 4 revealed tiles
-            kabe_tiles = []
-            partial_kabe_tiles = []
-            for y in range(0, 9):
-                suit_tile = suit[y]
-                if suit_tile == 4:
-                    kabe_tiles.append(y)
-                elif suit_tile == 3:
-                    partial_kabe_tiles.append(y)
-
-            for matrix_item in kabe_matrix:
-                if len(list(set(matrix_item['indices']) - set(kabe_tiles))) == 0:
-                    for tile in matrix_item['blocked_tiles']:
-                        if matrix_item['type'] == KabeTile.STRONG_KABE:
-                            kabe_tiles_strong.append(tile + x * 9)
-                        else:
-                            kabe_tiles_weak.append(tile + x * 9)
-
-                if len(list(set(matrix_item['indices']) - set(partial_kabe_tiles))) == 0:
-                    for tile in matrix_item['blocked_tiles']:
-                        kabe_tiles_partial.append(tile + x * 9)
+        strong_mask, weak_mask, partial_mask = self.find_kabe_masks(tiles_34)
 
         kabe_tiles_unique = []
-        kabe_tiles_strong = list(set(kabe_tiles_strong))
-        kabe_tiles_weak = list(set(kabe_tiles_weak))
-        kabe_tiles_partial = list(set(kabe_tiles_partial))
-
-        for tile in kabe_tiles_strong:
+        for tile in mask_to_tiles(strong_mask):
             kabe_tiles_unique.append(KabeTile(tile, KabeTile.STRONG_KABE))
 
-        for tile in kabe_tiles_weak:
-            if tile not in kabe_tiles_strong:
-                kabe_tiles_unique.append(KabeTile(tile, KabeTile.WEAK_KABE))
+        for tile in mask_to_tiles(weak_mask):
+            kabe_tiles_unique.append(KabeTile(tile, KabeTile.WEAK_KABE))
 
-        for tile in kabe_tiles_partial:
-            if tile not in kabe_tiles_strong and tile not in kabe_tiles_weak:
-                kabe_tiles_unique.append(KabeTile(tile, KabeTile.PARTIAL_KABE))
+        for tile in mask_to_tiles(partial_mask):
+            kabe_tiles_unique.append(KabeTile(tile, KabeTile.PARTIAL_KABE))
 
         return kabe_tiles_unique
 
+    def find_kabe_masks(self, tiles_34):
+        """
+        Kabe tiles for all suits, each tile is marked only with the strongest kabe type
+        :param tiles_34: our hand in 34 format
+        :return: strong, weak and partial kabe masks, one bit for each tile in 34 format
+        """
+        # man, pin and sou go one after another in 34 format
+        visible_tiles = (4 - self.player.live_tiles(tiles_34)[:EAST]).reshape(3, 9)
+        # "kabe" - 4 revealed tiles
+        kabe_masks = (visible_tiles == 4).dot(SUIT_BITS).tolist()
+        partial_kabe_masks = (visible_tiles == 3).dot(SUIT_BITS).tolist()
+
+        strong_mask = 0
+        weak_mask = 0
+        partial_mask = 0
+        for x in range(0, 3):
+            shift = x * 9
+            strong = STRONG_KABE_TABLE[kabe_masks[x]]
+            weak = WEAK_KABE_TABLE[kabe_masks[x]] & ~strong
+            partial = PARTIAL_KABE_TABLE[partial_kabe_masks[x]] & ~strong & ~weak
+
+            strong_mask |= strong << shift
+            weak_mask |= weak << shift
+            partial_mask |= partial << shift
+
+        return strong_mask, weak_mask, partial_mask
+
     def find_tiles_to_discard(self, _):
         all_kabe = self.find_all_kabe(self.defence.closed_hand_34)
+        live_tiles = self.player.live_tiles()
 
         results = []
 
@@ -92,47 +63,14 @@ class Kabe(Defence):
                 continue
 
             tile = kabe.tile_34
-            if self.player.total_tiles(tile, self.defence.closed_hand_34) == 4:
+            if live_tiles[tile] == 0:
                 results.append(DefenceTile(tile, DefenceTile.SAFE))
 
-            if self.player.total_tiles(tile, self.defence.closed_hand_34) == 3:
+            if live_tiles[tile] == 1:
                 results.append(DefenceTile(tile, DefenceTile.ALMOST_SAFE_TILE))
 
         return results
 
-    def _suits_tiles(self, tiles_34):
-        """
-        Return tiles separated by suits
-        :param tiles_34:
-        :return:
-        """
-        suits = [
-            [0] * 9,
-            [0] * 9,
-            [0] * 9,
-        ]
-
-        for tile in range(0, EAST):
-            total_tiles = self.player.total_tiles(tile, tiles_34)
-            if not total_tiles:
-                continue
-
-            suit_index = None
-            simplified_tile = simplify(tile)
-
-            if is_man(tile):
-                suit_index = 0
-
-            if is_pin(tile):
-                suit_index = 1
-
-            if is_sou(tile):
-                suit_index = 2
-
-            suits[suit_index][simplified_tile] += total_tiles
-
-        return suits
-
 
 class KabeTile(object):
     STRONG_KABE = 0
@@ -145,3 +83,54 @@ class KabeTile(object):
     def __init__(self, tile_34, kabe_type):
         self.tile_34 = tile_34
         self.kabe_type = kabe_type
+
+
+# all indices shifted to -1
+KABE_MATRIX = [
+    {'indices': [1], 'blocked_tiles': [0], 'type': KabeTile.STRONG_KABE},
+    {'indices': [2], 'blocked_tiles': [0, 1], 'type': KabeTile.STRONG_KABE},
+    {'indices': [6], 'blocked_tiles': [7, 8], 'type': KabeTile.STRONG_KABE},
+    {'indices': [7], 'blocked_tiles': [8], 'type': KabeTile.STRONG_KABE},
+    {'indices': [0, 3], 'blocked_tiles': [2, 3], 'type': KabeTile.STRONG_KABE},
+    {'indices': [1, 3], 'blocked_tiles': [2], 'type': KabeTile.STRONG_KABE},
+    {'indices': [1, 4], 'blocked_tiles': [2, 3], 'type': KabeTile.STRONG_KABE},
+    {'indices': [2, 4], 'blocked_tiles': [3], 'type': KabeTile.STRONG_KABE},
+    {'indices': [2, 5], 'blocked_tiles': [3, 4], 'type': KabeTile.STRONG_KABE},
+    {'indices': [3, 5], 'blocked_tiles': [4], 'type': KabeTile.STRONG_KABE},
+    {'indices': [3, 6], 'blocked_tiles': [4, 5], 'type': KabeTile.STRONG_KABE},
+    {'indices': [4, 6], 'blocked_tiles': [5], 'type': KabeTile.STRONG_KABE},
+    {'indices': [4, 7], 'blocked_tiles': [5, 6], 'type': KabeTile.STRONG_KABE},
+    {'indices': [5, 7], 'blocked_tiles': [6], 'type': KabeTile.STRONG_KABE},
+    {'indices': [5, 8], 'blocked_tiles': [6, 7], 'type': KabeTile.STRONG_KABE},
+
+    {'indices': [3], 'blocked_tiles': [1, 2], 'type': KabeTile.WEAK_KABE},
+    {'indices': [4], 'blocked_tiles': [2, 6], 'type': KabeTile.WEAK_KABE},
+    {'indices': [5], 'blocked_tiles': [6, 7], 'type': KabeTile.WEAK_KABE},
+    {'indices': [1, 5], 'blocked_tiles': [3], 'type': KabeTile.WEAK_KABE},
+    {'indices': [2, 6], 'blocked_tiles': [4], 'type': KabeTile.WEAK_KABE},
+    {'indices': [3, 7], 'blocked_tiles': [5], 'type': KabeTile.WEAK_KABE},
+]
+
+SUIT_BITS = 1 << np.arange(9)
+
+
+def _build_kabe_table(kabe_types):
+    """
+    :param kabe_types: array of KabeTile types that will be used
+    :return: blocked tiles mask for each mask of visible tiles in one suit
+    """
+    table = []
+    for visible_mask in range(0, 1 << 9):
+        blocked_mask = 0
+        for matrix_item in KABE_MATRIX:
+            indices_mask = tiles_to_mask(matrix_item['indices'])
+            if matrix_item['type'] in kabe_types and visible_mask & indices_mask == indices_mask:
+                blocked_mask |= tiles_to_mask(matrix_item['blocked_tiles'])
+        table.append(blocked_mask)
+    return table
+
+
+STRONG_KABE_TABLE = _build_kabe_table([KabeTile.STRONG_KABE])
+WEAK_KABE_TABLE = _build_kabe_table([KabeTile.WEAK_KABE])
+# partial kabe (3 visible tiles) doesn't depend on the matrix item type
+PARTIAL_KABE_TABLE = _build_kabe_table([KabeTile.STRONG_KABE, KabeTile.WEAK_KABE])
@@ -1,10 +1,11 @@
-from mahjong.tile import TilesConverter
-from mahjong.utils import plus_dora, is_honor, is_aka_dora
+import numpy as np
 
-from game.ai.mloop.defence.defence import DefenceTile
+from game.ai.mloop.defence.danger_map import DangerMap
+from game.ai.mloop.defence.deal_in import DealIn
 from game.ai.mloop.defence.enemy_analyzer import EnemyAnalyzer
 from game.ai.mloop.defence.impossible_wait import ImpossibleWait
 from game.ai.mloop.defence.kabe import Kabe
+from game.ai.mloop.defence.push_fold import PushFold
 from game.ai.mloop.defence.suji import Suji
 
 
@@ -16,100 +17,57 @@ class DefenceHandler(object):
     impossible_wait = None
     kabe = None
     suji = None
+    danger_map = None
+    deal_in = None
+    push_fold = None
+
+    # compare safe tiles with the same danger by the deal in probability
+    deal_in_order = False
 
     # cached values, that will be used by all strategies
     hand_34 = None
     closed_hand_34 = None
 
+    # analyzers are kept between turns, because they store enemies threat state
+    _enemy_analyzers = None
+
     def __init__(self, player):
+        # settings module loads AI class, so we can't import it on the module level
+        from utils.settings_handler import settings
+
         self.table = player.table
         self.player = player
 
         self.impossible_wait = ImpossibleWait(self)
         self.kabe = Kabe(self)
         self.suji = Suji(self)
+        self.danger_map = DangerMap(self)
+        self.deal_in = DealIn(self)
+        self.push_fold = PushFold(self)
+        self.deal_in_order = settings.DEFENCE_DEAL_IN_ORDER
 
         self.hand_34 = None
         self.closed_hand_34 = None
 
+        self._enemy_analyzers = []
+
     def should_go_to_defence_mode(self, discard_candidate=None):
         """
         The method is decides should bot go to the defence mode or not.
         For now only full defence is possible
         :return: true|false
         """
+        return self.push_fold.should_fold(discard_candidate)
 
-        # we drew a tile, so we have 14 tiles in our hand
-        if discard_candidate:
-            shanten = discard_candidate.shanten
-            waiting = discard_candidate.waiting
-        # we have 13 tiles in hand (this is not our turn)
-        else:
-            shanten = self.player.ai.shanten
-            waiting = self.player.ai.waiting
-
-        if not waiting:
-            waiting = []
-
-        # if we are in riichi, we can't defence
-        if self.player.in_riichi:
-            return False
-
-        threatening_players = self._get_threatening_players()
-
-        # no one is threatening, so we can build our hand
-        if len(threatening_players) == 0:
-            return False
-
-        if shanten == 1:
-            # TODO calculate all possible hand costs for 1-2 shanten
-            dora_count = sum([plus_dora(x, self.table.dora_indicators) for x in self.player.tiles])
-            # aka dora
-            dora_count += sum([1 for x in self.player.tiles if is_aka_dora(x, self.table.has_open_tanyao)])
-            # we had 3+ dora in our almost done hand,
-            # we can try to push it
-            if dora_count >= 3:
-                return False
-
-        # our hand is not tempai, so better to fold it
-        if shanten != 0:
-            return True
-
-        # we are in tempai, let's try to estimate hand value
-        hands_estimated_cost = []
-        call_riichi = not self.player.is_open_hand
-        for tile in waiting:
-            # copy of tiles, because we are modifying a list
-            tiles = self.player.tiles[:]
-
-            # special case, when we already have 14 tiles in the hand
-            if discard_candidate:
-                temp_tile = discard_candidate.find_tile_in_hand(self.player.closed_hand)
-                tiles.remove(temp_tile)
-
-            hand_result = self.player.ai.estimate_hand_value(tile, tiles, call_riichi)
-            if hand_result.error is None:
-                hands_estimated_cost.append(hand_result.cost['main'])
-
-        # probably we are with opened hand without yaku, let's fold it
-        if not hands_estimated_cost:
-            return True
-
-        max_cost = max(hands_estimated_cost)
-        # our open hand in tempai, but it is cheap
-        # so we can fold it
-        if self.player.is_open_hand and max_cost < 7000:
-            return True
-
-        # when we call riichi we can get ura dora,
-        # so it is reasonable to riichi 3k+ hands
-        if not self.player.is_open_hand:
-            # there are a lot of chances that we will not win with a bad wait
-            # against other threatening players
-            if max_cost < 3000 or len(waiting) < 2:
-                return True
-
-        return False
+    def deal_in_probabilities(self, enemies=None):
+        """
+        Numeric estimation of the danger for each tile
+        :param enemies: array of EnemyAnalyzer objects, by default threatening players are used
+        :return: numpy array of 34 probabilities
+        """
+        if enemies is None:
+            enemies = self._get_threatening_players()
+        return self.deal_in.common_deal_in_probabilities(enemies)
 
     def try_to_find_safe_tile_to_discard(self):
         discard_results, _ = self.player.ai.hand_builder.find_discard_options(
@@ -118,48 +76,47 @@ class DefenceHandler(object):
             self.player.melds
         )
 
-        self.hand_34 = TilesConverter.to_34_array(self.player.tiles)
-        self.closed_hand_34 = TilesConverter.to_34_array(self.player.closed_hand)
+        self.hand_34 = self.player.tiles_34
+        self.closed_hand_34 = self.player.closed_hand_34
 
         threatening_players = self._get_threatening_players()
+        danger_map = self.danger_map
 
         # safe tiles that can be safe based on the table situation
-        safe_tiles = self.impossible_wait.find_tiles_to_discard(threatening_players)
+        impossible_waits = danger_map.impossible_waits_danger()
+
+        deal_in = None
+        if self.deal_in_order:
+            deal_in = self.deal_in_probabilities(threatening_players)
 
         # first try to check common safe tiles to discard for all players
         if len(threatening_players) > 1:
-            against_honitsu = []
+            # let's find a common tiles that will be safe against all threatening players
+            common_safe_tiles = []
             for player in threatening_players:
+                safe_tiles = danger_map.safe_tiles_danger(player)
                 if player.chosen_suit:
-                    against_honitsu += [self._mark_safe_tiles_against_honitsu(player)]
+                    safe_tiles = danger_map.common_danger([safe_tiles, danger_map.honitsu_danger(player)])
+                common_safe_tiles.append(safe_tiles)
+            common_safe_tiles = danger_map.common_danger(common_safe_tiles)
 
-            common_safe_tiles = [x.all_safe_tiles for x in threatening_players]
-            common_safe_tiles += against_honitsu
-            # let's find a common tiles that will be safe against all threatening players
-            common_safe_tiles = list(set.intersection(*map(set, common_safe_tiles)))
-            common_safe_tiles = [DefenceTile(x, DefenceTile.SAFE) for x in common_safe_tiles]
-
-            # there is no sense to calculate suji tiles for honitsu players
-            not_honitsu_players = [x for x in threatening_players if x.chosen_suit is None]
-            common_suji_tiles = self.suji.find_tiles_to_discard(not_honitsu_players)
-
-            if common_safe_tiles:
+            if (common_safe_tiles != danger_map.NO_INFO).any():
                 # it can be that safe tile will be mark as "almost safe",
                 # but we already have "safe" tile in our hand
-                validated_safe_tiles = common_safe_tiles
-                for tile in safe_tiles:
-                    already_added_tile = [x for x in common_safe_tiles if x.value == tile.value]
-                    if not already_added_tile:
-                        validated_safe_tiles.append(tile)
+                validated_safe_tiles = np.minimum(common_safe_tiles, impossible_waits)
 
                 # first try to check 100% safe tiles for all players
-                result = self._find_tile_to_discard(validated_safe_tiles, discard_results)
+                result = self._find_tile_to_discard(validated_safe_tiles, discard_results, deal_in)
                 if result:
                     return result
 
-            if common_suji_tiles:
+            # there is no sense to calculate suji tiles for honitsu players
+            not_honitsu_players = [x for x in threatening_players if x.chosen_suit is None]
+            if not_honitsu_players:
+                common_suji_tiles = danger_map.common_danger([danger_map.suji_danger(x) for x in not_honitsu_players])
+
                 # if there is no 100% safe tiles try to check common suji tiles
-                result = self._find_tile_to_discard(common_suji_tiles, discard_results)
+                result = self._find_tile_to_discard(common_suji_tiles, discard_results, deal_in)
                 if result:
                     return result
 
@@ -167,31 +124,14 @@ class DefenceHandler(object):
         # let's find safe tiles for most dangerous player first
         # and than for all other players if we failed find tile for dangerous player
         for player in threatening_players:
-            player_safe_tiles = [DefenceTile(x, DefenceTile.SAFE) for x in player.player.all_safe_tiles]
-            player_suji_tiles = self.suji.find_tiles_to_discard([player])
-
-            # it can be that safe tile will be mark as "almost safe",
-            # but we already have "safe" tile in our hand
-            validated_safe_tiles = player_safe_tiles
-            for tile in safe_tiles:
-                already_added_tile = [x for x in player_safe_tiles if x.value == tile.value]
-                if not already_added_tile:
-                    validated_safe_tiles.append(tile)
-
-            # better to not use suji for honitsu hands
-            if not player.chosen_suit:
-                validated_safe_tiles += player_suji_tiles
-
-            result = self._find_tile_to_discard(validated_safe_tiles, discard_results)
+            enemy_danger = danger_map.enemy_danger(player, impossible_waits)
+            result = self._find_tile_to_discard(enemy_danger, discard_results, deal_in)
             if result:
                 return result
 
             # try to find safe tiles against honitsu
             if player.chosen_suit:
-                against_honitsu = self._mark_safe_tiles_against_honitsu(player)
-                against_honitsu = [DefenceTile(x, DefenceTile.SAFE) for x in against_honitsu]
-
-                result = self._find_tile_to_discard(against_honitsu, discard_results)
+                result = self._find_tile_to_discard(danger_map.honitsu_danger(player), discard_results, deal_in)
                 if result:
                     return result
 
@@ -201,32 +141,42 @@ class DefenceHandler(object):
     @property
     def analyzed_enemies(self):
         players = self.player.ai.enemy_players
-        return [EnemyAnalyzer(x) for x in players]
+        # enemies don't exist yet when our player is created
+        if [x.player for x in self._enemy_analyzers] != players:
+            self._enemy_analyzers = [EnemyAnalyzer(x) for x in players]
+        return self._enemy_analyzers
 
-    def _find_tile_to_discard(self, safe_tiles, discard_tiles):
+    def _find_tile_to_discard(self, tiles_danger, discard_tiles, deal_in=None):
         """
         Try to find most effective safe tile to discard
-        :param safe_tiles:
+        :param tiles_danger: danger vector from DangerMap
         :param discard_tiles:
+        :param deal_in: deal in probabilities to compare tiles with the same danger, or None
         :return: DiscardOption
         """
-        was_safe_tiles = self._mark_tiles_safety(safe_tiles, discard_tiles)
+        was_safe_tiles = self._mark_tiles_safety(tiles_danger, discard_tiles)
         if not was_safe_tiles:
             return None
 
-        final_results = sorted(discard_tiles, key=lambda x: (x.danger, x.shanten, -x.ukeire, x.valuation))
-
-        return final_results[0]
-
-    def _mark_tiles_safety(self, safe_tiles, discard_tiles):
-        was_safe_tiles = False
-        for safe_tile in safe_tiles:
-            for discard_tile in discard_tiles:
-                if discard_tile.tile_to_discard == safe_tile.value:
-                    was_safe_tiles = True
-                    if safe_tile.danger < discard_tile.danger:
-                        discard_tile.danger = safe_tile.danger
-        return was_safe_tiles
+        # the last key is the primary one, sorting is stable as with sorted()
+        keys = [
+            [x.valuation for x in discard_tiles],
+            [-x.ukeire for x in discard_tiles],
+            [x.shanten for x in discard_tiles],
+        ]
+        if deal_in is not None:
+            keys.append(deal_in[[x.tile_to_discard for x in discard_tiles]])
+        keys.append([x.danger for x in discard_tiles])
+        order = np.lexsort(keys)
+
+        return discard_tiles[order[0]]
+
+    def _mark_tiles_safety(self, tiles_danger, discard_tiles):
+        danger = tiles_danger[[x.tile_to_discard for x in discard_tiles]]
+        for discard_tile, tile_danger in zip(discard_tiles, danger.tolist()):
+            if tile_danger < discard_tile.danger:
+                discard_tile.danger = tile_danger
+        return bool((danger != self.danger_map.NO_INFO).any())
 
     def _get_threatening_players(self):
         """
@@ -243,13 +193,3 @@ class DefenceHandler(object):
         result = sorted(result, key=lambda x: x.player.is_dealer, reverse=True)
 
         return result
-
-    def _mark_safe_tiles_against_honitsu(self, player):
-        against_honitsu = []
-        for tile in range(0, 34):
-            if not self.closed_hand_34[tile]:
-                continue
-
-            if not player.chosen_suit(tile) and not is_honor(tile):
-                against_honitsu.append(tile)
-        return against_honitsu
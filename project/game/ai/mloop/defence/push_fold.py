@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+from mahjong.utils import is_aka_dora
+
+from game.ai.mloop.defence.defence import Defence
+
+
+class PushFold(Defence):
+    """
+    Decision to push our hand or to fold it.
+    Hand costs are taken from tempai valuations of the discard selection,
+    and the decision is kept until our hand or enemies threat state is changed
+    """
+
+    # values that were used for the cached decision
+    _decision_key = None
+    _decision = None
+
+    def should_fold(self, discard_option=None):
+        """
+        :param discard_option: DiscardOption that we are going to discard, when we have 14 tiles
+        :return: boolean
+        """
+        key = self._get_decision_key(discard_option)
+        if key != self._decision_key:
+            self._decision = self._calculate_decision(discard_option)
+            self._decision_key = key
+        return self._decision
+
+    def hand_costs(self, discard_option=None):
+        """
+        Ron cost for each wait of our tempai hand,
+        waits without yaku are not included
+        :param discard_option: DiscardOption that we are going to discard, when we have 14 tiles
+        :return: array of costs
+        """
+        ai = self.player.ai
+
+        if discard_option:
+            waiting = discard_option.waiting
+            if discard_option.wait_to_cost is None:
+                discard_option.wait_to_cost = {}
+            wait_to_cost = discard_option.wait_to_cost
+        else:
+            waiting = ai.waiting
+            # new dora indicator can be opened after our discard
+            if ai.wait_to_cost is None or ai.wait_to_cost_dora != self.table.dora_count_34:
+                ai.wait_to_cost = {}
+                ai.wait_to_cost_dora = self.table.dora_count_34
+            wait_to_cost = ai.wait_to_cost
+
+        tiles = None
+        call_riichi = not self.player.is_open_hand
+        for tile in waiting or []:
+            # wait was already estimated during the discard selection
+            if tile in wait_to_cost:
+                continue
+
+            if tiles is None:
+                # copy of tiles, because we are modifying a list
+                tiles = list(self.player.tiles)
+                # special case, when we already have 14 tiles in the hand
+                if discard_option:
+                    tiles.remove(discard_option.find_tile_in_hand(self.player.closed_hand))
+
+            hand_result = ai.estimate_hand_value(tile, tiles, call_riichi)
+            wait_to_cost[tile] = None
+            if hand_result.error is None:
+                wait_to_cost[tile] = hand_result.cost['main']
+
+        return [wait_to_cost[x] for x in waiting or [] if wait_to_cost[x] is not None]
+
+    def _get_decision_key(self, discard_option):
+        ai = self.player.ai
+        if discard_option:
+            hand_key = (discard_option.tile_to_discard, discard_option.shanten, tuple(discard_option.waiting or []))
+        else:
+            hand_key = (None, ai.shanten, tuple(ai.waiting or []))
+
+        return (
+            self.player.hand_version,
+            self.player.in_riichi,
+            hand_key,
+            tuple([(x, x.threat_version) for x in self.defence.analyzed_enemies]),
+            self.table.dora_count_34,
+            self.table.has_open_tanyao,
+        )
+
+    def _calculate_decision(self, discard_option):
+        # we drew a tile, so we have 14 tiles in our hand
+        if discard_option:
+            shanten = discard_option.shanten
+            waiting = discard_option.waiting
+        # we have 13 tiles in hand (this is not our turn)
+        else:
+            shanten = self.player.ai.shanten
+            waiting = self.player.ai.waiting
+
+        if not waiting:
+            waiting = []
+
+        # if we are in riichi, we can't defence
+        if self.player.in_riichi:
+            return False
+
+        threatening_players = self.defence._get_threatening_players()
+
+        # no one is threatening, so we can build our hand
+        if len(threatening_players) == 0:
+            return False
+
+        if shanten == 1:
+            # TODO calculate all possible hand costs for 1-2 shanten
+            dora_count = sum([self.table.dora_count_34[x // 4] for x in self.player.tiles])
+            # aka dora
+            dora_count += sum([1 for x in self.player.tiles if is_aka_dora(x, self.table.has_open_tanyao)])
+            # we had 3+ dora in our almost done hand,
+            # we can try to push it
+            if dora_count >= 3:
+                return False
+
+        # our hand is not tempai, so better to fold it
+        if shanten != 0:
+            return True
+
+        # we are in tempai, let's use hand value
+        hands_estimated_cost = self.hand_costs(discard_option)
+
+        # probably we are with opened hand without yaku, let's fold it
+        if not hands_estimated_cost:
+            return True
+
+        max_cost = max(hands_estimated_cost)
+        # our open hand in tempai, but it is cheap
+        # so we can fold it
+        if self.player.is_open_hand and max_cost < 7000:
+            return True
+
+        # when we call riichi we can get ura dora,
+        # so it is reasonable to riichi 3k+ hands
+        if not self.player.is_open_hand:
+            # there are a lot of chances that we will not win with a bad wait
+            # against other threatening players
+            if max_cost < 3000 or len(waiting) < 2:
+                return True
+
+        return False
@@ -1,7 +1,32 @@
 # -*- coding: utf-8 -*-
-from mahjong.utils import is_man, simplify, is_pin, is_sou, plus_dora, is_aka_dora
+from mahjong.utils import is_aka_dora
 
 from game.ai.mloop.defence.defence import Defence, DefenceTile
+from utils.tiles_mask import tiles_to_mask, mask_to_tiles
+
+# bits of 1, 2 and 3 tiles in each suit, suji is marked by the bit of its lowest tile
+SUJI_MASK = 0b111 | 0b111 << 9 | 0b111 << 18
+
+
+def find_suji_mask(safe_tiles_mask):
+    """
+    All suits are checked at once, bits from other suits and honors are dropped by SUJI_MASK
+    :param safe_tiles_mask: mask with one bit for each safe tile in 34 format
+    :return: mask with one bit for each suji
+    """
+    # 4, 5 or 6 is safe: 1-4-7, 2-5-8 or 3-6-9 suji
+    middle_tiles = safe_tiles_mask >> 3
+    # double suji, 1 and 7, 2 and 8 or 3 and 9 are safe
+    side_tiles = safe_tiles_mask & (safe_tiles_mask >> 6)
+    return (middle_tiles | side_tiles) & SUJI_MASK
+
+
+def suji_to_tiles_mask(suji_mask):
+    """
+    :param suji_mask: value from find_suji_mask()
+    :return: mask with one bit for each suji tile in 34 format
+    """
+    return suji_mask | suji_mask << 3 | suji_mask << 6
 
 
 class Suji(Defence):
@@ -12,107 +37,56 @@ class Suji(Defence):
     # 3-6-9
     THIRD_SUJI = 3
 
-    def find_suji(self, safe_tiles_34):
-        suji = []
-        suits = [[], [], []]
-
-        # let's cast each tile to 0-8 presentation
-        for tile in safe_tiles_34:
-            if is_man(tile):
-                suits[0].append(simplify(tile))
-
-            if is_pin(tile):
-                suits[1].append(simplify(tile))
-
-            if is_sou(tile):
-                suits[2].append(simplify(tile))
-
-        for x in range(0, 3):
-            simplified_tiles = suits[x]
-            base = x * 9
-
-            # 1-4-7
-            if 3 in simplified_tiles:
-                suji.append(self.FIRST_SUJI + base)
-
-            # double 1-4-7
-            if 0 in simplified_tiles and 6 in simplified_tiles:
-                suji.append(self.FIRST_SUJI + base)
-
-            # 2-5-8
-            if 4 in simplified_tiles:
-                suji.append(self.SECOND_SUJI + base)
-
-            # double 2-5-8
-            if 1 in simplified_tiles and 7 in simplified_tiles:
-                suji.append(self.SECOND_SUJI + base)
+    # river and river version for the cached suji against our player
+    _river_key = None
+    _river_suji_tiles = None
 
-            # 3-6-9
-            if 5 in simplified_tiles:
-                suji.append(self.THIRD_SUJI + base)
-
-            # double 3-6-9
-            if 2 in simplified_tiles and 8 in simplified_tiles:
-                suji.append(self.THIRD_SUJI + base)
-
-        suji = list(set(suji))
-
-        return suji
-
-    def find_suji_against_self(self, player):
-        discards_34 = list(set([x.value // 4 for x in player.discards]))
-        all_suji = self.find_suji(discards_34)
-
-        result = []
-
-        for suji in all_suji:
-            suji_temp = suji % 9
-            base = suji - suji_temp - 1
-
-            if suji_temp == self.FIRST_SUJI:
-                result += [
-                    base + 1,
-                    base + 4,
-                    base + 7
-                ]
-
-            if suji_temp == self.SECOND_SUJI:
-                result += [
-                    base + 2,
-                    base + 5,
-                    base + 8
-                ]
-
-            if suji_temp == self.THIRD_SUJI:
-                result += [
-                    base + 3,
-                    base + 6,
-                    base + 9
-                ]
-
-        return result
+    def find_suji(self, safe_tiles_34):
+        """
+        :param safe_tiles_34: array of tiles in 34 format
+        :return: array of suji, FIRST_SUJI, SECOND_SUJI or THIRD_SUJI plus suit base
+        """
+        return [x + 1 for x in mask_to_tiles(find_suji_mask(tiles_to_mask(safe_tiles_34)))]
+
+    def find_suji_against_self(self, player, discards=None):
+        """
+        :param player: Player object
+        :param discards: tiles in 136 format, by default they are player discards
+        :return: array of tiles in 34 format
+        """
+        if discards is not None:
+            discards_mask = tiles_to_mask([x // 4 for x in discards])
+            return mask_to_tiles(suji_to_tiles_mask(find_suji_mask(discards_mask)))
+
+        # the result is changed only after our discard
+        river = player.river
+        river_key = (river, river.version)
+        if self._river_key != river_key:
+            suji_mask = find_suji_mask(river.tiles_34_mask)
+            self._river_suji_tiles = mask_to_tiles(suji_to_tiles_mask(suji_mask))
+            self._river_key = river_key
+
+        return list(self._river_suji_tiles)
 
     def find_tiles_to_discard(self, enemies):
-        found_suji = []
-        for enemy in enemies:
-            suji = self.find_suji(enemy.all_safe_tiles)
-            found_suji.append(suji)
-
-        if not found_suji:
+        if not enemies:
             return []
 
-        common_suji = list(set.intersection(*map(set, found_suji)))
+        common_suji_mask = SUJI_MASK
+        for enemy in enemies:
+            common_suji_mask &= find_suji_mask(enemy.all_safe_tiles_mask)
 
         tiles = []
-        for suji in common_suji:
-            if not suji:
-                continue
-
-            tiles.extend(self._suji_tiles(suji))
+        for suji in mask_to_tiles(common_suji_mask):
+            tiles.extend(self.suji_tiles(suji + 1))
 
         return tiles
 
-    def _suji_tiles(self, suji):
+    def suji_tiles(self, suji):
+        """
+        :param suji: FIRST_SUJI, SECOND_SUJI or THIRD_SUJI plus suit base
+        :return: array of DefenceTile objects
+        """
         suji_temp = suji % 9
         base = suji - suji_temp - 1
 
@@ -144,7 +118,7 @@ class Suji(Defence):
 
         # mark dora tiles as dangerous tiles to discard
         for tile in result:
-            is_dora = plus_dora(tile.value * 4, self.table.dora_indicators) \
+            is_dora = self.table.dora_count_34[tile.value] \
                       or is_aka_dora(tile.value * 4, self.table.has_open_tanyao)
             if is_dora:
                 tile.danger += 100
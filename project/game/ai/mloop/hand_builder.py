@@ -1,22 +1,37 @@
+import numpy as np
 from mahjong.constants import AKA_DORA_LIST
 from mahjong.shanten import Shanten
-from mahjong.tile import TilesConverter, Tile
+from mahjong.tile import TilesConverter
 from mahjong.utils import is_tile_strictly_isolated, is_pair, is_honor, simplify
 
 import utils.decisions_constants as log
 from game.ai.discard import DiscardOption
-from game.ai.mloop.defence.kabe import KabeTile
+from game.ai.hand_key import pack_tiles_34, pack_melds_34, TILE_WEIGHTS
+from game.ai.hand_state import HandState
+from game.ai.shanten import TableShanten, find_neighbour_tiles, TERMINAL_AND_HONOR_INDICES
 from utils.decisions_logger import DecisionsLogger
+from utils.tiles_mask import tiles_to_mask
 
 
 class HandBuilder:
     player = None
     ai = None
 
+    # waits of 13 tiles hands, calculated during the current decision
+    waits_memo = None
+
     def __init__(self, player, ai):
         self.player = player
         self.ai = ai
 
+        self.waits_memo = {}
+
+    def erase_waits_memo(self):
+        """
+        Should be called before each new decision (discard or meld call)
+        """
+        self.waits_memo = {}
+
     class TankiWait:
         TANKI_WAIT_NON_YAKUHAI = 1
         TANKI_WAIT_SELF_YAKUHAI = 2
@@ -115,12 +130,10 @@ class HandBuilder:
         return self.process_discard_option(selected_tile, closed_hand, print_log=print_log)
 
     def calculate_shanten(self, tiles_34, open_sets_34=None):
-        shanten_with_chiitoitsu = self.ai.shanten_calculator.calculate_shanten(tiles_34,
-                                                                               open_sets_34,
-                                                                               chiitoitsu=True)
-        shanten_without_chiitoitsu = self.ai.shanten_calculator.calculate_shanten(tiles_34,
-                                                                                  open_sets_34,
-                                                                                  chiitoitsu=False)
+        regular, chiitoitsu, kokushi = self.ai.shanten_calculator.calculate_shanten_for_hand(tiles_34, open_sets_34)
+
+        shanten_without_chiitoitsu = min(regular, kokushi)
+        shanten_with_chiitoitsu = min(shanten_without_chiitoitsu, chiitoitsu)
 
         if shanten_with_chiitoitsu == 0 and shanten_without_chiitoitsu >= 1:
             shanten = shanten_with_chiitoitsu
@@ -143,36 +156,138 @@ class HandBuilder:
 
         shanten, use_chiitoitsu = self.calculate_shanten(tiles_34, open_sets_34)
 
+        hand_key = pack_tiles_34(tiles_34)
+        melds_key = pack_melds_34(open_sets_34)
+
         waiting = []
-        for j in range(0, 34):
+        for j in self._find_draw_candidates(tiles_34, open_sets_34, shanten, use_chiitoitsu):
             if tiles_34[j] == 4:
                 continue
 
-            tiles_34[j] += 1
-
-            key = '{},{},{}'.format(
-                ''.join([str(x) for x in tiles_34]),
-                ';'.join([str(x) for x in open_sets_34]),
-                use_chiitoitsu and 1 or 0
-            )
+            # key of the hand with drawn tile
+            key = (hand_key + TILE_WEIGHTS[j], melds_key, use_chiitoitsu)
 
-            if key in self.ai.hand_cache:
-                new_shanten = self.ai.hand_cache[key]
-            else:
+            new_shanten = self.ai.hand_cache.get(key)
+            if new_shanten is None:
+                tiles_34[j] += 1
                 new_shanten = self.ai.shanten_calculator.calculate_shanten(
                     tiles_34,
                     open_sets_34,
                     chiitoitsu=use_chiitoitsu
                 )
-                self.ai.hand_cache[key] = new_shanten
+                tiles_34[j] -= 1
+                self.ai.hand_cache.set(key, new_shanten)
 
             if new_shanten == shanten - 1:
                 waiting.append(j)
 
-            tiles_34[j] -= 1
-
         return waiting, shanten
 
+    def _find_waits_after_discards(self, tiles_34, discards, open_sets_34=None):
+        """
+        Second level ukeire calculation builds the same 13 tiles hands many times
+        (discard A, draw B and discard C is the same hand as discard C, draw B and discard A),
+        so we calculate waits only for hands that are not in the decision memo
+        :param tiles_34: array of tiles in 34 formant, 14 of them
+        :param discards: array of tiles in 34 format
+        :param open_sets_34: array of array with tiles in 34 format
+        :return: array of waits and shanten for each discard
+        """
+        hand_key = pack_tiles_34(tiles_34)
+        melds_key = pack_melds_34(open_sets_34)
+        keys = [(hand_key - TILE_WEIGHTS[x], melds_key) for x in discards]
+
+        missing = [index for index, key in enumerate(keys) if key not in self.waits_memo]
+        if missing:
+            waiting_matrix, shanten = self._calculate_waits_batch(
+                tiles_34,
+                [discards[x] for x in missing],
+                open_sets_34
+            )
+            for row, index in enumerate(missing):
+                self.waits_memo[keys[index]] = (np.flatnonzero(waiting_matrix[row]).tolist(), int(shanten[row]))
+
+        return [self.waits_memo[x] for x in keys]
+
+    def _calculate_waits_batch(self, tiles_34, discards, open_sets_34=None):
+        """
+        The same as calculate_waits(), but for all discards at once.
+        Every "hand after discard and draw" is a row of one matrix,
+        so shanten for all of them is calculated in one pass
+        :param tiles_34: array of tiles in 34 formant, 14 of them
+        :param discards: array of tiles in 34 format
+        :param open_sets_34: array of array with tiles in 34 format
+        :return: boolean matrix of waits for each discard and array of shanten after each discard
+        """
+        calculator = self.ai.shanten_calculator
+        discards_count = len(discards)
+
+        hands_after_discard = np.tile(np.array(tiles_34, dtype=np.int64), (discards_count, 1))
+        hands_after_discard[np.arange(discards_count), discards] -= 1
+
+        shanten, use_chiitoitsu = self._choose_shanten_batch(
+            *calculator.calculate_shanten_batch(hands_after_discard, open_sets_34)
+        )
+
+        # we can't draw the fifth tile
+        can_be_drawn = hands_after_discard < 4
+        draws = np.tile(np.eye(34, dtype=np.int64), (discards_count, 1)) * can_be_drawn.reshape(-1, 1)
+        hands_after_draw = np.repeat(hands_after_discard, 34, axis=0) + draws
+
+        regular, chiitoitsu, kokushi = calculator.calculate_shanten_batch(hands_after_draw, open_sets_34)
+        chiitoitsu[~np.repeat(use_chiitoitsu, 34)] = TableShanten.NOT_AVAILABLE
+        new_shanten = np.minimum(np.minimum(regular, kokushi), chiitoitsu).reshape(discards_count, 34)
+
+        waiting_matrix = (new_shanten == (shanten - 1).reshape(-1, 1)) & can_be_drawn
+        return waiting_matrix, shanten
+
+    def _choose_shanten_batch(self, regular, chiitoitsu, kokushi):
+        """
+        Vectorized version of the hand form choice from calculate_shanten()
+        :return: numpy arrays with shanten and chiitoitsu usage flags
+        """
+        shanten_without_chiitoitsu = np.minimum(regular, kokushi)
+        shanten_with_chiitoitsu = np.minimum(shanten_without_chiitoitsu, chiitoitsu)
+
+        use_chiitoitsu = (
+            ((shanten_with_chiitoitsu == 0) & (shanten_without_chiitoitsu >= 1)) |
+            ((shanten_with_chiitoitsu == 1) & (shanten_without_chiitoitsu >= 3))
+        )
+        shanten = np.where(use_chiitoitsu, shanten_with_chiitoitsu, shanten_without_chiitoitsu)
+
+        return shanten, use_chiitoitsu
+
+    def _find_draw_candidates(self, tiles_34, open_sets_34, shanten, use_chiitoitsu):
+        """
+        Only tiles near our hand tiles can improve the regular hand,
+        other tiles are interesting only for chiitoitsu and kokushi
+        :return: array of tiles in 34 format
+        """
+        # tanki wait on the fifth tile is not possible,
+        # so with four identical tiles any new tile can be useful for tanki wait
+        if 4 in tiles_34:
+            return list(range(0, 34))
+
+        candidates = find_neighbour_tiles(tiles_34)
+
+        # opened hand can't be chiitoitsu or kokushi
+        if open_sets_34:
+            return candidates
+
+        chiitoitsu, kokushi = self.ai.shanten_calculator.calculate_chiitoitsu_and_kokushi(tiles_34)
+
+        # new kind of tile will improve chiitoitsu with less than 7 kinds of tiles
+        if use_chiitoitsu and chiitoitsu == shanten and len(candidates) < 34:
+            kinds_of_tiles = len([x for x in tiles_34 if x])
+            if kinds_of_tiles < 7:
+                return list(range(0, 34))
+
+        # any new terminal or honor tile will improve kokushi
+        if kokushi == shanten:
+            candidates = sorted(set(candidates + TERMINAL_AND_HONOR_INDICES))
+
+        return candidates
+
     def find_discard_options(self, tiles, closed_hand, melds=None):
         """
         :param tiles: array of tiles in 136 format
@@ -183,29 +298,33 @@ class HandBuilder:
         if melds is None:
             melds = []
 
-        open_sets_34 = [x.tiles_34 for x in melds]
+        if melds is self.player.melds:
+            open_sets_34 = self.player.meld_34_tiles
+        else:
+            open_sets_34 = [x.tiles_34 for x in melds]
 
         tiles_34 = TilesConverter.to_34_array(tiles)
         closed_tiles_34 = TilesConverter.to_34_array(closed_hand)
         is_agari = self.ai.agari.is_agari(tiles_34, self.player.meld_34_tiles)
 
-        results = []
-        for hand_tile in range(0, 34):
-            if not closed_tiles_34[hand_tile]:
-                continue
+        discards = [x for x in range(0, 34) if closed_tiles_34[x]]
+        waits_after_discards = self._find_waits_after_discards(tiles_34, discards, open_sets_34)
 
-            tiles_34[hand_tile] -= 1
-            waiting, shanten = self.calculate_waits(tiles_34, open_sets_34)
-            tiles_34[hand_tile] += 1
+        live_tiles = self.player.live_tiles(closed_tiles_34)
+        # discard options calculate their value later, so they shouldn't share a list that can be changed
+        closed_hand_tiles = tuple(closed_hand)
 
+        results = []
+        for hand_tile, (waiting, shanten_after_discard) in zip(discards, waits_after_discards):
             if waiting:
-                wait_to_ukeire = dict(zip(waiting, [self.count_tiles([x], closed_tiles_34) for x in waiting]))
+                wait_to_ukeire = dict(zip(waiting, live_tiles[waiting].tolist()))
                 results.append(DiscardOption(player=self.player,
-                                             shanten=shanten,
+                                             shanten=shanten_after_discard,
                                              tile_to_discard=hand_tile,
                                              waiting=waiting,
-                                             ukeire=self.count_tiles(waiting, closed_tiles_34),
-                                             wait_to_ukeire=wait_to_ukeire))
+                                             ukeire=sum(wait_to_ukeire.values()),
+                                             wait_to_ukeire=wait_to_ukeire,
+                                             closed_hand=closed_hand_tiles))
 
         if is_agari:
             shanten = Shanten.AGARI_STATE
@@ -218,13 +337,12 @@ class HandBuilder:
         return results, shanten
 
     def count_tiles(self, waiting, tiles_34):
-        n = 0
-        for tile_34 in waiting:
-            n += 4 - self.player.total_tiles(tile_34, tiles_34)
-        return n
+        if not waiting:
+            return 0
+        return int(self.player.live_tiles(tiles_34)[waiting].sum())
 
     def divide_hand(self, tiles, waiting):
-        tiles_copy = tiles.copy()
+        tiles_copy = list(tiles)
 
         for i in range(0, 4):
             if waiting * 4 + i not in tiles_copy:
@@ -236,17 +354,15 @@ class HandBuilder:
         results = self.player.ai.hand_divider.divide_hand(tiles_34)
         return results, tiles_34
 
-    def check_suji_and_kabe(self, tiles_34, waiting):
+    def check_suji_and_kabe(self, tiles_34, waiting, hand_state=None):
         # let's find suji-traps in our discard
-        suji_tiles = self.player.ai.defence.suji.find_suji_against_self(self.player)
+        discards = hand_state.discards if hand_state is not None else None
+        suji_tiles = self.player.ai.defence.suji.find_suji_against_self(self.player, discards)
         have_suji = waiting in suji_tiles
 
         # let's find kabe
-        kabe_tiles = self.player.ai.defence.kabe.find_all_kabe(tiles_34)
-        have_kabe = False
-        for kabe in kabe_tiles:
-            if waiting == kabe.tile_34 and kabe.kabe_type == KabeTile.STRONG_KABE:
-                have_kabe = True
+        strong_kabe_mask, _, _ = self.player.ai.defence.kabe.find_kabe_masks(tiles_34)
+        have_kabe = bool(strong_kabe_mask >> waiting & 1)
 
         return have_suji, have_kabe
 
@@ -317,48 +433,49 @@ class HandBuilder:
         # if everything is the same we just choose the first one
         return best_discard_desc[0]['discard_option']
 
-    def _is_waiting_furiten(self, tile_34):
-        discarded_tiles = [x.value // 4 for x in self.player.discards]
-        return tile_34 in discarded_tiles
+    def _is_waiting_furiten(self, tile_34, hand_state=None):
+        return bool(self._discards_mask(hand_state) >> tile_34 & 1)
 
-    def _is_discard_option_furiten(self, discard_option):
-        is_furiten = False
+    def _is_discard_option_furiten(self, discard_option, hand_state=None):
+        return bool(self._discards_mask(hand_state) & tiles_to_mask(discard_option.waiting))
 
-        for waiting in discard_option.waiting:
-            is_furiten = is_furiten or self._is_waiting_furiten(waiting)
-
-        return is_furiten
+    def _discards_mask(self, hand_state):
+        """
+        :param hand_state: HandState object, by default it is the current player hand
+        :return: mask of discarded tiles in 34 format
+        """
+        if hand_state is None:
+            return self.player.river.tiles_34_mask
+        return hand_state.discards_mask
 
     def _choose_best_discard_in_tempai(self, tiles, melds, discard_options):
         # first of all we find tiles that have the best hand cost * ukeire value
         call_riichi = not self.player.is_open_hand
 
         discard_desc = []
-        player_tiles_copy = self.player.tiles.copy()
-        player_melds_copy = self.player.melds.copy()
+        hand_state = HandState.from_player(self.player, tiles, melds)
 
-        closed_tiles_34 = TilesConverter.to_34_array(self.player.closed_hand)
+        closed_hand = self.player.closed_hand
+        closed_tiles_34 = self.player.closed_hand_34
 
         for discard_option in discard_options:
-            tile = discard_option.find_tile_in_hand(self.player.closed_hand)
-            # temporary remove discard option to estimate hand value
-            self.player.tiles = tiles.copy()
-            self.player.tiles.remove(tile)
-            # temporary replace melds
-            self.player.melds = melds.copy()
-            # for kabe/suji handling
-            discarded_tile = Tile(tile, False)
-            self.player.discards.append(discarded_tile)
-
-            is_furiten = self._is_discard_option_furiten(discard_option)
+            tile = discard_option.find_tile_in_hand(closed_hand)
+            # hand after the discard, discarded tile is needed for furiten checks
+            state_after_discard = hand_state.discard(tile)
+
+            is_furiten = self._is_discard_option_furiten(discard_option, state_after_discard)
 
             if len(discard_option.waiting) == 1:
                 waiting = discard_option.waiting[0]
 
-                cost_x_ukeire, hand_cost = self._estimate_cost_x_ukeire(discard_option, call_riichi)
+                cost_x_ukeire, hand_cost = self._estimate_cost_x_ukeire(
+                    discard_option,
+                    call_riichi,
+                    state_after_discard
+                )
 
                 # let's check if this is a tanki wait
-                results, tiles_34 = self.divide_hand(self.player.tiles, waiting)
+                results, tiles_34 = self.divide_hand(list(state_after_discard.tiles), waiting)
                 result = results[0]
 
                 tanki_type = None
@@ -380,7 +497,11 @@ class HandBuilder:
                             break
 
                         simplified_waiting = simplify(waiting)
-                        have_suji, have_kabe = self.check_suji_and_kabe(closed_tiles_34, waiting)
+                        have_suji, have_kabe = self.check_suji_and_kabe(
+                            closed_tiles_34,
+                            waiting,
+                            state_after_discard
+                        )
 
                         # TODO: not sure about suji/kabe priority, so we keep them same for now
                         if 3 <= simplified_waiting <= 5:
@@ -414,7 +535,7 @@ class HandBuilder:
                     'tanki_type': tanki_type
                 })
             else:
-                cost_x_ukeire, _ = self._estimate_cost_x_ukeire(discard_option, call_riichi)
+                cost_x_ukeire, _ = self._estimate_cost_x_ukeire(discard_option, call_riichi, state_after_discard)
 
                 discard_desc.append({
                     'discard_option': discard_option,
@@ -425,11 +546,6 @@ class HandBuilder:
                     'tanki_type': None
                 })
 
-            # reverse all temporary tile tweaks
-            self.player.tiles = player_tiles_copy
-            self.player.melds = player_melds_copy
-            self.player.discards.remove(discarded_tile)
-
         discard_desc = sorted(discard_desc, key=lambda k: (k['cost_x_ukeire'], not k['is_furiten']), reverse=True)
 
         # if we don't have any good options, e.g. all our possible waits ara karaten
@@ -607,6 +723,8 @@ class HandBuilder:
 
         self.player.in_tempai = discard_option.shanten == 0
         self.ai.waiting = discard_option.waiting
+        self.ai.wait_to_cost = discard_option.wait_to_cost
+        self.ai.wait_to_cost_dora = self.player.table.dora_count_34
         self.ai.shanten = discard_option.shanten
         self.ai.ukeire = discard_option.ukeire
         self.ai.ukeire_second = discard_option.ukeire_second
@@ -625,14 +743,10 @@ class HandBuilder:
         not_suitable_tiles = self.ai.current_strategy and self.ai.current_strategy.not_suitable_tiles or []
         call_riichi = not self.player.is_open_hand
 
-        # we are going to do manipulations that require player hand to be updated
-        # so we save original tiles here and restore it at the end of the function
-        player_tiles_original = self.player.tiles.copy()
-
         tile_in_hand = discard_option.find_tile_in_hand(self.player.closed_hand)
-
-        self.player.tiles = tiles.copy()
-        self.player.tiles.remove(tile_in_hand)
+        hand_state = HandState.from_player(self.player, tiles).without_tile(tile_in_hand)
+        closed_hand_34 = TilesConverter.to_34_array(hand_state.closed_hand)
+        live_tiles_34 = self.player.live_tiles(closed_hand_34)
 
         sum_tiles = 0
         sum_cost = 0
@@ -640,18 +754,17 @@ class HandBuilder:
             if self.player.is_open_hand and wait_34 in not_suitable_tiles:
                 continue
 
-            closed_hand_34 = TilesConverter.to_34_array(self.player.closed_hand)
-            live_tiles = 4 - self.player.total_tiles(wait_34, closed_hand_34)
+            live_tiles = int(live_tiles_34[wait_34])
 
             if live_tiles == 0:
                 continue
 
-            wait_136 = wait_34 * 4
-            self.player.tiles.append(wait_136)
+            state_after_draw = hand_state.with_tile(wait_34 * 4)
+            closed_hand = state_after_draw.closed_hand
 
             results, shanten = self.find_discard_options(
-                self.player.tiles,
-                self.player.closed_hand,
+                list(state_after_draw.tiles),
+                closed_hand,
                 melds
             )
             results = [x for x in results if x.shanten == discard_option.shanten - 1]
@@ -687,24 +800,21 @@ class HandBuilder:
 
                 # if we are going to have a tempai (on our second level) - let's also count its cost
                 if shanten == 0:
-                    next_tile_in_hand = best_one.find_tile_in_hand(self.player.closed_hand)
-                    self.player.tiles.remove(next_tile_in_hand)
-                    cost_x_ukeire, _ = self._estimate_cost_x_ukeire(best_one, call_riichi=call_riichi)
+                    next_tile_in_hand = best_one.find_tile_in_hand(closed_hand)
+                    cost_x_ukeire, _ = self._estimate_cost_x_ukeire(
+                        best_one,
+                        call_riichi=call_riichi,
+                        hand_state=state_after_draw.without_tile(next_tile_in_hand)
+                    )
                     # we reduce tile valuation for atodzuke
                     if result_has_atodzuke:
                         cost_x_ukeire /= 2
                     sum_cost += cost_x_ukeire
-                    self.player.tiles.append(next_tile_in_hand)
-
-            self.player.tiles.remove(wait_136)
 
         discard_option.ukeire_second = sum_tiles
         if discard_option.shanten == 1:
             discard_option.second_level_cost = sum_cost
 
-        # restore original state of player hand
-        self.player.tiles = player_tiles_original
-
     @staticmethod
     def _filter_list_by_percentage(items, attribute, percentage):
         filtered_options = []
@@ -730,18 +840,30 @@ class HandBuilder:
 
         return ukeire_borders
 
-    def _estimate_cost_x_ukeire(self, discard_option, call_riichi):
+    def _estimate_cost_x_ukeire(self, discard_option, call_riichi, hand_state=None):
+        """
+        :param hand_state: HandState object, hand after the discard.
+        By default it is the current player hand
+        """
+        if hand_state is None:
+            hand_state = HandState.from_player(self.player)
+
         cost_x_ukeire_tsumo = 0
         cost_x_ukeire_ron = 0
         hand_cost_tsumo = 0
         hand_cost_ron = 0
 
-        is_furiten = self._is_discard_option_furiten(discard_option)
+        is_furiten = self._is_discard_option_furiten(discard_option, hand_state)
+
+        # ron costs are used later by push/fold decision
+        if discard_option.wait_to_cost is None:
+            discard_option.wait_to_cost = {}
 
         for waiting in discard_option.waiting:
             hand_value = self.player.ai.estimate_hand_value(waiting,
                                                             call_riichi=call_riichi,
-                                                            is_tsumo=True)
+                                                            is_tsumo=True,
+                                                            hand_state=hand_state)
             if hand_value.error is None:
                 hand_cost_tsumo = hand_value.cost['main'] + 2 * hand_value.cost['additional']
                 cost_x_ukeire_tsumo += hand_cost_tsumo * discard_option.wait_to_ukeire[waiting]
@@ -749,10 +871,13 @@ class HandBuilder:
             if not is_furiten:
                 hand_value = self.player.ai.estimate_hand_value(waiting,
                                                                 call_riichi=call_riichi,
-                                                                is_tsumo=False)
+                                                                is_tsumo=False,
+                                                                hand_state=hand_state)
+                discard_option.wait_to_cost[waiting] = None
                 if hand_value.error is None:
                     hand_cost_ron = hand_value.cost['main']
                     cost_x_ukeire_ron += hand_cost_ron * discard_option.wait_to_ukeire[waiting]
+                    discard_option.wait_to_cost[waiting] = hand_cost_ron
 
         # these are abstract numbers used to compare different waits
         # some don't have yaku, some furiten, etc.
@@ -1,10 +1,8 @@
 # -*- coding: utf-8 -*-
-import copy
 import utils.decisions_constants as log
 
 from mahjong.agari import Agari
 from mahjong.constants import AKA_DORA_LIST, DISPLAY_WINDS
-from mahjong.hand_calculating.divider import HandDivider
 from mahjong.hand_calculating.hand import HandCalculator
 from mahjong.hand_calculating.hand_config import HandConfig
 from mahjong.meld import Meld
@@ -13,6 +11,8 @@ from mahjong.tile import TilesConverter
 from mahjong.utils import is_pon
 
 from game.ai.base.main import InterfaceAI
+from game.ai.hand_divider import CachedHandDivider
+from game.ai.hand_state import HandState
 from game.ai.mloop.defence.main import DefenceHandler
 from game.ai.mloop.hand_builder import HandBuilder
 from game.ai.mloop.riichi import Riichi
@@ -23,6 +23,8 @@ from game.ai.mloop.strategies.honitsu import HonitsuStrategy
 from game.ai.mloop.strategies.main import BaseStrategy
 from game.ai.mloop.strategies.tanyao import TanyaoStrategy
 from game.ai.mloop.strategies.yakuhai import YakuhaiStrategy
+from game.ai.shanten import TableShanten, SUIT_TABLE, load_tables
+from utils.cache import LRUCache
 from utils.decisions_logger import DecisionsLogger
 
 
@@ -41,11 +43,16 @@ class ImplementationAI(InterfaceAI):
     ukeire_second = 0
     in_defence = False
     waiting = None
+    # ron costs of our waits, they are filled during the discard selection
+    wait_to_cost = None
+    wait_to_cost_dora = None
 
     current_strategy = None
     last_discard_option = None
 
-    hand_cache = {}
+    hand_cache = None
+    hand_value_cache = None
+    hand_value_cache_dora = None
 
     gpparams = {}
 
@@ -53,13 +60,24 @@ class ImplementationAI(InterfaceAI):
         super(ImplementationAI, self).__init__(player)
 
         self.agari = Agari()
-        self.shanten_calculator = Shanten()
+        self.shanten_calculator = TableShanten()
         self.defence = DefenceHandler(player)
         self.riichi = Riichi(player)
-        self.hand_divider = HandDivider()
         self.finished_hand = HandCalculator()
         self.hand_builder = HandBuilder(player, self)
 
+        # settings module loads AI class, so we can't import it on the module level
+        from utils.settings_handler import settings
+
+        # file is opened only once and shared by all AI instances
+        if SUIT_TABLE.mapped is None:
+            load_tables(settings.SHANTEN_TABLES_FILE)
+
+        # shanten doesn't depend on the round, so we keep cache between rounds
+        self.hand_cache = LRUCache(settings.HAND_CACHE_SIZE)
+        self.hand_value_cache = LRUCache(settings.HAND_VALUE_CACHE_SIZE)
+        self.hand_divider = CachedHandDivider(settings.HAND_DIVIDER_CACHE_SIZE)
+
         self.erase_state()
 
     def erase_state(self):
@@ -68,12 +86,12 @@ class ImplementationAI(InterfaceAI):
         self.ukeire_second = 0
         self.in_defence = False
         self.waiting = None
+        self.wait_to_cost = None
+        self.wait_to_cost_dora = None
 
         self.current_strategy = None
         self.last_discard_option = None
 
-        self.hand_cache = {}
-
     def load_params(self,params):
         self.gpparams = params
 
@@ -84,12 +102,15 @@ class ImplementationAI(InterfaceAI):
             'Hand: {}'.format(self.player.format_hand_for_print()),
         ])
 
-        self.shanten, _ = self.hand_builder.calculate_shanten(TilesConverter.to_34_array(self.player.tiles))
+        self.shanten, _ = self.hand_builder.calculate_shanten(self.player.tiles_34)
+        self.wait_to_cost = None
 
     def draw_tile(self, tile_136):
         self.determine_strategy(self.player.tiles)
 
     def discard_tile(self, discard_tile, print_log=True):
+        self.hand_builder.erase_waits_memo()
+
         # we called meld and we had discard tile that we wanted to discard
         if discard_tile is not None:
             if not self.last_discard_option:
@@ -105,7 +126,9 @@ class ImplementationAI(InterfaceAI):
         )
 
     def try_to_call_meld(self, tile_136, is_kamicha_discard, remaining_tiles):
-        tiles_136_previous = self.player.tiles[:]
+        self.hand_builder.erase_waits_memo()
+
+        tiles_136_previous = list(self.player.tiles)
         tiles_136 = tiles_136_previous + [tile_136]
         self.determine_strategy(tiles_136)
 
@@ -168,14 +191,18 @@ class ImplementationAI(InterfaceAI):
 
         return self.current_strategy and True or False
 
-    def estimate_hand_value(self, win_tile, tiles=None, call_riichi=False, is_tsumo=False):
+    def estimate_hand_value(self, win_tile, tiles=None, call_riichi=False, is_tsumo=False, hand_state=None):
         """
         :param win_tile: 34 tile format
-        :param tiles:
+        :param tiles: 136 tiles format, to replace tiles of the hand state
         :param call_riichi:
         :param is_tsumo
+        :param hand_state: HandState object, by default it is the current player hand
         :return:
         """
+        if hand_state is None:
+            hand_state = HandState.from_player(self.player)
+
         win_tile *= 4
 
         # we don't need to think, that our waiting is aka dora
@@ -183,28 +210,58 @@ class ImplementationAI(InterfaceAI):
             win_tile += 1
 
         if not tiles:
-            tiles = copy.copy(self.player.tiles)
+            tiles = hand_state.tiles
+
+        tiles = list(tiles) + [win_tile]
+
+        # hand value depends on dora indicators,
+        # so we can't use old values after new dora indicator
+        if hand_state.dora_indicators != self.hand_value_cache_dora:
+            self.hand_value_cache.clear()
+            self.hand_value_cache_dora = hand_state.dora_indicators
+
+        key = (
+            tuple(sorted(tiles)),
+            win_tile,
+            tuple((x.type, tuple(x.tiles), x.opened) for x in hand_state.melds),
+            call_riichi,
+            is_tsumo,
+            hand_state.player_wind,
+            hand_state.round_wind,
+            hand_state.has_aka_dora,
+            hand_state.has_open_tanyao,
+        )
 
-        tiles += [win_tile]
+        result = self.hand_value_cache.get(key)
+        if result is not None:
+            return result
 
         config = HandConfig(
             is_riichi=call_riichi,
-            player_wind=self.player.player_wind,
-            round_wind=self.player.table.round_wind_tile,
-            has_aka_dora=self.player.table.has_aka_dora,
-            has_open_tanyao=self.player.table.has_open_tanyao,
+            player_wind=hand_state.player_wind,
+            round_wind=hand_state.round_wind,
+            has_aka_dora=hand_state.has_aka_dora,
+            has_open_tanyao=hand_state.has_open_tanyao,
             is_tsumo=is_tsumo,
         )
 
         result = self.finished_hand.estimate_hand_value(tiles,
                                                         win_tile,
-                                                        self.player.melds,
-                                                        self.player.table.dora_indicators,
+                                                        list(hand_state.melds),
+                                                        list(hand_state.dora_indicators),
                                                         config)
+        self.hand_value_cache.set(key, result)
         return result
 
-    def should_call_riichi(self):
-        return self.riichi.should_call_riichi()
+    def cache_statistics(self):
+        return [
+            'Hand cache: {}'.format(self.hand_cache),
+            'Hand value cache: {}'.format(self.hand_value_cache),
+            'Hand divider cache: {}'.format(self.hand_divider.suits_cache),
+        ]
+
+    def should_call_riichi(self, hand_state=None):
+        return self.riichi.should_call_riichi(hand_state)
 
     def should_call_kan(self, tile, open_kan, from_riichi=False):
         """
@@ -238,13 +295,13 @@ class ImplementationAI(InterfaceAI):
                 return None
 
         tile_34 = tile // 4
-        tiles_34 = TilesConverter.to_34_array(self.player.tiles)
+        tiles_34 = list(self.player.tiles_34)
 
-        closed_hand_34 = TilesConverter.to_34_array(self.player.closed_hand)
+        closed_hand_34 = list(self.player.closed_hand_34)
 
-        melds_34 = copy.copy(self.player.meld_34_tiles)
-        tiles = copy.copy(self.player.tiles)
-        closed_hand_tiles = copy.copy(self.player.closed_hand)
+        melds_34 = list(self.player.meld_34_tiles)
+        tiles = list(self.player.tiles)
+        closed_hand_tiles = self.player.closed_hand
 
         new_shanten = 0
         previous_shanten = 0
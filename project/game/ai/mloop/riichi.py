@@ -1,13 +1,22 @@
 from mahjong.tile import TilesConverter
 from mahjong.utils import is_honor, simplify, is_pair, is_chi
 
+from game.ai.hand_state import HandState
+
 
 class Riichi:
 
     def __init__(self, player):
         self.player = player
 
-    def should_call_riichi(self):
+    def should_call_riichi(self, hand_state=None):
+        """
+        :param hand_state: HandState object, by default it is the current player hand
+        :return: boolean
+        """
+        if hand_state is None:
+            hand_state = HandState.from_player(self.player)
+
         # empty waiting can be found in some cases
         if not self.player.ai.waiting:
             return False
@@ -18,7 +27,7 @@ class Riichi:
         # don't call karaten riichi
         count_tiles = self.player.ai.hand_builder.count_tiles(
             self.player.ai.waiting,
-            TilesConverter.to_34_array(self.player.closed_hand)
+            TilesConverter.to_34_array(hand_state.closed_hand)
         )
         if count_tiles == 0:
             return False
@@ -29,28 +38,33 @@ class Riichi:
             return True
 
         if len(self.player.ai.waiting) == 1:
-            return self._should_call_riichi_one_sided()
+            return self._should_call_riichi_one_sided(hand_state)
 
-        return self._should_call_riichi_many_sided()
+        return self._should_call_riichi_many_sided(hand_state)
 
-    def _should_call_riichi_one_sided(self):
+    def _should_call_riichi_one_sided(self, hand_state):
+        closed_hand = hand_state.closed_hand
         count_tiles = self.player.ai.hand_builder.count_tiles(
-            self.player.ai.waiting, TilesConverter.to_34_array(self.player.closed_hand)
+            self.player.ai.waiting, TilesConverter.to_34_array(closed_hand)
         )
         waiting = self.player.ai.waiting[0]
-        hand_value = self.player.ai.estimate_hand_value(waiting, call_riichi=False)
+        hand_value = self.player.ai.estimate_hand_value(waiting, call_riichi=False, hand_state=hand_state)
 
-        tiles = self.player.closed_hand.copy()
-        closed_melds = [x for x in self.player.melds if not x.opened]
+        tiles = closed_hand.copy()
+        closed_melds = [x for x in hand_state.melds if not x.opened]
         for meld in closed_melds:
             tiles.extend(meld.tiles[:3])
 
         results, tiles_34 = self.player.ai.hand_builder.divide_hand(tiles, waiting)
         result = results[0]
 
-        closed_tiles_34 = TilesConverter.to_34_array(self.player.closed_hand)
+        closed_tiles_34 = TilesConverter.to_34_array(closed_hand)
 
-        have_suji, have_kabe = self.player.ai.hand_builder.check_suji_and_kabe(closed_tiles_34, waiting)
+        have_suji, have_kabe = self.player.ai.hand_builder.check_suji_and_kabe(
+            closed_tiles_34,
+            waiting,
+            hand_state
+        )
 
         # what if we have yaku
         if hand_value.yaku is not None and hand_value.cost is not None:
@@ -169,15 +183,15 @@ class Riichi:
 
         return True
 
-    def _should_call_riichi_many_sided(self):
+    def _should_call_riichi_many_sided(self, hand_state):
         count_tiles = self.player.ai.hand_builder.count_tiles(
             self.player.ai.waiting,
-            TilesConverter.to_34_array(self.player.closed_hand)
+            TilesConverter.to_34_array(hand_state.closed_hand)
         )
         hand_costs = []
         waits_with_yaku = 0
         for waiting in self.player.ai.waiting:
-            hand_value = self.player.ai.estimate_hand_value(waiting, call_riichi=False)
+            hand_value = self.player.ai.estimate_hand_value(waiting, call_riichi=False, hand_state=hand_state)
             if hand_value.error is None:
                 hand_costs.append(hand_value.cost['main'])
                 if hand_value.yaku is not None and hand_value.cost is not None:
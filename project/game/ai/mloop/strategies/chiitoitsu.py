@@ -1,6 +1,4 @@
 # -*- coding: utf-8 -*-
-from mahjong.tile import TilesConverter
-
 from game.ai.mloop.strategies.main import BaseStrategy
 
 
@@ -16,7 +14,7 @@ class ChiitoitsuStrategy(BaseStrategy):
         if not result:
             return False
 
-        tiles_34 = TilesConverter.to_34_array(self.player.tiles)
+        tiles_34 = self.player.tiles_34
 
         num_pairs = len([x for x in range(0, 34) if tiles_34[x] == 2])
         num_pons = len([x for x in range(0, 34) if tiles_34[x] == 3])
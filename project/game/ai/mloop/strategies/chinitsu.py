@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 from mahjong.tile import TilesConverter
 from mahjong.utils import count_tiles_by_suits, is_tile_strictly_isolated
-from mahjong.utils import is_man, is_pin, is_sou, plus_dora, is_aka_dora, is_honor
+from mahjong.utils import is_man, is_pin, is_sou, is_honor
 
 from game.ai.mloop.strategies.main import BaseStrategy
 from game.ai.mloop.strategies.honitsu import HonitsuStrategy
@@ -26,7 +26,7 @@ class ChinitsuStrategy(BaseStrategy):
 
         # when making decisions about chinitsu, we should consider
         # the state of our own hand,
-        tiles_34 = TilesConverter.to_34_array(self.player.tiles)
+        tiles_34 = self.player.tiles_34
         suits = count_tiles_by_suits(tiles_34)
 
         suits = [x for x in suits if x['name'] != 'honor']
@@ -90,7 +90,7 @@ class ChinitsuStrategy(BaseStrategy):
 
         # if we have a pair of honor doras, let's not go for chinitsu
         honor_doras_pairs = len([x for x in range(0, 34) if is_honor(x) and tiles_34[x] == 2
-                                 and plus_dora(x * 4, self.player.table.dora_indicators)])
+                                 and self.player.table.dora_count_34[x]])
         if honor_doras_pairs >= 1:
             return False
 
@@ -145,10 +145,7 @@ class ChinitsuStrategy(BaseStrategy):
         for tile_136 in tiles_136:
             tile_34 = tile_136 // 4
 
-            dora_count = plus_dora(tile_136, self.player.table.dora_indicators)
-
-            if is_aka_dora(tile_136, self.player.table.has_aka_dora):
-                dora_count += 1
+            dora_count = self.player.table.dora_count_136[tile_136]
 
             if is_man(tile_34):
                 dora_count_man += dora_count
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 from mahjong.tile import TilesConverter
 from mahjong.utils import count_tiles_by_suits, simplify, is_tile_strictly_isolated
-from mahjong.utils import is_man, is_pin, is_sou, plus_dora, is_aka_dora, is_honor
+from mahjong.utils import is_man, is_pin, is_sou, is_honor
 
 from game.ai.mloop.strategies.main import BaseStrategy
 
@@ -58,14 +58,14 @@ class HonitsuStrategy(BaseStrategy):
         # we have a mangan anyway, let's go for fastest hand
         valued_pons = [x for x in self.player.valued_honors if tiles_34[x] >= 3]
         for pon in valued_pons:
-            dora_count = plus_dora(pon * 4, self.player.table.dora_indicators)
+            dora_count = self.player.table.dora_count_34[pon]
             if dora_count > 0:
                 return False
 
         valued_pairs = len([x for x in self.player.valued_honors if tiles_34[x] == 2])
         honor_pairs_or_pons = len([x for x in range(0, 34) if is_honor(x) and tiles_34[x] >= 2])
         honor_doras_pairs_or_pons = len([x for x in range(0, 34) if is_honor(x) and tiles_34[x] >= 2
-                                         and plus_dora(x * 4, self.player.table.dora_indicators)])
+                                         and self.player.table.dora_count_34[x]])
         unvalued_singles = len([x for x in range(0, 34) if is_honor(x)
                                 and x not in self.player.valued_honors
                                 and tiles_34[x] == 1])
@@ -162,10 +162,7 @@ class HonitsuStrategy(BaseStrategy):
         for tile_136 in tiles_136:
             tile_34 = tile_136 // 4
 
-            dora_count = plus_dora(tile_136, self.player.table.dora_indicators)
-
-            if is_aka_dora(tile_136, self.player.table.has_aka_dora):
-                dora_count += 1
+            dora_count = self.player.table.dora_count_136[tile_136]
 
             if is_man(tile_34):
                 if not is_tile_strictly_isolated(tiles_34, tile_34):
@@ -3,7 +3,7 @@ import utils.decisions_constants as log
 
 from mahjong.meld import Meld
 from mahjong.tile import TilesConverter
-from mahjong.utils import is_man, is_pin, is_sou, is_pon, is_chi, plus_dora, is_aka_dora, is_honor, is_terminal
+from mahjong.utils import is_man, is_pin, is_sou, is_pon, is_chi, is_aka_dora, is_honor, is_terminal
 
 from utils.decisions_logger import DecisionsLogger
 
@@ -221,7 +221,7 @@ class BaseStrategy(object):
         for tile_136 in tiles_136:
             tile_34 = tile_136 // 4
 
-            dora_count = plus_dora(tile_136, self.player.table.dora_indicators)
+            dora_count = self.player.table.dora_count_34[tile_34]
 
             if is_aka_dora(tile_136, self.player.table.has_aka_dora):
                 self.aka_dora_count += 1
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from mahjong.constants import TERMINAL_INDICES, HONOR_INDICES
-from mahjong.tile import TilesConverter
 from mahjong.utils import is_honor
 from mahjong.utils import is_tile_strictly_isolated
 
@@ -32,9 +31,9 @@ class TanyaoStrategy(BaseStrategy):
         if not result:
             return False
 
-        tiles = TilesConverter.to_34_array(self.player.tiles)
+        tiles = self.player.tiles_34
 
-        closed_hand_34 = TilesConverter.to_34_array(self.player.closed_hand)
+        closed_hand_34 = list(self.player.closed_hand_34)
         isolated_tiles = [x // 4 for x in self.player.tiles
                           if is_tile_strictly_isolated(closed_hand_34, x // 4) or is_honor(x // 4)]
 
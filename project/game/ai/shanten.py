@@ -0,0 +1,511 @@
+# -*- coding: utf-8 -*-
+import math
+import os
+
+import numpy as np
+from mahjong.shanten import Shanten
+
+# big enough value for impossible decompositions
+INFINITY = 99
+
+# 5 ** x, to pack 0-4 tile counts into the single integer
+POWERS_OF_FIVE = [5 ** x for x in range(0, 9)]
+
+# the same powers for the vectorized keys packing
+SUIT_POWERS = np.array(POWERS_OF_FIVE, dtype=np.int64)
+HONOR_POWERS = SUIT_POWERS[:7]
+
+TERMINAL_AND_HONOR_INDICES = [0, 8, 9, 17, 18, 26, 27, 28, 29, 30, 31, 32, 33]
+
+# we can't have more tiles of one suit in the hand
+MAX_SUIT_TILES = 14
+# summary value for suit vectors that were not saved to the tables file
+NOT_IN_FILE = 255
+TABLES_FILE_HEADER = b'SHANTEN1'
+
+
+def _build_neighbours():
+    neighbours = []
+    for tile in range(0, 27):
+        suit_start = tile - tile % 9
+        first = max(tile - 2, suit_start)
+        last = min(tile + 2, suit_start + 8)
+        neighbours.append((first, last + 1))
+
+    # honor tiles can be used only with the same tiles
+    for tile in range(27, 34):
+        neighbours.append((tile, tile + 1))
+    return neighbours
+
+
+# slice of tiles that can be used in one set with the tile
+NEIGHBOURS = _build_neighbours()
+
+
+class DecompositionTable(object):
+    """
+    Table of the suit decompositions.
+
+    Each 0-4 count vector of a suit (9 tiles) or of honors (7 tiles) is packed
+    into a base-5 integer and mapped to the summary of its best decompositions:
+    a tuple of 10 values, where value with index `sets + 5 * pair`
+    is the minimal count of tiles that we need to draw
+    to turn the suit into `sets` sets (0-4) with or without a pair.
+
+    Summaries are calculated once and shared between all hands and all bots in the process.
+    """
+
+    def __init__(self, size, with_chi):
+        self.size = size
+        self.with_chi = with_chi
+
+        self.summaries = {}
+        # partial results for suffixes of the suit,
+        # they are shared between different suit vectors
+        self._suffixes = {}
+        # precomputed summaries for all suit vectors, see load_tables()
+        self.mapped = None
+
+    def attach(self, mapped):
+        """
+        Use precomputed summaries instead of the calculation
+        :param mapped: numpy array with summary in each row, usually memory-mapped file
+        """
+        self.mapped = mapped
+        self.summaries = {}
+        self._suffixes = {}
+
+    def get(self, key):
+        """
+        :param key: suit count vector packed with pack_key()
+        :return: tuple of 10 values
+        """
+        summary = self.summaries.get(key)
+        if summary is not None:
+            return summary
+
+        if self.mapped is not None:
+            summary = self.mapped[key]
+            if summary[0] != NOT_IN_FILE:
+                return tuple(summary.tolist())
+
+        summary = self._calculate_suffix(0, key, 0, 0)
+        self.summaries[key] = summary
+        return summary
+
+    def get_many(self, keys):
+        """
+        :param keys: numpy array of packed suit vectors
+        :return: numpy array with summary in each row
+        """
+        if self.mapped is not None:
+            summaries = self.mapped[keys].astype(np.int32)
+            for index in np.flatnonzero(summaries[:, 0] == NOT_IN_FILE):
+                summaries[index] = self.get(int(keys[index]))
+            return summaries
+
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        summaries = np.array([self.get(int(x)) for x in unique_keys], dtype=np.int32)
+        return summaries[inverse.reshape(-1)]
+
+    def pack_key(self, tiles_34, first_index):
+        key = 0
+        for x in range(0, self.size):
+            key += tiles_34[first_index + x] * POWERS_OF_FIVE[x]
+        return key
+
+    def build_summaries(self):
+        """
+        Calculate summaries for all suit vectors that can be in the hand
+        :return: numpy array with summary in each row
+        """
+        keys_count = 5 ** self.size
+        keys = np.arange(keys_count, dtype=np.int64)
+
+        tiles_count = np.zeros(keys_count, dtype=np.int64)
+        for x in range(0, self.size):
+            tiles_count += keys // POWERS_OF_FIVE[x] % 5
+
+        summaries = np.full((keys_count, 10), NOT_IN_FILE, dtype=np.uint8)
+        block = None
+        for key in np.flatnonzero(tiles_count <= MAX_SUIT_TILES).tolist():
+            # keys with the same last tiles are near each other,
+            # so we can drop suffixes of the previous keys to save memory
+            if key // 625 != block:
+                block = key // 625
+                self._suffixes = {}
+
+            summaries[key] = self._calculate_suffix(0, key, 0, 0)
+
+        self._suffixes = {}
+        return summaries
+
+    def _calculate_suffix(self, position, key, started_before, started_two_before):
+        """
+        :param position: current tile in the suit
+        :param key: packed counts of the suit tiles starting from the current position
+        :param started_before: count of chi that were started on the previous tile
+        :param started_two_before: count of chi that were started two tiles ago
+        :return: tuple of 10 values
+        """
+        if position == self.size:
+            return (0,) + (INFINITY,) * 9
+
+        memo_key = (position, key, started_before, started_two_before)
+        result = self._suffixes.get(memo_key)
+        if result is not None:
+            return result
+
+        count = key % 5
+        next_key = key // 5
+        used_by_chi = started_before + started_two_before
+
+        can_start_chi = self.with_chi and position < self.size - 2
+        max_chi = can_start_chi and 4 - used_by_chi or 0
+
+        result = [INFINITY] * 10
+        for chi in range(0, max_chi + 1):
+            suffix = self._calculate_suffix(position + 1, next_key, chi, started_before)
+            for pon in (0, 1):
+                for pair in (0, 1):
+                    needed = used_by_chi + chi + pon * 3 + pair * 2
+                    if needed > 4:
+                        continue
+
+                    cost = needed > count and needed - count or 0
+                    sets = chi + pon
+                    for suffix_sets in range(0, 5 - sets):
+                        for suffix_pair in range(0, 2 - pair):
+                            suffix_cost = suffix[suffix_sets + 5 * suffix_pair]
+                            if suffix_cost == INFINITY:
+                                continue
+
+                            index = suffix_sets + sets + 5 * (suffix_pair + pair)
+                            if cost + suffix_cost < result[index]:
+                                result[index] = cost + suffix_cost
+
+        result = tuple(result)
+        self._suffixes[memo_key] = result
+        return result
+
+
+def merge_summaries(first, second):
+    """
+    Combine summaries of two independent tile groups
+    :return: tuple of 10 values
+    """
+    return tuple([min([first[x] + second[y] for x, y in pairs]) for pairs in MERGE_INDICES])
+
+
+def _build_merge_indices():
+    indices = []
+    for pair in (0, 1):
+        for sets in range(0, 5):
+            pairs = []
+            for first_sets in range(0, sets + 1):
+                for first_pair in range(0, pair + 1):
+                    pairs.append((first_sets + 5 * first_pair, sets - first_sets + 5 * (pair - first_pair)))
+            indices.append(pairs)
+    return indices
+
+
+# for each summary index, pairs of indices from two merged summaries
+MERGE_INDICES = _build_merge_indices()
+# the same indices, but as arrays for the vectorized merge
+MERGE_INDICES_ARRAYS = [(np.array([x for x, _ in pairs]), np.array([y for _, y in pairs])) for pairs in MERGE_INDICES]
+
+
+def merge_summaries_batch(first, second):
+    """
+    Combine summaries of two independent tile groups for many hands at once
+    :param first: numpy array with summary in each row
+    :param second: numpy array with summary in each row
+    :return: numpy array with summary in each row
+    """
+    result = np.empty(first.shape, dtype=first.dtype)
+    for index, (first_indices, second_indices) in enumerate(MERGE_INDICES_ARRAYS):
+        result[:, index] = (first[:, first_indices] + second[:, second_indices]).min(axis=1)
+    return result
+
+
+class MergedTable(object):
+    """
+    Cache of merged summaries for two tile groups.
+    Usually only one suit is changed between two shanten calculations,
+    so the merge for the other pair of groups is already here
+    """
+    # merged summaries are cheap to recalculate,
+    # so we just drop them all when we have too many
+    max_size = 200000
+
+    def __init__(self, first_table, second_table):
+        self.first_table = first_table
+        self.second_table = second_table
+        self.summaries = {}
+
+    def get(self, first_key, second_key):
+        key = (first_key, second_key)
+        summary = self.summaries.get(key)
+        if summary is None:
+            if len(self.summaries) >= self.max_size:
+                self.summaries = {}
+
+            summary = merge_summaries(self.first_table.get(first_key), self.second_table.get(second_key))
+            self.summaries[key] = summary
+        return summary
+
+
+# tables are shared between all shanten calculators
+SUIT_TABLE = DecompositionTable(9, with_chi=True)
+HONOR_TABLE = DecompositionTable(7, with_chi=False)
+
+MAN_PIN_TABLE = MergedTable(SUIT_TABLE, SUIT_TABLE)
+SOU_HONOR_TABLE = MergedTable(SUIT_TABLE, HONOR_TABLE)
+
+
+def save_tables(file_name):
+    """
+    Calculate summaries for all suit vectors and save them to the file
+    """
+    with open(file_name, 'wb') as f:
+        f.write(TABLES_FILE_HEADER)
+        f.write(SUIT_TABLE.build_summaries().tobytes())
+        f.write(HONOR_TABLE.build_summaries().tobytes())
+
+
+def load_tables(file_name):
+    """
+    Open the file saved by save_tables() in the read only mode.
+    File is memory-mapped, so all bot processes on the machine share one copy of it
+    :return: boolean, was the file loaded or not
+    """
+    suit_shape = (5 ** SUIT_TABLE.size, 10)
+    honor_shape = (5 ** HONOR_TABLE.size, 10)
+    file_size = len(TABLES_FILE_HEADER) + suit_shape[0] * 10 + honor_shape[0] * 10
+
+    if not file_name or not os.path.exists(file_name) or os.path.getsize(file_name) != file_size:
+        return False
+
+    with open(file_name, 'rb') as f:
+        if f.read(len(TABLES_FILE_HEADER)) != TABLES_FILE_HEADER:
+            return False
+
+    offset = len(TABLES_FILE_HEADER)
+    suits = np.memmap(file_name, dtype=np.uint8, mode='r', offset=offset, shape=suit_shape)
+    offset += suits.size
+    honors = np.memmap(file_name, dtype=np.uint8, mode='r', offset=offset, shape=honor_shape)
+
+    SUIT_TABLE.attach(suits)
+    HONOR_TABLE.attach(honors)
+    return True
+
+
+def pack_hand_keys(tiles_34):
+    """
+    :param tiles_34: 34 tiles format array
+    :return: packed man, pin, sou and honor keys
+    """
+    return (
+        SUIT_TABLE.pack_key(tiles_34, 0),
+        SUIT_TABLE.pack_key(tiles_34, 9),
+        SUIT_TABLE.pack_key(tiles_34, 18),
+        HONOR_TABLE.pack_key(tiles_34, 27),
+    )
+
+
+def find_neighbour_tiles(tiles_34):
+    """
+    Tiles that are close enough to the hand tiles to lower regular hand shanten.
+    Drawn tile that is not within +-2 of our suit tiles
+    (or is not the same honor) can't be used in any set or pair with our hand
+    :param tiles_34: 34 tiles format array
+    :return: array of tiles in 34 format
+    """
+    return [x for x in range(0, 34) if any(tiles_34[NEIGHBOURS[x][0]:NEIGHBOURS[x][1]])]
+
+
+class TableShanten(object):
+    """
+    Shanten calculator built on the per-suit decomposition tables.
+    It has the same interface as mahjong.shanten.Shanten,
+    but hand shanten is four table lookups and a small merge.
+
+    Results differ from mahjong.shanten.Shanten for hands where all four copies
+    of a tile are needed for the wait. We don't count a wait on the fifth copy,
+    so 1111s123456789m is 1-shanten here and tempai in the library
+    """
+    AGARI_STATE = Shanten.AGARI_STATE
+    # we return it for the chiitoitsu and kokushi in the opened hand
+    NOT_AVAILABLE = 8
+
+    def calculate_shanten(self, tiles_34, open_sets_34=None, chiitoitsu=True, kokushi=True):
+        """
+        Return the count of tiles before tempai
+        :param tiles_34: 34 tiles format array
+        :param open_sets_34: array of array of 34 tiles format
+        :param chiitoitsu: bool
+        :param kokushi: bool
+        :return: int
+        """
+        regular, chiitoitsu_shanten, kokushi_shanten = self.calculate_shanten_for_hand(tiles_34, open_sets_34)
+
+        shanten = regular
+        if chiitoitsu and chiitoitsu_shanten < shanten:
+            shanten = chiitoitsu_shanten
+
+        if kokushi and kokushi_shanten < shanten:
+            shanten = kokushi_shanten
+
+        return shanten
+
+    def calculate_shanten_for_hand(self, tiles_34, open_sets_34=None):
+        """
+        Calculate all hand forms in one call
+        :param tiles_34: 34 tiles format array, with tiles from open sets
+        :param open_sets_34: array of array of 34 tiles format
+        :return: regular, chiitoitsu and kokushi shanten
+        """
+        count_of_tiles = sum(tiles_34)
+        if count_of_tiles > 14:
+            return -2, -2, -2
+
+        # for hands with less than 13 tiles we pretend that missing sets are completed
+        needed_sets = 4 - math.floor((14 - count_of_tiles) / 3)
+
+        if open_sets_34:
+            tiles_34 = list(tiles_34)
+            for meld in open_sets_34:
+                tiles_34[meld[0]] -= 1
+                tiles_34[meld[1]] -= 1
+                tiles_34[meld[2]] -= 1
+            needed_sets -= len(open_sets_34)
+
+            chiitoitsu_shanten = self.NOT_AVAILABLE
+            kokushi_shanten = self.NOT_AVAILABLE
+        else:
+            chiitoitsu_shanten, kokushi_shanten = self.calculate_chiitoitsu_and_kokushi(tiles_34)
+
+        regular = self.calculate_regular_shanten(tiles_34, needed_sets)
+        return regular, chiitoitsu_shanten, kokushi_shanten
+
+    def calculate_regular_shanten(self, tiles_34, needed_sets=4):
+        """
+        :param tiles_34: 34 tiles format array, without tiles from open sets
+        :param needed_sets: how much sets we need to collect in the closed part of the hand
+        :return: int
+        """
+        return self.calculate_shanten_for_keys(pack_hand_keys(tiles_34), needed_sets)
+
+    def calculate_shanten_for_keys(self, keys, needed_sets=4):
+        """
+        Regular hand shanten for already packed suits
+        :param keys: man, pin, sou and honor keys from pack_hand_keys()
+        :param needed_sets: how much sets we need to collect in the closed part of the hand
+        :return: int
+        """
+        if needed_sets < 0:
+            needed_sets = 0
+
+        man, pin, sou, honors = keys
+        first = MAN_PIN_TABLE.get(man, pin)
+        second = SOU_HONOR_TABLE.get(sou, honors)
+
+        # pair can be in the any of two groups
+        distance = INFINITY
+        for sets in range(0, needed_sets + 1):
+            other_sets = needed_sets - sets
+            value = min(first[sets + 5] + second[other_sets], first[sets] + second[other_sets + 5])
+            if value < distance:
+                distance = value
+
+        # we need one more tile to complete the tempai hand
+        return distance - 1
+
+    def calculate_shanten_batch(self, tiles_matrix, open_sets_34=None):
+        """
+        Vectorized version of calculate_shanten_for_hand()
+        :param tiles_matrix: numpy array with a hand in 34 tiles format in each row, with tiles from open sets
+        :param open_sets_34: array of array of 34 tiles format, the same for all hands
+        :return: numpy arrays with regular, chiitoitsu and kokushi shanten
+        """
+        count_of_tiles = tiles_matrix.sum(axis=1)
+        needed_sets = 4 - (14 - count_of_tiles) // 3
+
+        if open_sets_34:
+            tiles_matrix = tiles_matrix.copy()
+            for meld in open_sets_34:
+                tiles_matrix[:, meld[0]] -= 1
+                tiles_matrix[:, meld[1]] -= 1
+                tiles_matrix[:, meld[2]] -= 1
+            needed_sets -= len(open_sets_34)
+
+            chiitoitsu_shanten = np.full(len(tiles_matrix), self.NOT_AVAILABLE)
+            kokushi_shanten = np.full(len(tiles_matrix), self.NOT_AVAILABLE)
+        else:
+            chiitoitsu_shanten, kokushi_shanten = self.calculate_chiitoitsu_and_kokushi_batch(tiles_matrix)
+
+        regular = self.calculate_regular_shanten_batch(tiles_matrix, needed_sets)
+
+        too_many_tiles = count_of_tiles > 14
+        if too_many_tiles.any():
+            regular[too_many_tiles] = -2
+            chiitoitsu_shanten[too_many_tiles] = -2
+            kokushi_shanten[too_many_tiles] = -2
+
+        return regular, chiitoitsu_shanten, kokushi_shanten
+
+    def calculate_regular_shanten_batch(self, tiles_matrix, needed_sets):
+        """
+        :param tiles_matrix: numpy array with a hand in 34 tiles format in each row, without tiles from open sets
+        :param needed_sets: numpy array, how much sets we need to collect in the closed part of each hand
+        :return: numpy array
+        """
+        needed_sets = np.clip(needed_sets, 0, 4)
+
+        summary = merge_summaries_batch(
+            merge_summaries_batch(
+                SUIT_TABLE.get_many(tiles_matrix[:, 0:9].dot(SUIT_POWERS)),
+                SUIT_TABLE.get_many(tiles_matrix[:, 9:18].dot(SUIT_POWERS))
+            ),
+            merge_summaries_batch(
+                SUIT_TABLE.get_many(tiles_matrix[:, 18:27].dot(SUIT_POWERS)),
+                HONOR_TABLE.get_many(tiles_matrix[:, 27:34].dot(HONOR_POWERS))
+            )
+        )
+
+        return summary[np.arange(len(summary)), needed_sets + 5] - 1
+
+    def calculate_chiitoitsu_and_kokushi_batch(self, tiles_matrix):
+        """
+        :param tiles_matrix: numpy array with a hand in 34 tiles format in each row
+        :return: numpy arrays with chiitoitsu and kokushi shanten
+        """
+        terminals_matrix = tiles_matrix[:, TERMINAL_AND_HONOR_INDICES]
+        completed_terminals = (terminals_matrix >= 2).any(axis=1)
+        terminals = (terminals_matrix != 0).sum(axis=1)
+
+        completed_pairs = (tiles_matrix >= 2).sum(axis=1)
+        pairs = (tiles_matrix != 0).sum(axis=1)
+
+        chiitoitsu_shanten = 6 - completed_pairs + np.maximum(7 - pairs, 0)
+        kokushi_shanten = 13 - terminals - completed_terminals
+
+        return chiitoitsu_shanten, kokushi_shanten
+
+    def calculate_chiitoitsu_and_kokushi(self, tiles_34):
+        completed_terminals = 0
+        terminals = 0
+        for x in TERMINAL_AND_HONOR_INDICES:
+            completed_terminals += tiles_34[x] >= 2
+            terminals += tiles_34[x] != 0
+
+        completed_pairs = 0
+        pairs = 0
+        for x in tiles_34:
+            completed_pairs += x >= 2
+            pairs += x != 0
+
+        chiitoitsu_shanten = 6 - completed_pairs + (pairs < 7 and 7 - pairs or 0)
+        kokushi_shanten = 13 - terminals - (completed_terminals and 1 or 0)
+
+        return chiitoitsu_shanten, kokushi_shanten
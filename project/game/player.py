@@ -1,22 +1,28 @@
 # -*- coding: utf-8 -*-
 import logging
-import copy
+
 import utils.decisions_constants as log
 
+import numpy as np
+
 from mahjong.constants import EAST, SOUTH, WEST, NORTH, CHUN, HAKU, HATSU
 from mahjong.meld import Meld
-from mahjong.tile import TilesConverter, Tile
+from mahjong.tile import TilesConverter
+
+from game.river import DiscardRiver
 
 from utils.decisions_logger import DecisionsLogger
 from utils.settings_handler import settings
+from utils.tiles_mask import tiles_to_mask, mask_to_tiles
 
 logger = logging.getLogger('tenhou')
 
+TILES_136 = np.arange(136)
+
 
 class PlayerInterface(object):
     table = None
-    discards = None
-    melds = None
+    river = None
     in_riichi = None
     round_step = None
 
@@ -35,6 +41,12 @@ class PlayerInterface(object):
     name = ''
     rank = ''
 
+    _melds = None
+    # melds in 34 format, they are updated together with melds
+    _meld_34_tiles = ()
+    # count of melds that were used for _meld_34_tiles
+    _melds_count = None
+
     def __init__(self, table, seat, dealer_seat):
         self.table = table
         self.seat = seat
@@ -56,7 +68,7 @@ class PlayerInterface(object):
         return self.__str__()
 
     def erase_state(self):
-        self.discards = []
+        self.river = DiscardRiver()
         self.melds = []
         self.in_riichi = False
         self.position = 0
@@ -64,6 +76,34 @@ class PlayerInterface(object):
         self.uma = 0
         self.round_step = 0
 
+    def snapshot(self):
+        """
+        Immutable copy of the player state, melds are shared with it.
+        It can be restored many times with restore()
+        :return: tuple
+        """
+        return (
+            self.river.snapshot(),
+            tuple(self.melds),
+            self.in_riichi,
+            self.round_step,
+            self.dealer_seat,
+            self.scores,
+            self.position,
+            self.uma,
+        )
+
+    def restore(self, state):
+        """
+        :param state: value from snapshot()
+        :return: rest of the state, that wasn't used by this class
+        """
+        river, melds, self.in_riichi, self.round_step, self.dealer_seat, self.scores, self.position, self.uma = \
+            state[:8]
+        self.river.restore(river)
+        self.melds = list(melds)
+        return state[8:]
+
     def add_called_meld(self, meld: Meld):
         # we already added shouminkan as a pon set
         if meld.type == Meld.CHANKAN:
@@ -77,20 +117,36 @@ class PlayerInterface(object):
                 self.melds.remove(pon_set[0])
 
         self.melds.append(meld)
+        # shouminkan doesn't change count of melds, so we need to drop cached value here
+        self._melds_changed()
 
-    def add_discarded_tile(self, tile: Tile):
-        self.discards.append(tile)
+    def add_discarded_tile(self, tile_136, is_tsumogiri=False):
+        """
+        :param tile_136: 136 format tile
+        :param is_tsumogiri: was tile discarded from hand or not
+        """
+        # the first discard after riichi call is the riichi declaration tile
+        is_riichi = self.in_riichi and not self.river.is_riichi.any()
+        self.river.append(tile_136, is_tsumogiri, is_riichi, self.round_step)
 
         # all tiles that were discarded after player riichi will be safe against him
         # because of furiten
-        tile = tile.value // 4
+        tile_bit = 1 << (tile_136 // 4)
         for player in self.table.players[1:]:
-            if player.in_riichi and tile not in player.safe_tiles:
-                player.safe_tiles.append(tile)
+            if player.in_riichi:
+                player.riichi_safe_tiles_mask |= tile_bit
 
         # one discard == one round step
         self.round_step += 1
 
+    @property
+    def discards(self):
+        """
+        Copy of the river for code that works with Tile objects
+        :return: array of Tile objects
+        """
+        return self.river.to_tiles()
+
     @property
     def player_wind(self):
         position = self.dealer_seat
@@ -123,28 +179,66 @@ class PlayerInterface(object):
             result.extend(meld.tiles)
         return result
 
+    @property
+    def melds(self):
+        return self._melds
+
+    @melds.setter
+    def melds(self, melds):
+        self._melds = melds
+        self._melds_changed()
+
     @property
     def meld_34_tiles(self):
         """
-        Array of array with 34 tiles indices
-        :return: array
+        Melds in 34 format, they can be passed to shanten and agari calculators as open sets.
+        It is a cached tuple, so it shouldn't be changed by the caller
+        :return: tuple of tuples with 34 tiles indices
         """
-        melds = [x.tiles for x in self.melds]
-        melds = copy.deepcopy(melds)
-        results = []
-        for meld in melds:
-            results.append([meld[0] // 4, meld[1] // 4, meld[2] // 4])
-        return results
+        # melds can be added without add_called_meld() (for example in tests)
+        if self._melds_count != len(self.melds):
+            self._update_meld_34_tiles()
+        return self._meld_34_tiles
+
+    def _update_meld_34_tiles(self):
+        self._meld_34_tiles = tuple([(x.tiles[0] // 4, x.tiles[1] // 4, x.tiles[2] // 4) for x in self.melds])
+        self._melds_count = len(self.melds)
+
+    def _melds_changed(self):
+        self._melds_count = None
 
 
 class Player(PlayerInterface):
     ai = None
-    tiles = None
     last_draw = None
     in_tempai = False
     in_defence_mode = False
 
+    # it is increased on every hand change, so values calculated from the hand can be cached
+    hand_version = 0
+
+    # the hand is stored as a set of tiles and counts of tiles,
+    # they are updated by draws, discards and melds
+    # numpy array with 1 for each tile in the hand (with tiles from melds) in 136 format
+    _tiles_136 = None
+    # numpy array with 1 for each tile from our melds in 136 format
+    _meld_tiles_136 = None
+    # numpy arrays of counts in 34 format
+    _tiles_34 = None
+    _closed_hand_34 = None
+    # sorted views are built on demand and kept until the next hand change
+    _tiles = None
+    _closed_hand = None
+    _tiles_34_view = None
+    _closed_hand_34_view = None
+
     def __init__(self, table, seat, dealer_seat):
+        # melds are set before tiles during the state erase
+        self._meld_tiles_136 = np.zeros(136, dtype=np.int64)
+        self._tiles_136 = np.zeros(136, dtype=np.int64)
+        self._tiles_34 = np.zeros(34, dtype=np.int64)
+        self._closed_hand_34 = np.zeros(34, dtype=np.int64)
+
         super().__init__(table, seat, dealer_seat)
 
         self.ai = settings.AI_CLASS(self)
@@ -160,6 +254,19 @@ class Player(PlayerInterface):
         if self.ai:
             self.ai.erase_state()
 
+    def snapshot(self):
+        # tiles are enough to build the whole hand state again
+        return super().snapshot() + (
+            self.tiles,
+            self.last_draw,
+            self.in_tempai,
+            self.in_defence_mode,
+        )
+
+    def restore(self, state):
+        self.tiles, self.last_draw, self.in_tempai, self.in_defence_mode = super().restore(state)
+        return ()
+
     def config_ai_params(self,params):
         self.ai.load_params(params)
 
@@ -180,10 +287,7 @@ class Player(PlayerInterface):
         )
 
         self.last_draw = tile_136
-        self.tiles.append(tile_136)
-
-        # we need sort it to have a better string presentation
-        self.tiles = sorted(self.tiles)
+        self._add_tile(tile_136)
 
         self.ai.draw_tile(tile_136)
 
@@ -199,14 +303,67 @@ class Player(PlayerInterface):
         # it is important to use table method,
         # to recalculate revealed tiles and etc.
         self.table.add_discarded_tile(0, tile_to_discard, is_tsumogiri)
-        self.tiles.remove(tile_to_discard)
+
+        self._remove_tile(tile_to_discard)
 
         return tile_to_discard
 
+    def apply_draw(self, tile_136):
+        """
+        Add tile to the hand without AI decisions and logs, it is used by the search.
+        Use Table.apply_draw() instead of it
+        :param tile_136: 136 format tile
+        :return: value for undo_draw()
+        """
+        undo = (self.last_draw, tile_136)
+        self.last_draw = tile_136
+        self._add_tile(tile_136)
+        return undo
+
+    def undo_draw(self, undo):
+        self.last_draw, tile_136 = undo
+        self._remove_tile(tile_136)
+
+    def apply_discard(self, tile_136):
+        """
+        Remove tile from the hand, discard itself is added by Table.apply_discard()
+        :param tile_136: 136 format tile
+        :return: value for undo_discard()
+        """
+        self._remove_tile(tile_136)
+        return tile_136
+
+    def undo_discard(self, undo):
+        self._add_tile(undo)
+
+    def apply_called_tile(self, meld):
+        """
+        Add called tile to the hand before the meld, meld itself is added by Table.apply_meld()
+        :param meld: Meld object
+        :return: value for undo_called_tile()
+        """
+        added_tile = None
+        if meld.called_tile is not None and not self.has_tile(meld.called_tile):
+            added_tile = meld.called_tile
+            self._add_tile(added_tile)
+        return added_tile
+
+    def undo_called_tile(self, undo):
+        if undo is not None:
+            self._remove_tile(undo)
+
     def can_call_riichi(self):
         result = self.formal_riichi_conditions()
         return result and self.ai.should_call_riichi()
 
+    def call_riichi(self):
+        """
+        We decided to call riichi after our discard,
+        so the last discard is the riichi declaration tile
+        """
+        self.in_riichi = True
+        self.river.set_riichi()
+
     def formal_riichi_conditions(self):
         return all([
             self.in_tempai,
@@ -241,6 +398,16 @@ class Player(PlayerInterface):
         assert revealed_tiles <= 4, 'we have only 4 tiles in the game'
         return revealed_tiles
 
+    def live_tiles(self, tiles_34=None):
+        """
+        Count of each tile that we still can draw (it is not in our hand and it wasn't revealed)
+        :param tiles_34: closed hand in 34 format, by default it is our current closed hand
+        :return: numpy array of 34 counts
+        """
+        if tiles_34 is None:
+            tiles_34 = self._closed_hand_34
+        return self.table.unseen_tiles - tiles_34
+
     def format_hand_for_print(self, tile_136=None):
         hand_string = '{}'.format(TilesConverter.to_one_line_string(self.closed_hand))
 
@@ -256,10 +423,104 @@ class Player(PlayerInterface):
 
         return hand_string
 
+    @property
+    def tiles(self):
+        """
+        Sorted tiles of the hand (with tiles from melds). It is a read-only view,
+        the whole hand can be replaced with the setter
+        :return: tuple of tiles in 136 format
+        """
+        if self._tiles is None:
+            self._tiles = tuple(np.repeat(TILES_136, self._tiles_136).tolist())
+        return self._tiles
+
+    @tiles.setter
+    def tiles(self, tiles):
+        self._tiles_136[:] = 0
+        self._tiles_34[:] = 0
+        self._closed_hand_34[:] = 0
+        for tile in tiles:
+            self._add_tile(tile)
+        self._hand_changed()
+
     @property
     def closed_hand(self):
-        tiles = self.tiles[:]
-        return [item for item in tiles if item not in self.meld_tiles]
+        """
+        Copy of the closed hand, it can be changed by the caller
+        :return: array of tiles in 136 format
+        """
+        return list(self.closed_hand_tiles)
+
+    @property
+    def closed_hand_tiles(self):
+        """
+        :return: tuple of tiles in 136 format
+        """
+        if self._closed_hand is None:
+            closed_tiles_136 = self._tiles_136 * (1 - self._meld_tiles_136)
+            self._closed_hand = tuple(np.repeat(TILES_136, closed_tiles_136).tolist())
+        return self._closed_hand
+
+    @property
+    def tiles_34(self):
+        """
+        All tiles in the hand (with tiles from melds)
+        :return: tuple of counts in 34 format
+        """
+        if self._tiles_34_view is None:
+            self._tiles_34_view = tuple(self._tiles_34.tolist())
+        return self._tiles_34_view
+
+    @property
+    def closed_hand_34(self):
+        """
+        :return: tuple of counts in 34 format
+        """
+        if self._closed_hand_34_view is None:
+            self._closed_hand_34_view = tuple(self._closed_hand_34.tolist())
+        return self._closed_hand_34_view
+
+    def has_tile(self, tile_136):
+        """
+        :param tile_136: 136 format tile
+        :return: boolean, is the tile in the hand (with tiles from melds)
+        """
+        return bool(self._tiles_136[tile_136])
+
+    def _add_tile(self, tile_136):
+        self._tiles_136[tile_136] += 1
+        self._tiles_34[tile_136 // 4] += 1
+        if not self._meld_tiles_136[tile_136]:
+            self._closed_hand_34[tile_136 // 4] += 1
+        self._hand_changed()
+
+    def _remove_tile(self, tile_136):
+        if not self._tiles_136[tile_136]:
+            raise ValueError('Tile {} is not in the hand'.format(tile_136))
+
+        self._tiles_136[tile_136] -= 1
+        self._tiles_34[tile_136 // 4] -= 1
+        if not self._meld_tiles_136[tile_136]:
+            self._closed_hand_34[tile_136 // 4] -= 1
+        self._hand_changed()
+
+    def _melds_changed(self):
+        super()._melds_changed()
+
+        meld_tiles_136 = np.zeros(136, dtype=np.int64)
+        meld_tiles_136[self.meld_tiles] = 1
+        # our tiles that were moved from the closed hand to melds or back
+        moved_tiles_136 = (meld_tiles_136 - self._meld_tiles_136) * self._tiles_136
+        self._closed_hand_34 -= moved_tiles_136.reshape(34, 4).sum(axis=1)
+        self._meld_tiles_136 = meld_tiles_136
+        self._hand_changed()
+
+    def _hand_changed(self):
+        self.hand_version += 1
+        self._tiles = None
+        self._closed_hand = None
+        self._tiles_34_view = None
+        self._closed_hand_34_view = None
 
     @property
     def valued_honors(self):
@@ -267,35 +528,71 @@ class Player(PlayerInterface):
 
 
 class EnemyPlayer(PlayerInterface):
-    # array of tiles in 34 tile format
-    safe_tiles = None
+    # safe tiles are stored as integers with one bit for each tile in 34 format
+    # tiles that were discarded by the player
+    discarded_safe_tiles_mask = 0
+    # tiles that were discarded by other players after player riichi
+    riichi_safe_tiles_mask = 0
     # tiles that were discarded in the current "step"
     # so, for example kamicha discard will be a safe tile for all players
-    temporary_safe_tiles = None
+    temporary_safe_tiles_mask = 0
 
     def erase_state(self):
         super().erase_state()
 
-        self.safe_tiles = []
-        self.temporary_safe_tiles = []
+        self.discarded_safe_tiles_mask = 0
+        self.riichi_safe_tiles_mask = 0
+        self.temporary_safe_tiles_mask = 0
+
+    def snapshot(self):
+        return super().snapshot() + (
+            self.discarded_safe_tiles_mask,
+            self.riichi_safe_tiles_mask,
+            self.temporary_safe_tiles_mask,
+        )
 
-    def add_discarded_tile(self, tile: Tile):
-        super().add_discarded_tile(tile)
+    def restore(self, state):
+        self.discarded_safe_tiles_mask, self.riichi_safe_tiles_mask, self.temporary_safe_tiles_mask = \
+            super().restore(state)
+        return ()
 
-        tile = tile.value // 4
-        if tile not in self.safe_tiles:
-            self.safe_tiles.append(tile)
+    def add_discarded_tile(self, tile_136, is_tsumogiri=False):
+        super().add_discarded_tile(tile_136, is_tsumogiri)
+
+        tile_bit = 1 << (tile_136 // 4)
+        self.discarded_safe_tiles_mask |= tile_bit
 
         # erase temporary furiten after tile draw
-        self.temporary_safe_tiles = []
-        affected_players = [1, 2, 3]
-        affected_players.remove(self.seat)
+        self.temporary_safe_tiles_mask = 0
 
         # temporary furiten, for one "step"
-        for x in affected_players:
-            if tile not in self.table.get_player(x).temporary_safe_tiles:
-                self.table.get_player(x).temporary_safe_tiles.append(tile)
+        for x in range(1, 4):
+            if x != self.seat:
+                self.table.get_player(x).temporary_safe_tiles_mask |= tile_bit
+
+    @property
+    def safe_tiles_mask(self):
+        return self.discarded_safe_tiles_mask | self.riichi_safe_tiles_mask
+
+    @property
+    def all_safe_tiles_mask(self):
+        return self.discarded_safe_tiles_mask | self.riichi_safe_tiles_mask | self.temporary_safe_tiles_mask
+
+    @property
+    def safe_tiles(self):
+        """
+        :return: array of tiles in 34 tile format
+        """
+        return mask_to_tiles(self.safe_tiles_mask)
+
+    @property
+    def temporary_safe_tiles(self):
+        return mask_to_tiles(self.temporary_safe_tiles_mask)
+
+    @temporary_safe_tiles.setter
+    def temporary_safe_tiles(self, tiles_34):
+        self.temporary_safe_tiles_mask = tiles_to_mask(tiles_34)
 
     @property
     def all_safe_tiles(self):
-        return list(set(self.temporary_safe_tiles + self.safe_tiles))
+        return mask_to_tiles(self.all_safe_tiles_mask)
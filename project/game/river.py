@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+from mahjong.tile import Tile
+
+from utils.tiles_mask import tiles_to_mask
+
+
+class DiscardRiver(object):
+    """
+    Discarded tiles of one player, stored in preallocated arrays.
+    Public arrays are views limited by the count of discards
+    """
+    # player can't discard more tiles than there are in the set
+    MAX_DISCARDS = 136
+
+    TILE = 0
+    IS_TSUMOGIRI = 1
+    IS_RIICHI = 2
+    IS_CALLED = 3
+    TURN = 4
+
+    def __init__(self):
+        # one row for each value that we store for discarded tile
+        self._data = np.zeros((5, self.MAX_DISCARDS), dtype=np.int16)
+        self.size = 0
+        # how many tiles of each type are in the river
+        self.counts_34 = np.zeros(34, dtype=np.int64)
+        # one bit for each discarded tile type in 34 format
+        self.tiles_34_mask = 0
+        # it is increased on every change, so values calculated from the river can be cached
+        self.version = 0
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return 'DiscardRiver({})'.format(self.tiles.tolist())
+
+    @property
+    def tiles(self):
+        """
+        :return: array of tiles in 136 format
+        """
+        return self._data[self.TILE, :self.size]
+
+    @property
+    def is_tsumogiri(self):
+        return self._data[self.IS_TSUMOGIRI, :self.size]
+
+    @property
+    def is_riichi(self):
+        """
+        :return: array with 1 for the riichi declaration tile
+        """
+        return self._data[self.IS_RIICHI, :self.size]
+
+    @property
+    def is_called(self):
+        """
+        :return: array with 1 for tiles that were called by other players
+        """
+        return self._data[self.IS_CALLED, :self.size]
+
+    @property
+    def turns(self):
+        """
+        :return: array with player round step for each discard
+        """
+        return self._data[self.TURN, :self.size]
+
+    @property
+    def last_tile(self):
+        if not self.size:
+            return None
+        return int(self._data[self.TILE, self.size - 1])
+
+    def append(self, tile_136, is_tsumogiri, is_riichi, turn):
+        """
+        :param tile_136: 136 format tile
+        :param is_tsumogiri: was tile discarded from hand or not
+        :param is_riichi: is it riichi declaration tile
+        :param turn: player round step
+        """
+        self._data[:, self.size] = (tile_136, is_tsumogiri, is_riichi, 0, turn)
+        self.size += 1
+        self.version += 1
+        self.counts_34[tile_136 // 4] += 1
+        self.tiles_34_mask |= 1 << (tile_136 // 4)
+
+    def pop(self):
+        """
+        Remove the last discard
+        :return: 136 format tile
+        """
+        self.size -= 1
+        self.version += 1
+        tile_136 = int(self._data[self.TILE, self.size])
+        self.counts_34[tile_136 // 4] -= 1
+        if not self.counts_34[tile_136 // 4]:
+            self.tiles_34_mask &= ~(1 << (tile_136 // 4))
+        return tile_136
+
+    def set_called(self, is_called=True):
+        """
+        Mark the last discard as called by other player
+        :param is_called: boolean
+        """
+        self._data[self.IS_CALLED, self.size - 1] = is_called
+        self.version += 1
+
+    def set_riichi(self, is_riichi=True):
+        """
+        Mark the last discard as riichi declaration tile
+        :param is_riichi: boolean
+        """
+        self._data[self.IS_RIICHI, self.size - 1] = is_riichi
+        self.version += 1
+
+    def is_discarded(self, tile_34):
+        """
+        :param tile_34: 34 format tile
+        :return: boolean
+        """
+        return self.counts_34[tile_34] > 0
+
+    def to_tiles(self):
+        """
+        :return: array of Tile objects
+        """
+        return [Tile(int(x), bool(y)) for x, y in zip(self.tiles, self.is_tsumogiri)]
+
+    def snapshot(self):
+        """
+        :return: immutable copy of the river that can be restored many times with restore()
+        """
+        return self._data[:, :self.size].tobytes()
+
+    def restore(self, snapshot):
+        """
+        :param snapshot: value from snapshot()
+        """
+        data = np.frombuffer(snapshot, dtype=self._data.dtype).reshape(len(self._data), -1)
+        self.size = data.shape[1]
+        self.version += 1
+        self._data[:, :self.size] = data
+        self.counts_34[:] = np.bincount(data[self.TILE] // 4, minlength=34)
+        self.tiles_34_mask = tiles_to_mask(np.flatnonzero(self.counts_34).tolist())
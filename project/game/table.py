@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
+import numpy as np
 from mahjong.constants import EAST, SOUTH, WEST, NORTH
 from mahjong.meld import Meld
-from mahjong.tile import TilesConverter, Tile
+from mahjong.tile import TilesConverter
 from mahjong.utils import plus_dora, is_aka_dora
 
 from game.player import Player, EnemyPlayer
@@ -13,7 +14,12 @@ class Table(object):
     # main bot + all other players
     players = None
 
-    dora_indicators = None
+    _dora_indicators = None
+    # count of dora for each tile, in 34 and in 136 format (with aka dora)
+    _dora_count_34 = None
+    _dora_count_136 = None
+    # count of indicators and aka dora rule that were used for dora tables
+    _dora_tables_key = None
 
     dealer_seat = 0
     round_number = -1
@@ -28,6 +34,8 @@ class Table(object):
 
     # array of tiles in 34 format
     revealed_tiles = None
+    # numpy array of tiles in 34 format, 4 - revealed tiles
+    unseen_tiles = None
 
     has_open_tanyao = False
     has_aka_dora = False
@@ -36,6 +44,7 @@ class Table(object):
         self._init_players()
         self.dora_indicators = []
         self.revealed_tiles = [0] * 34
+        self.unseen_tiles = np.full(34, 4, dtype=np.int64)
 
     def __str__(self):
         dora_string = TilesConverter.to_one_line_string(self.dora_indicators)
@@ -73,6 +82,7 @@ class Table(object):
         self.count_of_riichi_sticks = count_of_riichi_sticks
 
         self.revealed_tiles = [0] * 34
+        self.unseen_tiles = np.full(34, 4, dtype=np.int64)
 
         self.dora_indicators = []
         self.add_dora_indicator(dora_indicator)
@@ -95,6 +105,49 @@ class Table(object):
                 player.first_seat = seats[i - dealer_seat]
                 i += 1
 
+    def snapshot(self):
+        """
+        Save the round state of the table and all players.
+        Snapshot is immutable, so it can be shared between search branches
+        and restored any number of times. AI state is not saved.
+        :return: TableSnapshot
+        """
+        table_state = (
+            self.round_number,
+            self.round_wind_number,
+            self.dealer_seat,
+            self.count_of_honba_sticks,
+            self.count_of_riichi_sticks,
+            self.count_of_remaining_tiles,
+            self.meld_was_called,
+            tuple(self.dora_indicators),
+            tuple(self.revealed_tiles),
+            self._dora_count_34,
+            self._dora_count_136,
+            self._dora_tables_key,
+        )
+        players_state = tuple([x.snapshot() for x in self.players])
+        return TableSnapshot(table_state, players_state)
+
+    def restore(self, snapshot):
+        """
+        :param snapshot: TableSnapshot from snapshot()
+        """
+        self.round_number, self.round_wind_number, self.dealer_seat, self.count_of_honba_sticks, \
+            self.count_of_riichi_sticks, self.count_of_remaining_tiles, self.meld_was_called, dora_indicators, \
+            revealed_tiles, dora_count_34, dora_count_136, dora_tables_key = snapshot.table_state
+
+        self.dora_indicators = list(dora_indicators)
+        self._dora_count_34 = dora_count_34
+        self._dora_count_136 = dora_count_136
+        self._dora_tables_key = dora_tables_key
+
+        self.revealed_tiles = list(revealed_tiles)
+        self.unseen_tiles = 4 - np.array(revealed_tiles, dtype=np.int64)
+
+        for player, player_state in zip(self.players, snapshot.players_state):
+            player.restore(player_state)
+
     def add_called_meld(self, player_seat, meld):
         self.meld_was_called = True
 
@@ -113,17 +166,11 @@ class Table(object):
 
         self.get_player(player_seat).add_called_meld(meld)
 
-        tiles = meld.tiles[:]
-        # called tile was already added to revealed array
-        # because it was called on the discard
-        if meld.called_tile is not None:
-            tiles.remove(meld.called_tile)
+        river = self._called_tile_river(player_seat, meld)
+        if river:
+            river.set_called()
 
-        # for shouminkan we already added 3 tiles
-        if meld.type == meld.CHANKAN:
-            tiles = [meld.tiles[0]]
-
-        for tile in tiles:
+        for tile in self._meld_revealed_tiles(meld):
             self._add_revealed_tile(tile)
 
     def add_called_riichi(self, player_seat):
@@ -141,18 +188,144 @@ class Table(object):
         """
         self.count_of_remaining_tiles -= 1
 
-        tile = Tile(tile_136, is_tsumogiri)
-        self.get_player(player_seat).add_discarded_tile(tile)
+        self.get_player(player_seat).add_discarded_tile(tile_136, is_tsumogiri)
 
         # cache already revealed tiles
-        self._add_revealed_tile(tile.value)
+        self._add_revealed_tile(tile_136)
+
+    def apply_draw(self, tile_136):
+        """
+        Draw the tile for our player during the search, enemy draws are not visible for us
+        :param tile_136: 136 format tile
+        :return: value for undo_draw()
+        """
+        return self.player.apply_draw(tile_136)
+
+    def undo_draw(self, undo):
+        """
+        :param undo: value returned by apply_draw()
+        """
+        self.player.undo_draw(undo)
+
+    def apply_discard(self, player_seat, tile_136, is_tsumogiri=False):
+        """
+        The same as add_discarded_tile(), but the table state can be returned back with undo_discard()
+        :param player_seat:
+        :param tile_136: 136 format tile
+        :param is_tsumogiri: was tile discarded from hand or not
+        :return: value for undo_discard()
+        """
+        hand_undo = None
+        if player_seat == 0:
+            hand_undo = self.player.apply_discard(tile_136)
+
+        masks = tuple([
+            (x.discarded_safe_tiles_mask, x.riichi_safe_tiles_mask, x.temporary_safe_tiles_mask)
+            for x in self.players[1:]
+        ])
+        self.add_discarded_tile(player_seat, tile_136, is_tsumogiri)
+        return player_seat, hand_undo, masks
+
+    def undo_discard(self, undo):
+        """
+        :param undo: value returned by apply_discard()
+        """
+        player_seat, hand_undo, masks = undo
+        player = self.get_player(player_seat)
+
+        tile = player.river.pop()
+        player.round_step -= 1
+        self.count_of_remaining_tiles += 1
+        self._remove_revealed_tile(tile)
+
+        for enemy, enemy_masks in zip(self.players[1:], masks):
+            enemy.discarded_safe_tiles_mask, enemy.riichi_safe_tiles_mask, enemy.temporary_safe_tiles_mask = \
+                enemy_masks
+
+        if hand_undo is not None:
+            self.player.undo_discard(hand_undo)
+
+    def apply_meld(self, player_seat, meld):
+        """
+        The same as add_called_meld(), but the table state can be returned back with undo_meld().
+        For our player called tile is added to the hand
+        :param player_seat:
+        :param meld: Meld object
+        :return: value for undo_meld()
+        """
+        player = self.get_player(player_seat)
+        undo = (player_seat, meld, self.meld_was_called, self.count_of_remaining_tiles, tuple(player.melds))
+
+        hand_undo = None
+        if player_seat == 0:
+            hand_undo = self.player.apply_called_tile(meld)
+
+        self.add_called_meld(player_seat, meld)
+        return undo + (hand_undo,)
+
+    def undo_meld(self, undo):
+        """
+        :param undo: value returned by apply_meld()
+        """
+        player_seat, meld, self.meld_was_called, self.count_of_remaining_tiles, melds, hand_undo = undo
+
+        river = self._called_tile_river(player_seat, meld)
+        if river:
+            river.set_called(False)
+
+        for tile in self._meld_revealed_tiles(meld):
+            self._remove_revealed_tile(tile)
+
+        if hand_undo is not None:
+            self.player.undo_called_tile(hand_undo)
+
+        self.get_player(player_seat).melds = list(melds)
 
     def add_dora_indicator(self, tile):
         self.dora_indicators.append(tile)
         self._add_revealed_tile(tile)
+        self._update_dora_tables()
 
     def is_dora(self, tile):
-        return plus_dora(tile, self.dora_indicators) or is_aka_dora(tile, self.has_open_tanyao)
+        return self.dora_count_34[tile // 4] or is_aka_dora(tile, self.has_open_tanyao)
+
+    @property
+    def dora_indicators(self):
+        return self._dora_indicators
+
+    @dora_indicators.setter
+    def dora_indicators(self, dora_indicators):
+        self._dora_indicators = dora_indicators
+        self._dora_tables_key = None
+
+    @property
+    def dora_count_34(self):
+        """
+        :return: tuple with count of dora for each tile in 34 format
+        """
+        self._check_dora_tables()
+        return self._dora_count_34
+
+    @property
+    def dora_count_136(self):
+        """
+        The same as dora_count_34, but aka dora are counted too
+        :return: tuple with count of dora for each tile in 136 format
+        """
+        self._check_dora_tables()
+        return self._dora_count_136
+
+    def _check_dora_tables(self):
+        # indicators can be added without add_dora_indicator() (for example in tests)
+        if self._dora_tables_key != (len(self.dora_indicators), self.has_aka_dora):
+            self._update_dora_tables()
+
+    def _update_dora_tables(self):
+        self._dora_count_34 = tuple([plus_dora(x * 4, self.dora_indicators) for x in range(0, 34)])
+        self._dora_count_136 = tuple([
+            self._dora_count_34[x // 4] + int(is_aka_dora(x, self.has_aka_dora)) for x in range(0, 136)
+        ])
+        self._dora_tables_key = (len(self.dora_indicators), self.has_aka_dora)
 
     def set_players_scores(self, scores, uma=None):
         for i in range(0, len(scores)):
@@ -213,6 +386,40 @@ class Table(object):
     def _add_revealed_tile(self, tile):
         tile //= 4
         self.revealed_tiles[tile] += 1
+        self.unseen_tiles[tile] -= 1
+
+    def _remove_revealed_tile(self, tile):
+        tile //= 4
+        self.revealed_tiles[tile] -= 1
+        self.unseen_tiles[tile] += 1
+
+    def _called_tile_river(self, player_seat, meld):
+        """
+        :return: river of the player that discarded meld called tile
+        """
+        if not meld.opened or meld.type == Meld.CHANKAN:
+            return None
+
+        if meld.from_who is None or meld.from_who == player_seat:
+            return None
+
+        river = self.get_player(meld.from_who).river
+        if river.last_tile != meld.called_tile:
+            return None
+
+        return river
+
+    def _meld_revealed_tiles(self, meld):
+        # for shouminkan we already added 3 tiles
+        if meld.type == meld.CHANKAN:
+            return [meld.tiles[0]]
+
+        tiles = meld.tiles[:]
+        # called tile was already added to revealed array
+        # because it was called on the discard
+        if meld.called_tile is not None:
+            tiles.remove(meld.called_tile)
+        return tiles
 
     def _init_players(self,):
         self.player = Player(self, 0, self.dealer_seat)
@@ -221,3 +428,14 @@ class Table(object):
         for seat in range(1, self.count_of_players):
             player = EnemyPlayer(self, seat, self.dealer_seat)
             self.players.append(player)
+
+
+class TableSnapshot(object):
+    """
+    State of the table and players, see Table.snapshot()
+    """
+    __slots__ = ('table_state', 'players_state')
+
+    def __init__(self, table_state, players_state):
+        self.table_state = table_state
+        self.players_state = players_state
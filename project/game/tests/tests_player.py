@@ -114,3 +114,129 @@ class PlayerTestCase(unittest.TestCase, TestMixin):
         player.add_called_meld(self._make_meld(Meld.PON, honors='555'))
 
         self.assertEqual(len(player.closed_hand), 10)
+
+    def test_live_tiles(self):
+        table = Table()
+        player = table.player
+
+        tiles = self._string_to_136_array(sou='123678', pin='3599', honors='555')
+        player.init_hand(tiles)
+
+        table.add_dora_indicator(self._string_to_136_tile(sou='1'))
+        table.add_discarded_tile(1, self._string_to_136_tile(pin='9'), False)
+        table.add_called_meld(1, self._make_meld(Meld.PON, honors='777'))
+
+        tiles_34 = self._to_34_array(player.closed_hand)
+        live_tiles = player.live_tiles(tiles_34)
+        for tile_34 in range(0, 34):
+            self.assertEqual(live_tiles[tile_34], 4 - player.total_tiles(tile_34, tiles_34))
+
+        self.assertEqual(live_tiles[self._string_to_34_tile(sou='1')], 2)
+        self.assertEqual(live_tiles[self._string_to_34_tile(pin='9')], 1)
+
+        # by default our current closed hand is used
+        self.assertEqual(player.live_tiles().tolist(), live_tiles.tolist())
+        player.draw_tile(self._string_to_136_tile(man='1'))
+        self.assertEqual(player.live_tiles()[self._string_to_34_tile(man='1')], 3)
+
+    def test_hand_state_is_updated_with_tiles(self):
+        table = Table()
+        player = table.player
+
+        tiles = self._string_to_136_array(sou='123678', pin='3599', honors='555')
+        player.init_hand(tiles)
+        self.assertEqual(player.closed_hand_34, tuple(self._to_34_array(tiles)))
+
+        tile = self._string_to_136_tile(man='1')
+        player.draw_tile(tile)
+        self.assertIn(tile, player.closed_hand_tiles)
+        self.assertEqual(player.tiles_34[self._string_to_34_tile(man='1')], 1)
+
+        player.discard_tile(tile)
+        self.assertNotIn(tile, player.closed_hand_tiles)
+        self.assertEqual(player.tiles_34[self._string_to_34_tile(man='1')], 0)
+
+        player.add_called_meld(self._make_meld(Meld.PON, honors='555'))
+        self.assertEqual(len(player.closed_hand), 10)
+        self.assertEqual(player.tiles_34, tuple(self._to_34_array(tiles)))
+        self.assertEqual(player.closed_hand_34[self._string_to_34_tile(honors='5')], 0)
+
+        # tiles can be replaced without player methods
+        player.tiles = self._string_to_136_array(sou='123')
+        player.melds = []
+        self.assertEqual(player.closed_hand_tiles, player.tiles)
+
+    def test_tiles_are_read_only(self):
+        table = Table()
+        player = table.player
+
+        tiles = self._string_to_136_array(sou='123678', pin='3599', honors='555')
+        player.init_hand(tiles)
+        player.add_called_meld(self._make_meld(Meld.PON, honors='555'))
+        self.assertEqual(player.closed_hand_34[self._string_to_34_tile(honors='5')], 0)
+
+        with self.assertRaises(AttributeError):
+            player.tiles.append(self._string_to_136_tile(man='1'))
+
+        # meld tiles return to the closed hand, when melds are replaced
+        version = player.hand_version
+        player.melds = []
+        self.assertEqual(player.closed_hand_tiles, tuple(tiles))
+        self.assertEqual(player.closed_hand_34[self._string_to_34_tile(honors='5')], 3)
+        self.assertNotEqual(player.hand_version, version)
+
+    def test_caller_tiles_are_not_changed(self):
+        table = Table()
+        player = table.player
+
+        tiles = list(reversed(self._string_to_136_array(sou='123678', pin='3599', honors='555')))
+        original_tiles = tiles[:]
+        player.init_hand(tiles)
+        player.draw_tile(self._string_to_136_tile(man='1'))
+        self.assertEqual(tiles, original_tiles)
+
+    def test_hand_is_kept_sorted(self):
+        table = Table()
+        player = table.player
+
+        tiles = self._string_to_136_array(sou='123678', pin='3599', honors='555')
+        player.init_hand(list(reversed(tiles)))
+        self.assertEqual(player.tiles, tuple(tiles))
+
+        # sorted views are built once after the hand change
+        self.assertIs(player.tiles, player.tiles)
+        self.assertIs(player.closed_hand_34, player.closed_hand_34)
+
+        tile = self._string_to_136_tile(man='1')
+        player.draw_tile(tile)
+        self.assertEqual(player.tiles, tuple(sorted(tiles + [tile])))
+        self.assertEqual(player.closed_hand_34[self._string_to_34_tile(man='1')], 1)
+        self.assertEqual(player.closed_hand_tiles, player.tiles)
+        self.assertTrue(player.has_tile(tile))
+
+        player.discard_tile(tile)
+        self.assertEqual(player.tiles, tuple(tiles))
+        self.assertFalse(player.has_tile(tile))
+
+        # tile that is not in the hand can't be removed
+        with self.assertRaises(ValueError):
+            player.apply_discard(tile)
+        self.assertEqual(player.tiles, tuple(tiles))
+        self.assertEqual(player.closed_hand_tiles, tuple(tiles))
+
+    def test_meld_34_tiles(self):
+        table = Table()
+        player = table.player
+
+        player.add_called_meld(self._make_meld(Meld.PON, pin='555'))
+        player.add_called_meld(self._make_meld(Meld.CHI, sou='123'))
+        pon = self._string_to_34_tile(pin='5')
+        self.assertEqual(player.meld_34_tiles, ((pon, pon, pon), (18, 19, 20)))
+        self.assertIs(player.meld_34_tiles, player.meld_34_tiles)
+
+        # shouminkan replaces pon set
+        player.add_called_meld(self._make_meld(Meld.CHANKAN, pin='5555'))
+        self.assertEqual(player.meld_34_tiles, ((18, 19, 20), (pon, pon, pon)))
+
+        player.melds = []
+        self.assertEqual(player.meld_34_tiles, ())
@@ -2,6 +2,7 @@
 import unittest
 
 from mahjong.constants import FIVE_RED_MAN, FIVE_RED_PIN, FIVE_RED_SOU, EAST, SOUTH, WEST, NORTH
+from mahjong.meld import Meld
 from mahjong.tests_mixin import TestMixin
 
 from game.table import Table
@@ -186,6 +187,141 @@ class TableTestCase(unittest.TestCase, TestMixin):
         # red five sou
         self.assertTrue(table.is_dora(FIVE_RED_SOU))
 
+    def test_dora_count_tables(self):
+        table = Table()
+        table.init_round(0, 0, 0, self._string_to_136_tile(sou='9'), 0, [])
+
+        self.assertEqual(table.dora_count_34[self._string_to_34_tile(sou='1')], 1)
+        self.assertEqual(table.dora_count_34[self._string_to_34_tile(sou='2')], 0)
+
+        # the same indicator twice
+        table.add_dora_indicator(self._string_to_136_tile(sou='9'))
+        self.assertEqual(table.dora_count_136[self._string_to_136_tile(sou='1')], 2)
+
+        # indicators can be added to the list directly
+        table.dora_indicators.append(self._string_to_136_tile(sou='4'))
+        self.assertEqual(table.dora_count_34[self._string_to_34_tile(sou='5')], 1)
+        self.assertEqual(table.dora_count_136[FIVE_RED_SOU], 1)
+
+        table.has_aka_dora = True
+        self.assertEqual(table.dora_count_136[FIVE_RED_SOU], 2)
+        self.assertEqual(table.dora_count_136[FIVE_RED_MAN], 1)
+
+    def test_snapshot_and_restore(self):
+        table = Table()
+        table.init_round(0, 0, 0, self._string_to_136_tile(sou='9'), 0, [250, 250, 250, 250])
+        table.player.init_hand(self._string_to_136_array(sou='123678', pin='3599', honors='555'))
+        table.add_discarded_tile(1, self._string_to_136_tile(man='3'), False)
+
+        snapshot = table.snapshot()
+        revealed_tiles = table.revealed_tiles[:]
+        closed_hand_34 = table.player.closed_hand_34
+
+        table.add_called_riichi(2)
+        table.add_dora_indicator(self._string_to_136_tile(man='1'))
+        table.add_discarded_tile(2, self._string_to_136_tile(man='4'), False)
+        table.add_called_meld(0, self._make_meld(Meld.PON, honors='555'))
+        table.player.draw_tile(self._string_to_136_tile(pin='1'))
+
+        table.restore(snapshot)
+
+        self.assertEqual(table.revealed_tiles, revealed_tiles)
+        self.assertEqual(table.unseen_tiles.tolist(), [4 - x for x in revealed_tiles])
+        self.assertEqual(table.count_of_remaining_tiles, 69)
+        self.assertEqual(table.dora_count_34[self._string_to_34_tile(man='2')], 0)
+        self.assertEqual(table.player.closed_hand_34, closed_hand_34)
+        self.assertEqual(table.player.melds, [])
+        self.assertEqual(len(table.get_player(2).discards), 0)
+        self.assertFalse(table.get_player(2).in_riichi)
+        self.assertEqual(table.get_player(2).temporary_safe_tiles, [self._string_to_34_tile(man='3')])
+
+        # snapshot is not changed by the restored state
+        table.add_discarded_tile(1, self._string_to_136_tile(man='5'), False)
+        table.restore(snapshot)
+        self.assertEqual(len(table.get_player(1).discards), 1)
+
+    def test_discard_river(self):
+        table = Table()
+        table.init_round(0, 0, 0, self._string_to_136_tile(sou='9'), 0, [250, 250, 250, 250])
+        river = table.get_player(1).river
+
+        table.add_discarded_tile(1, self._string_to_136_tile(man='3'), True)
+        table.add_called_riichi(1)
+        table.add_discarded_tile(1, self._string_to_136_tile(honors='1'), False)
+        meld = self._make_meld(Meld.PON, honors='111')
+        meld.from_who = 1
+        meld.called_tile = self._string_to_136_tile(honors='1')
+        table.add_called_meld(2, meld)
+        table.add_discarded_tile(1, self._string_to_136_tile(man='3'), False)
+
+        self.assertEqual(len(river), 3)
+        self.assertEqual(river.is_tsumogiri.tolist(), [1, 0, 0])
+        self.assertEqual(river.is_riichi.tolist(), [0, 1, 0])
+        self.assertEqual(river.is_called.tolist(), [0, 1, 0])
+        self.assertEqual(river.turns.tolist(), [0, 1, 2])
+        self.assertEqual(river.counts_34[self._string_to_34_tile(man='3')], 2)
+        self.assertEqual([x.value for x in table.get_player(1).discards], river.tiles.tolist())
+
+        self.assertEqual(river.pop(), self._string_to_136_tile(man='3'))
+        self.assertEqual(river.counts_34[self._string_to_34_tile(man='3')], 1)
+        self.assertEqual(river.pop(), self._string_to_136_tile(honors='1'))
+        self.assertEqual(river.tiles_34_mask, 1 << self._string_to_34_tile(man='3'))
+
+    def test_discard_river_and_our_riichi(self):
+        table = Table()
+        table.init_round(0, 0, 0, self._string_to_136_tile(sou='9'), 0, [250, 250, 250, 250])
+        player = table.player
+        river = player.river
+
+        player.init_hand(self._string_to_136_array(sou='123456', pin='12345', man='11'))
+        player.draw_tile(self._string_to_136_tile(honors='1'))
+        player.discard_tile(self._string_to_136_tile(honors='1'))
+        player.draw_tile(self._string_to_136_tile(honors='2'))
+        player.discard_tile(self._string_to_136_tile(honors='2'))
+        # riichi decision is made after the discard
+        player.call_riichi()
+        table.add_discarded_tile(0, self._string_to_136_tile(honors='3'), True)
+        # server confirms our riichi after the declaration tile
+        table.add_called_riichi(0)
+        table.add_discarded_tile(0, self._string_to_136_tile(honors='4'), True)
+
+        self.assertEqual(player.in_riichi, True)
+        self.assertEqual(river.is_riichi.tolist(), [0, 1, 0, 0])
+
+    def test_apply_and_undo_moves(self):
+        table = Table()
+        table.init_round(0, 0, 0, self._string_to_136_tile(sou='9'), 0, [250, 250, 250, 250])
+        table.player.init_hand(self._string_to_136_array(sou='123678', pin='3599', honors='55'))
+        table.add_discarded_tile(1, self._string_to_136_tile(man='3'), False)
+        table.add_called_riichi(2)
+
+        snapshot = table.snapshot()
+
+        draw_undo = table.apply_draw(self._string_to_136_tile(pin='1'))
+        self.assertEqual(table.player.closed_hand_34[self._string_to_34_tile(pin='1')], 1)
+        discard_undo = table.apply_discard(0, self._string_to_136_tile(pin='3'))
+        self.assertEqual(table.player.closed_hand_34[self._string_to_34_tile(pin='3')], 0)
+        self.assertEqual(table.get_player(2).riichi_safe_tiles_mask, 1 << self._string_to_34_tile(pin='3'))
+        enemy_undo = table.apply_discard(3, 126)
+        self.assertEqual(table.unseen_tiles[self._string_to_34_tile(honors='5')], 3)
+
+        meld = Meld(meld_type=Meld.PON, tiles=[124, 125, 126], opened=True, called_tile=126, who=0)
+        meld_undo = table.apply_meld(0, meld)
+        self.assertEqual(table.player.closed_hand_34[self._string_to_34_tile(honors='5')], 0)
+        self.assertEqual(table.player.meld_34_tiles, ((31, 31, 31),))
+        self.assertEqual(table.unseen_tiles[self._string_to_34_tile(honors='5')], 1)
+        self.assertEqual(table.count_of_remaining_tiles, 68)
+
+        table.undo_meld(meld_undo)
+        table.undo_discard(enemy_undo)
+        table.undo_discard(discard_undo)
+        table.undo_draw(draw_undo)
+
+        self.assertEqual(table.snapshot().table_state, snapshot.table_state)
+        self.assertEqual(table.snapshot().players_state, snapshot.players_state)
+        self.assertEqual(table.unseen_tiles.tolist(), [4 - x for x in table.revealed_tiles])
+        self.assertEqual(table.player.meld_34_tiles, ())
+
     def test_round_wind(self):
         table = Table()
 
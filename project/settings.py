@@ -21,6 +21,19 @@ AI_CLASS = None
 
 LOG_PREFIX = ''
 
+# how many hands AI will keep in the shanten cache
+HAND_CACHE_SIZE = 50000
+# how many estimated hand values AI will keep (cache is erased on new dora indicator)
+HAND_VALUE_CACHE_SIZE = 5000
+# how many sets combinations of one suit AI will keep for hand division
+HAND_DIVIDER_CACHE_SIZE = 10000
+# precomputed shanten tables, use build_shanten_tables.py to create the file
+# bot works without it, but it needs more time and memory to warm up
+SHANTEN_TABLES_FILE = 'shanten_tables.bin'
+# compare defensive discards with the same danger by the deal in probability,
+# it changes discards of the default defence, so it is disabled for now
+DEFENCE_DEAL_IN_ORDER = False
+
 """
   Game type decoding:
 
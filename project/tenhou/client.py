@@ -257,8 +257,7 @@ class TenhouClient(Client):
 
                         for item in player['melds']:
                             if x == 0:
-                                tiles = item.tiles
-                                main_player.tiles.extend(tiles)
+                                main_player.tiles = main_player.tiles + tuple(item.tiles)
                             self.table.add_called_meld(x, item)
 
                 # draw and discard
@@ -306,7 +305,7 @@ class TenhouClient(Client):
                         if can_call_riichi:
                             self._random_sleep(1, 2)
                             self._send_message('<REACH hai="{}" />'.format(discarded_tile))
-                            main_player.in_riichi = True
+                            main_player.call_riichi()
                     else:
                         # we had to add it to discards, to calculate remaining tiles correctly
                         discarded_tile = drawn_tile
@@ -346,7 +345,7 @@ class TenhouClient(Client):
                         if meld.type != Meld.KAN and meld.type != Meld.CHANKAN:
                             discarded_tile = self.player.discard_tile(tile_to_discard)
 
-                            self.player.tiles.append(meld_tile)
+                            self.player.tiles = self.player.tiles + (meld_tile,)
                             self._send_message('<D p="{}"/>'.format(discarded_tile))
 
                 win_suggestions = [
@@ -445,6 +444,8 @@ class TenhouClient(Client):
                 return
 
         logger.info('Final results: {}'.format(self.table.get_players_sorted_by_scores()))
+        for line in self.player.ai.cache_statistics():
+            logger.info(line)
 
         # we need to finish the game, and only after this try to send statistics
         # if order will be different, tenhou will return 404 on log download endpoint
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    Dictionary with limited size.
+    When it is full, the least recently used item will be removed
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.items = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def get(self, key, default=None):
+        try:
+            value = self.items[key]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self.items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if key in self.items:
+            self.items.move_to_end(key)
+        elif len(self.items) >= self.capacity:
+            self.items.popitem(last=False)
+            self.evictions += 1
+
+        self.items[key] = value
+
+    def clear(self):
+        self.items.clear()
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return total and self.hits / total or 0
+
+    def __str__(self):
+        return 'size={}/{}, hits={}, misses={}, evictions={}, hit rate={:.2f}'.format(
+            len(self.items),
+            self.capacity,
+            self.hits,
+            self.misses,
+            self.evictions,
+            self.hit_rate
+        )
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+
+
+def tiles_to_mask(tiles_34):
+    """
+    :param tiles_34: array of tile indices in 34 format (or in 136 format for a hand mask)
+    :return: integer with one bit for each tile
+    """
+    mask = 0
+    for tile in tiles_34:
+        mask |= 1 << tile
+    return mask
+
+
+def mask_to_tiles(mask):
+    """
+    :param mask: integer with one bit for each tile
+    :return: sorted array of tile indices in 34 format
+    """
+    tiles_34 = []
+    while mask:
+        lowest_bit = mask & -mask
+        tiles_34.append(lowest_bit.bit_length() - 1)
+        mask ^= lowest_bit
+    return tiles_34